@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from pathlib import Path
 from agno.agent.agent import Agent
 from agno.db.sqlite import SqliteDb
@@ -8,6 +9,14 @@ from agno.tools.mcp import MCPTools  # MCP tools integration
 
 
 from src.config import Config
+from src.context import ContextCompactor
+from src.latency import RunLatency
+from src.mcp_pool import McpSessionPool
+from src.tool_cache import (
+    CachedToolSession,
+    MemoryBackend,
+    SqliteBackend,
+)
 
 BASE_DIR = Path(__file__).parent
 instructions_path = BASE_DIR / "instructions.txt"
@@ -17,10 +26,37 @@ with open(instructions_path, "r", encoding="utf-8") as f:
     instructions_text = f.read()
 
 # Setup the database
-db = SqliteDb(db_file="tmp/agentos.db")
+DB_FILE = "tmp/agentos.db"
+db = SqliteDb(db_file=DB_FILE)
 
 # MCP Server connection (replace with your MCP server URL)
-mcp_tools = MCPTools(transport="streamable-http", url=config.mcp.MCP_SERVER_URL)
+# Прогретый пул сессий: прогоны не открывают свою сессию и не запрашивают
+# список инструментов заново, параллельные вызовы делят пул
+mcp_pool = McpSessionPool(
+    config.mcp.MCP_SERVER_URL,
+    size=config.mcp.MCP_POOL_SIZE,
+    timeout=config.mcp.MCP_TIMEOUT,
+    run_concurrency=config.mcp.MCP_RUN_CONCURRENCY,
+)
+# Кеш результатов читающих инструментов, сбрасывается пишущими
+tool_cache = None
+if config.mcp.MCP_TOOL_CACHE != "off":
+    tool_cache = CachedToolSession(
+        mcp_pool,
+        SqliteBackend(DB_FILE) if config.mcp.MCP_TOOL_CACHE == "sqlite" else MemoryBackend(),
+    )
+mcp_tools = MCPTools(
+    session=tool_cache or mcp_pool,
+    transport="streamable-http",
+    timeout_seconds=int(config.mcp.MCP_TIMEOUT),
+)
+mcp_pool.watch(mcp_tools)
+
+# Доля MCP и LLM во времени каждого прогона
+run_latency = RunLatency(mcp_time=mcp_pool.run_mcp_time)
+
+# Большие результаты инструментов ужимаются, повторы в истории схлопываются
+context_compactor = ContextCompactor(token_budget=config.llm.LLM_TOOL_RESULT_TOKENS)
 
 
 # Create A2A-capable agent with MCP tools
@@ -32,6 +68,8 @@ mcp_agent = Agent(
         name=config.llm.LLM_MODEL,
         base_url=config.llm.LLM_API_BASE,
         api_key=config.llm.LLM_API_KEY,
+        # независимые вызовы инструментов — одним ходом, agno выполнит их параллельно
+        request_params={"parallel_tool_calls": True},
     ),
     instructions=instructions_text,
     tools=[mcp_tools],
@@ -39,19 +77,49 @@ mcp_agent = Agent(
     add_history_to_context=True,
     num_history_runs=3,
     markdown=True,
+    compression_manager=context_compactor,
+    pre_hooks=[mcp_pool.begin_run],
+    post_hooks=[run_latency.post_hook, context_compactor.post_hook],
 )
 
 # # Initialize A2A with the agent
 a2a_interface = A2A(agents=[mcp_agent])
 
 
+@asynccontextmanager
+async def lifespan(app):
+    # сессии поднимаются при старте, до первого запроса
+    mcp_pool.start()
+    yield
+    await mcp_pool.close()
+
+
 # # AgentOS with interfaces
 agent_os = AgentOS(
     agents=[mcp_agent],
     interfaces=[a2a_interface],  # Pass A2A via interfaces
+    lifespan=lifespan,
 )
 
 app = agent_os.get_app()
 
+
+@app.get("/stats/latency")
+async def latency_stats() -> dict:
+    """Время прогонов (LLM / MCP) и состояние пула MCP-сессий."""
+    return {"runs": run_latency.stats(), "mcp": mcp_pool.stats()}
+
+
+@app.get("/stats/tool-cache")
+async def tool_cache_stats() -> dict:
+    """Попадания в кеш результатов инструментов: всего и по инструментам."""
+    return tool_cache.stats() if tool_cache is not None else {"backend": None}
+
+
+@app.get("/stats/context")
+async def context_stats() -> dict:
+    """Сжатие результатов инструментов: сэкономленные токены контекста."""
+    return context_compactor.report()
+
 if __name__ == "__main__":
     agent_os.serve(app="main:app", port=8080)
@@ -15,11 +15,21 @@ class LlmСonfig(ConfigBase):
     LLM_MODEL: str
     LLM_API_BASE: str
     LLM_API_KEY: str
+    # Бюджет одного результата инструмента в контексте модели, токены
+    LLM_TOOL_RESULT_TOKENS: int = 800
 
 
 class McpСonfig(ConfigBase):
     MCP_SERVER_URL: str
     MCP_API_KEY: str
+    # Число постоянных MCP-сессий, по которым распределяются вызовы инструментов
+    MCP_POOL_SIZE: int = 2
+    # Таймаут подключения и запроса к MCP-серверу, секунды
+    MCP_TIMEOUT: float = 30.0
+    # Сколько вызовов инструментов одного прогона выполняются одновременно
+    MCP_RUN_CONCURRENCY: int = 4
+    # Кеш результатов читающих инструментов: memory, sqlite (в базе AgentOS) или off
+    MCP_TOOL_CACHE: str = "memory"
 
 
 class Config(BaseSettings):
@@ -0,0 +1,225 @@
+import json
+import logging
+from collections import deque
+from dataclasses import (
+    dataclass,
+    field,
+)
+from typing import (
+    Any,
+    List,
+    Optional,
+)
+
+from agno.compression.manager import CompressionManager
+from agno.models.message import Message
+
+log = logging.getLogger(__name__)
+
+# Поля, на которые опираются инструкции агента: не обрезаются никогда
+KEEP_FIELDS = frozenset(
+    {
+        "uid",
+        "from",
+        "to",
+        "cc",
+        "subject",
+        "date",
+        "summary",
+        "start",
+        "end",
+        "location",
+        "calendar",
+        "status",
+        "error",
+        "errors",
+        "total",
+    }
+)
+# Короче этого строки при сжатии не обрезаются
+MIN_STRING = 80
+# Последний элемент укороченного списка: сколько элементов опущено
+OMITTED = "…опущено: "
+
+
+@dataclass
+class ContextCompactor(CompressionManager):
+    """
+    Сжатие результатов инструментов перед отправкой в LLM — без вызовов
+    модели, в отличие от CompressionManager agno.
+
+    Результат длиннее token_budget токенов ужимается: JSON минифицируется,
+    длинные строки (тела писем, описания событий) обрезаются всё короче,
+    затем укорачиваются самые длинные списки; поля KEEP_FIELDS не
+    трогаются. Если тот же результат того же инструмента уже есть в
+    контексте, более ранняя копия (обычно из истории прогонов) заменяется
+    короткой ссылкой — полный текст остаётся в последней.
+
+    Сжатый текст попадает в compressed_content сообщения и сохраняется с
+    прогоном, поэтому история отправляется уже сжатой.
+    """
+
+    token_budget: int = 800
+    # приблизительная длина токена в символах для русского текста и JSON
+    chars_per_token: float = 3.0
+    _runs: deque = field(default_factory=lambda: deque(maxlen=200))
+
+    def tokens(self, text: Optional[str]) -> int:
+        return round(len(text) / self.chars_per_token) if text else 0
+
+    # === CompressionManager ===
+
+    def should_compress(self, messages: List[Message]) -> bool:
+        return self.compress_tool_results and any(_is_tool_text(message) for message in messages)
+
+    def compress(self, messages: List[Message]) -> None:
+        if not self.compress_tool_results:
+            return
+        seen: dict[tuple[Optional[str], str], Message] = {}
+        # с конца: последняя копия повторяющегося результата остаётся полной
+        for message in reversed([message for message in messages if _is_tool_text(message)]):
+            signature = (message.tool_name, message.content)
+            if signature in seen:
+                message.compressed_content = (
+                    f"[повтор: тот же результат {message.tool_name or 'инструмента'} — см. ниже]"
+                )
+                self._count("deduplicated")
+                continue
+            seen[signature] = message
+            if message.compressed_content is None:
+                message.compressed_content = self.compact(message.content)
+                self._count("compacted")
+
+    async def acompress(self, messages: List[Message]) -> None:
+        self.compress(messages)
+
+    def _count(self, key: str) -> None:
+        self.stats[key] = self.stats.get(key, 0) + 1
+
+    # === Сжатие одного результата ===
+
+    def compact(self, text: str) -> str:
+        """Результат инструмента, ужатый до token_budget токенов."""
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return self._truncate_text(text)
+        compact = _dump(data)
+        if self.tokens(compact) <= self.token_budget:
+            return compact if len(compact) < len(text) else text
+        budget = int(self.token_budget * self.chars_per_token)
+        limit = max(_longest_string(data), MIN_STRING)
+        while limit > MIN_STRING:
+            limit = max(limit // 2, MIN_STRING)
+            compact = _dump(_cut_strings(data, limit))
+            if len(compact) <= budget:
+                return compact
+        data = _cut_strings(data, MIN_STRING)
+        while len(compact) > budget and _cut_longest_list(data):
+            compact = _dump(data)
+        return compact if len(compact) <= budget else self._truncate_text(compact)
+
+    def _truncate_text(self, text: str) -> str:
+        budget = int(self.token_budget * self.chars_per_token)
+        if len(text) <= budget:
+            return text
+        return text[:budget] + f"…[обрезано {len(text) - budget} симв.]"
+
+    # === Отчёт по прогону ===
+
+    def post_hook(self, run_output) -> None:
+        """
+        Сколько токенов результатов инструментов этого прогона сэкономлено в
+        контексте; копии из истории уже посчитаны в своих прогонах.
+        """
+        original = sent = 0
+        for message in run_output.messages or []:
+            if message.from_history or not _is_tool_text(message):
+                continue
+            original += self.tokens(message.content)
+            sent += self.tokens(message.compressed_content or message.content)
+        if not original:
+            return
+        report = {
+            "tool_tokens": original,
+            "tool_tokens_sent": sent,
+            "tokens_saved": original - sent,
+        }
+        run_output.metadata = {**(run_output.metadata or {}), "context": report}
+        self._runs.append(report)
+        log.info(
+            "Прогон %s: результаты инструментов %d → %d токенов",
+            run_output.run_id,
+            original,
+            sent,
+        )
+
+    def report(self) -> dict:
+        runs = list(self._runs)
+        original = sum(run["tool_tokens"] for run in runs)
+        saved = sum(run["tokens_saved"] for run in runs)
+        return {
+            **self.stats,
+            "runs": len(runs),
+            "token_budget": self.token_budget,
+            "tokens_saved": saved,
+            "saved_share": round(saved / original, 3) if original else None,
+        }
+
+
+def _is_tool_text(message: Message) -> bool:
+    return message.role == "tool" and isinstance(message.content, str)
+
+
+def _dump(data: Any) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _longest_string(data: Any) -> int:
+    if isinstance(data, str):
+        return len(data)
+    if isinstance(data, dict):
+        return max((_longest_string(value) for value in data.values()), default=0)
+    if isinstance(data, list):
+        return max((_longest_string(value) for value in data), default=0)
+    return 0
+
+
+def _cut_strings(data: Any, limit: int, key: Optional[str] = None) -> Any:
+    "Копия data со строками не длиннее limit, кроме полей KEEP_FIELDS"
+    if isinstance(data, str):
+        if key in KEEP_FIELDS or len(data) <= limit:
+            return data
+        return data[:limit] + f"…[+{len(data) - limit}]"
+    if isinstance(data, dict):
+        return {name: _cut_strings(value, limit, name) for name, value in data.items()}
+    if isinstance(data, list):
+        return [_cut_strings(value, limit, key) for value in data]
+    return data
+
+
+def _cut_longest_list(data: Any) -> bool:
+    "Убирает последнюю четверть самого длинного списка; False — укорачивать нечего"
+    longest: Optional[list] = None
+    stack = [data]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            stack.extend(item.values())
+        elif isinstance(item, list):
+            items = [value for value in item if not _is_marker(value)]
+            if len(items) > 1 and (longest is None or len(items) > len(longest)):
+                longest = item
+            stack.extend(item)
+    if longest is None:
+        return False
+    omitted = int(longest.pop()[len(OMITTED) :]) if _is_marker(longest[-1]) else 0
+    keep = max(1, len(longest) * 3 // 4)
+    omitted += len(longest) - keep
+    del longest[keep:]
+    longest.append(f"{OMITTED}{omitted}")
+    return True
+
+
+def _is_marker(value: Any) -> bool:
+    return isinstance(value, str) and value.startswith(OMITTED)
@@ -0,0 +1,81 @@
+import logging
+from collections import deque
+from typing import (
+    Callable,
+    Optional,
+)
+
+log = logging.getLogger(__name__)
+
+
+class RunLatency:
+    """
+    Из чего складывается время прогона агента: ответы LLM, вызовы
+    MCP-инструментов и остальное (история, база, сам agno). Считается по
+    метрикам сообщений прогона в post-hook, результат пишется в
+    metadata["latency"] прогона и в скользящее окно для /stats/latency.
+
+    mcp_time — источник времени MCP прогона (секунды, число вызовов) без
+    двойного счёта параллельных вызовов; без него время вызовов
+    инструментов суммируется по сообщениям.
+    """
+
+    def __init__(
+        self,
+        window: int = 200,
+        mcp_time: Optional[Callable[[], Optional[tuple[float, int]]]] = None,
+    ):
+        self._runs: deque[dict] = deque(maxlen=window)
+        self._mcp_time = mcp_time
+
+    def post_hook(self, run_output) -> None:
+        metrics = run_output.metrics
+        if metrics is None:
+            return
+        total = metrics.timer.elapsed if metrics.timer is not None else metrics.duration or 0.0
+        llm = mcp = 0.0
+        tool_calls = 0
+        for message in run_output.messages or []:
+            if message.from_history or message.metrics is None:
+                continue
+            if message.role == "assistant":
+                llm += message.metrics.duration or 0.0
+            elif message.role == "tool":
+                mcp += message.metrics.duration or 0.0
+                tool_calls += 1
+        measured = self._mcp_time() if self._mcp_time is not None else None
+        if measured is not None:
+            mcp, tool_calls = measured
+        report = {
+            "total_ms": round(total * 1000, 1),
+            "llm_ms": round(llm * 1000, 1),
+            "mcp_ms": round(mcp * 1000, 1),
+            "other_ms": round(max(total - llm - mcp, 0.0) * 1000, 1),
+            "tool_calls": tool_calls,
+        }
+        run_output.metadata = {**(run_output.metadata or {}), "latency": report}
+        self._runs.append(report)
+        log.info(
+            "Прогон %s: %.0f мс, LLM %.0f мс, MCP %.0f мс (%d вызовов)",
+            run_output.run_id,
+            report["total_ms"],
+            report["llm_ms"],
+            report["mcp_ms"],
+            tool_calls,
+        )
+
+    def stats(self) -> dict:
+        runs = list(self._runs)
+        if not runs:
+            return {"runs": 0}
+        total = sum(run["total_ms"] for run in runs)
+        durations = sorted(run["total_ms"] for run in runs)
+        return {
+            "runs": len(runs),
+            "avg_total_ms": round(total / len(runs), 1),
+            "p50_total_ms": durations[len(durations) // 2],
+            "p95_total_ms": durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+            "llm_share": round(sum(run["llm_ms"] for run in runs) / total, 3) if total else None,
+            "mcp_share": round(sum(run["mcp_ms"] for run in runs) / total, 3) if total else None,
+            "tool_calls": sum(run["tool_calls"] for run in runs),
+        }
@@ -0,0 +1,327 @@
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import (
+    dataclass,
+    field,
+)
+from datetime import timedelta
+from typing import (
+    Any,
+    Optional,
+)
+
+from mcp import (
+    ClientSession,
+    McpError,
+    types,
+)
+from mcp.client.streamable_http import streamablehttp_client
+
+log = logging.getLogger(__name__)
+
+# Пауза перед повторным подключением: от RECONNECT_DELAY до RECONNECT_MAX_DELAY
+RECONNECT_DELAY = 0.5
+RECONNECT_MAX_DELAY = 30.0
+
+
+@dataclass(eq=False)
+class _RunState:
+    "Вызовы MCP одного прогона агента"
+
+    slots: asyncio.Semaphore
+    active: int = 0
+    busy_since: float = 0.0
+    # время, когда шёл хотя бы один вызов: параллельные не суммируются
+    seconds: float = 0.0
+    calls: int = 0
+
+
+_run: ContextVar[Optional[_RunState]] = ContextVar("mcp_run", default=None)
+
+
+@dataclass(eq=False)
+class _Slot:
+    "Одно постоянное подключение к MCP-серверу"
+
+    session: Optional[ClientSession] = None
+    inflight: int = 0
+    ready: asyncio.Event = field(default_factory=asyncio.Event)
+    broken: asyncio.Event = field(default_factory=asyncio.Event)
+    task: Optional[asyncio.Task] = None
+
+
+class McpSessionPool:
+    """
+    Пул прогретых MCP-сессий (streamable-http) для агента.
+
+    Сессии поднимаются один раз и живут в фоновых задачах; разорванная
+    сессия переподключается сама. Вызовы инструментов из параллельных
+    прогонов распределяются по наименее загруженной сессии — ClientSession
+    мультиплексирует запросы, поэтому запрос не ждёт чужой. Списки
+    инструментов и промптов кешируются и сбрасываются по уведомлениям
+    сервера notifications/tools/list_changed и prompts/list_changed.
+
+    Независимые вызовы одного хода модели agno выполняет параллельно;
+    begin_run (pre-hook агента) ограничивает их число в прогоне
+    run_concurrency, остальные ждут своей очереди.
+
+    Пул передаётся в MCPTools как session: agno вызывает initialize,
+    list_tools, call_tool и send_ping.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        size: int = 2,
+        timeout: float = 30.0,
+        headers: Optional[dict[str, str]] = None,
+        run_concurrency: int = 4,
+    ):
+        self.url = url
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.run_concurrency = max(1, run_concurrency)
+        self.headers = headers
+        self._slots: list[_Slot] = []
+        self._closing = False
+        self._tools: Optional[types.ListToolsResult] = None
+        self._prompts: Optional[types.ListPromptsResult] = None
+        self._list_lock = asyncio.Lock()
+        self._toolkits: list[Any] = []
+        self._refresh: Optional[asyncio.Task] = None
+        self.metrics = {
+            "connects": 0,
+            "disconnects": 0,
+            "calls": 0,
+            "call_errors": 0,
+            "call_seconds": 0.0,
+            "list_hits": 0,
+            "list_misses": 0,
+            "invalidations": 0,
+            "peak_inflight": 0,
+        }
+
+    # === Жизненный цикл ===
+
+    def start(self) -> None:
+        """Запускает подключения в фоне, не дожидаясь их."""
+        if self._slots:
+            return
+        self._closing = False
+        for _ in range(self.size):
+            slot = _Slot()
+            slot.task = asyncio.create_task(self._serve(slot))
+            self._slots.append(slot)
+
+    async def initialize(self) -> None:
+        """Запускает пул и ждёт первую готовую сессию."""
+        await self._acquire()
+
+    async def close(self) -> None:
+        self._closing = True
+        for slot in self._slots:
+            slot.broken.set()
+        await asyncio.gather(*(slot.task for slot in self._slots), return_exceptions=True)
+        self._slots = []
+
+    async def _serve(self, slot: _Slot) -> None:
+        "Держит сессию слота открытой и переподключает её после разрыва"
+        delay = RECONNECT_DELAY
+        while not self._closing:
+            try:
+                async with streamablehttp_client(
+                    self.url, headers=self.headers, timeout=self.timeout
+                ) as (read, write, _):
+                    async with ClientSession(
+                        read,
+                        write,
+                        read_timeout_seconds=timedelta(seconds=self.timeout),
+                        message_handler=self._on_message,
+                    ) as session:
+                        await session.initialize()
+                        slot.session = session
+                        slot.broken.clear()
+                        slot.ready.set()
+                        self.metrics["connects"] += 1
+                        delay = RECONNECT_DELAY
+                        await slot.broken.wait()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("MCP: сессия с %s недоступна: %s", self.url, e)
+            finally:
+                if slot.ready.is_set():
+                    self.metrics["disconnects"] += 1
+                slot.ready.clear()
+                slot.session = None
+            if not self._closing:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+    async def _acquire(self) -> _Slot:
+        "Наименее загруженная готовая сессия; ждёт подключения не дольше timeout"
+        self.start()
+        ready = [slot for slot in self._slots if slot.ready.is_set()]
+        if not ready:
+            waiters = [asyncio.ensure_future(slot.ready.wait()) for slot in self._slots]
+            try:
+                await asyncio.wait(waiters, timeout=self.timeout, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for waiter in waiters:
+                    waiter.cancel()
+            ready = [slot for slot in self._slots if slot.ready.is_set()]
+            if not ready:
+                raise ConnectionError(f"MCP-сервер {self.url} недоступен")
+        return min(ready, key=lambda slot: slot.inflight)
+
+    async def _request(self, method: str, *args, **kwargs):
+        slot = await self._acquire()
+        slot.inflight += 1
+        self.metrics["peak_inflight"] = max(
+            self.metrics["peak_inflight"], sum(slot.inflight for slot in self._slots)
+        )
+        try:
+            return await getattr(slot.session, method)(*args, **kwargs)
+        except McpError as e:
+            # ошибка протокола — сессия жива, кроме обрыва соединения
+            if e.error.code == types.CONNECTION_CLOSED:
+                slot.broken.set()
+            raise
+        except Exception:
+            slot.broken.set()
+            raise
+        finally:
+            slot.inflight -= 1
+
+    # === Интерфейс ClientSession для MCPTools ===
+
+    async def send_ping(self) -> types.EmptyResult:
+        """
+        agno пингует сервер перед каждым вызовом инструмента; живость
+        сессий отслеживает пул, поэтому лишний запрос не отправляется.
+        """
+        await self._acquire()
+        return types.EmptyResult()
+
+    async def call_tool(
+        self, name: str, arguments: Optional[dict[str, Any]] = None, **kwargs
+    ) -> types.CallToolResult:
+        run = _run.get()
+        if run is None:
+            return await self._call_tool(name, arguments, **kwargs)
+        async with run.slots:
+            if run.active == 0:
+                run.busy_since = time.perf_counter()
+            run.active += 1
+            run.calls += 1
+            try:
+                return await self._call_tool(name, arguments, **kwargs)
+            finally:
+                run.active -= 1
+                if run.active == 0:
+                    run.seconds += time.perf_counter() - run.busy_since
+
+    async def _call_tool(self, name: str, arguments: Optional[dict[str, Any]], **kwargs):
+        started = time.perf_counter()
+        try:
+            return await self._request("call_tool", name, arguments, **kwargs)
+        except Exception:
+            self.metrics["call_errors"] += 1
+            raise
+        finally:
+            self.metrics["calls"] += 1
+            self.metrics["call_seconds"] += time.perf_counter() - started
+
+    async def list_tools(self, cursor: Optional[str] = None, **kwargs) -> types.ListToolsResult:
+        if cursor is not None or kwargs:
+            return await self._request("list_tools", cursor, **kwargs)
+        return await self._cached("_tools", "list_tools")
+
+    async def list_prompts(self, cursor: Optional[str] = None, **kwargs) -> types.ListPromptsResult:
+        if cursor is not None or kwargs:
+            return await self._request("list_prompts", cursor, **kwargs)
+        return await self._cached("_prompts", "list_prompts")
+
+    async def _cached(self, attr: str, method: str):
+        result = getattr(self, attr)
+        if result is not None:
+            self.metrics["list_hits"] += 1
+            return result
+        async with self._list_lock:
+            result = getattr(self, attr)
+            if result is None:
+                self.metrics["list_misses"] += 1
+                result = await self._request(method)
+                setattr(self, attr, result)
+            else:
+                self.metrics["list_hits"] += 1
+            return result
+
+    # === Прогоны агента ===
+
+    def begin_run(self) -> None:
+        """
+        Pre-hook агента: заводит счётчики и лимит параллельных вызовов
+        прогона. Вызовы инструментов agno запускает из задачи прогона,
+        поэтому видят его состояние через contextvar.
+        """
+        _run.set(_RunState(asyncio.Semaphore(self.run_concurrency)))
+
+    def run_mcp_time(self) -> Optional[tuple[float, int]]:
+        """Время в MCP (секунды, без двойного счёта параллельных) и число вызовов прогона."""
+        run = _run.get()
+        return (run.seconds, run.calls) if run is not None else None
+
+    # === Уведомления сервера ===
+
+    def watch(self, toolkit) -> None:
+        """Пересобирать инструменты toolkit (MCPTools), когда сервер меняет список."""
+        self._toolkits.append(toolkit)
+
+    async def _on_message(self, message) -> None:
+        if isinstance(message, Exception):
+            log.warning("MCP: ошибка в потоке сообщений: %s", message)
+            return
+        if not isinstance(message, types.ServerNotification):
+            return
+        notification = message.root
+        if isinstance(notification, types.PromptListChangedNotification):
+            self._prompts = None
+            self.metrics["invalidations"] += 1
+        elif isinstance(notification, types.ToolListChangedNotification):
+            self._tools = None
+            self.metrics["invalidations"] += 1
+            # уведомление приходит в каждую сессию пула — пересобираем один раз
+            if self._toolkits and (self._refresh is None or self._refresh.done()):
+                self._refresh = asyncio.create_task(self._rebuild_toolkits())
+
+    async def _rebuild_toolkits(self) -> None:
+        try:
+            await self.list_tools()
+        except Exception as e:
+            log.warning("MCP: не удалось обновить список инструментов: %s", e)
+            return
+        for toolkit in self._toolkits:
+            # список уже в кеше: build_tools соберёт новые функции без ожиданий
+            functions, toolkit.functions = toolkit.functions, {}
+            try:
+                await toolkit.build_tools()
+            except Exception as e:
+                toolkit.functions = functions
+                log.warning("MCP: не удалось пересобрать инструменты: %s", e)
+        log.info("MCP: список инструментов обновлён")
+
+    def stats(self) -> dict:
+        calls = self.metrics["calls"]
+        lists = self.metrics["list_hits"] + self.metrics["list_misses"]
+        return {
+            **self.metrics,
+            "call_seconds": round(self.metrics["call_seconds"], 3),
+            "avg_call_ms": round(self.metrics["call_seconds"] / calls * 1000, 1) if calls else None,
+            "list_hit_rate": round(self.metrics["list_hits"] / lists, 3) if lists else None,
+            "sessions": self.size,
+            "ready": sum(slot.ready.is_set() for slot in self._slots),
+            "inflight": sum(slot.inflight for slot in self._slots),
+        }
@@ -0,0 +1,270 @@
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import (
+    Any,
+    Optional,
+)
+
+from mcp import types
+
+log = logging.getLogger(__name__)
+
+# Время жизни результатов читающих инструментов, секунды; остальные не кешируются.
+# email_get_email и email_get_emails не кешируются: get_email запускает предложение
+# задачи и возвращает его текущий статус
+TOOL_TTLS = {
+    "email_list_emails": 60,
+    "email_search_emails": 60,
+    "email_search_emails_by_sender": 60,
+    "email_search_emails_by_date": 60,
+    "email_get_event_suggestions": 120,
+    "calendar_list_calendars": 600,
+    "calendar_list_calendar_events": 120,
+    "calendar_find_free_slots": 60,
+    "daily_digest": 30,
+}
+
+# Инструменты с побочными эффектами → префиксы имён инструментов, чьи результаты
+# они делают устаревшими. get_email ставит предложение задачи по письму
+WRITE_INVALIDATES = {
+    "email_send_email": ("email_", "daily_digest"),
+    "email_send_emails": ("email_", "daily_digest"),
+    "email_get_email": ("email_get_event_suggestions",),
+    "calendar_create_calendar_event": ("calendar_", "email_get_event_suggestions", "daily_digest"),
+    "calendar_create_calendar_events": ("calendar_", "email_get_event_suggestions", "daily_digest"),
+    "calendar_update_calendar_event": ("calendar_", "email_get_event_suggestions", "daily_digest"),
+    "calendar_delete_calendar_events": ("calendar_", "email_get_event_suggestions", "daily_digest"),
+}
+
+# Статус элемента, который сервер ещё вычисляет в фоне (предложения задач):
+# ответ с таким элементом не кешируется, иначе опрос видел бы его до истечения TTL
+PENDING = "pending"
+
+# Аргумент «собрать заново» (daily_digest): такой вызов не читает кеш, а обновляет запись
+REFRESH_ARGUMENT = "fresh"
+
+
+def cache_key(name: str, arguments: Optional[dict[str, Any]]) -> str:
+    """Имя инструмента и аргументы без None, с упорядоченными ключами."""
+    arguments = {key: value for key, value in (arguments or {}).items() if value is not None}
+    normalized = json.dumps(arguments, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return name + ":" + hashlib.sha256(normalized.encode()).hexdigest()
+
+
+class MemoryBackend:
+    """Кеш в памяти процесса: LRU на max_entries записей."""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[str, str, float]] = OrderedDict()
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[2] <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    async def put(self, key: str, tool: str, payload: str, ttl: float) -> None:
+        self._entries[key] = (tool, payload, time.time() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def invalidate(self, tools: set[str]) -> None:
+        for key in [key for key, entry in self._entries.items() if entry[0] in tools]:
+            del self._entries[key]
+
+
+class SqliteBackend:
+    """
+    Кеш в SQLite (по умолчанию рядом с данными AgentOS в tmp/agentos.db):
+    переживает перезапуск и общий для нескольких процессов агента.
+    Запросы выполняются в потоке, чтобы не блокировать цикл событий.
+    """
+
+    TABLE = "mcp_tool_cache"
+    # раз в столько записей удаляются просроченные
+    PURGE_EVERY = 100
+
+    def __init__(self, path: str):
+        self.path = path
+        self._writes = 0
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as db:
+            db.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.TABLE} ("
+                "key TEXT PRIMARY KEY, tool TEXT NOT NULL, payload TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+            db.execute(f"CREATE INDEX IF NOT EXISTS {self.TABLE}_tool ON {self.TABLE} (tool)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    def _run(self, query: str, params: tuple = ()) -> list:
+        db = self._connect()
+        try:
+            with db:
+                return db.execute(query, params).fetchall()
+        finally:
+            db.close()
+
+    async def get(self, key: str) -> Optional[str]:
+        rows = await asyncio.to_thread(
+            self._run,
+            f"SELECT payload FROM {self.TABLE} WHERE key = ? AND expires > ?",
+            (key, time.time()),
+        )
+        return rows[0][0] if rows else None
+
+    async def put(self, key: str, tool: str, payload: str, ttl: float) -> None:
+        await asyncio.to_thread(
+            self._run,
+            f"INSERT OR REPLACE INTO {self.TABLE} (key, tool, payload, expires) VALUES (?, ?, ?, ?)",
+            (key, tool, payload, time.time() + ttl),
+        )
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            await asyncio.to_thread(
+                self._run, f"DELETE FROM {self.TABLE} WHERE expires <= ?", (time.time(),)
+            )
+
+    async def invalidate(self, tools: set[str]) -> None:
+        if not tools:
+            return
+        marks = ",".join("?" * len(tools))
+        await asyncio.to_thread(
+            self._run, f"DELETE FROM {self.TABLE} WHERE tool IN ({marks})", tuple(tools)
+        )
+
+
+class CachedToolSession:
+    """
+    Кеш результатов MCP-инструментов между сессией (McpSessionPool) и
+    MCPTools. Результаты читающих инструментов (TOOL_TTLS) хранятся по
+    имени и нормализованным аргументам; вызов пишущего инструмента
+    (WRITE_INVALIDATES) сбрасывает связанные записи. Ошибки и частичные
+    результаты (непустое поле errors, элементы в статусе pending) не
+    кешируются.
+    Остальные методы ClientSession передаются сессии как есть.
+    """
+
+    def __init__(
+        self,
+        session,
+        backend,
+        ttls: dict[str, float] = TOOL_TTLS,
+        invalidates: dict[str, tuple[str, ...]] = WRITE_INVALIDATES,
+    ):
+        self.session = session
+        self.backend = backend
+        self.ttls = ttls
+        self.invalidates = invalidates
+        # номер поколения инструмента: ответ, полученный до записи, не сохраняется после неё
+        self._generations: dict[str, int] = {}
+        self.metrics: dict[str, dict[str, int]] = {}
+
+    def __getattr__(self, name: str):
+        if name == "session":
+            raise AttributeError(name)
+        return getattr(self.session, name)
+
+    def _count(self, tool: str, event: str) -> None:
+        counters = self.metrics.setdefault(tool, {"hits": 0, "misses": 0, "invalidations": 0})
+        counters[event] += 1
+
+    async def call_tool(
+        self, name: str, arguments: Optional[dict[str, Any]] = None, **kwargs
+    ) -> types.CallToolResult:
+        if name in self.invalidates:
+            return await self._write(name, arguments, **kwargs)
+        ttl = self.ttls.get(name)
+        if not ttl:
+            return await self.session.call_tool(name, arguments, **kwargs)
+
+        refresh = bool((arguments or {}).get(REFRESH_ARGUMENT))
+        key = cache_key(
+            name,
+            {arg: value for arg, value in (arguments or {}).items() if arg != REFRESH_ARGUMENT},
+        )
+        payload = None
+        if not refresh:
+            try:
+                payload = await self.backend.get(key)
+            except Exception as e:
+                log.warning("Кеш инструментов: ошибка чтения: %s", e)
+        if payload is not None:
+            self._count(name, "hits")
+            return types.CallToolResult.model_validate_json(payload)
+
+        self._count(name, "misses")
+        generation = self._generations.get(name, 0)
+        result = await self.session.call_tool(name, arguments, **kwargs)
+        if _is_complete(result) and self._generations.get(name, 0) == generation:
+            try:
+                await self.backend.put(key, name, result.model_dump_json(), ttl)
+            except Exception as e:
+                log.warning("Кеш инструментов: ошибка записи: %s", e)
+        return result
+
+    async def _write(self, name: str, arguments: Optional[dict[str, Any]], **kwargs):
+        tools = {
+            tool
+            for tool in self.ttls
+            if any(tool.startswith(prefix) for prefix in self.invalidates[name])
+        }
+        for tool in tools:
+            self._generations[tool] = self._generations.get(tool, 0) + 1
+        try:
+            return await self.session.call_tool(name, arguments, **kwargs)
+        finally:
+            # и после ошибки: запись могла частично выполниться
+            try:
+                await self.backend.invalidate(tools)
+            except Exception as e:
+                log.warning("Кеш инструментов: ошибка сброса: %s", e)
+            for tool in tools:
+                self._count(tool, "invalidations")
+
+    def stats(self) -> dict:
+        hits = sum(counters["hits"] for counters in self.metrics.values())
+        misses = sum(counters["misses"] for counters in self.metrics.values())
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else None,
+            "tools": {
+                tool: {
+                    **counters,
+                    "hit_rate": round(counters["hits"] / lookups, 3) if lookups else None,
+                }
+                for tool, counters in self.metrics.items()
+                for lookups in [counters["hits"] + counters["misses"]]
+            },
+        }
+
+
+def _is_complete(result: types.CallToolResult) -> bool:
+    """
+    Не ошибка и не частичный результат: сервер перечисляет сбои в поле
+    errors, а ещё не готовые элементы списков помечает статусом pending.
+    """
+    data = result.structuredContent or {}
+    if result.isError or data.get("errors"):
+        return False
+    return not any(
+        isinstance(item, dict) and item.get("status") == PENDING
+        for value in data.values()
+        if isinstance(value, list)
+        for item in value
+    )
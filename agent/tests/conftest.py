@@ -0,0 +1,71 @@
+# tests/conftest.py
+import asyncio
+import socket
+
+import pytest
+import uvicorn
+from mcp.server.fastmcp import FastMCP
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class McpServer:
+    """Локальный MCP-сервер (streamable-http) с инструментами echo и slow."""
+
+    def __init__(self):
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}/mcp"
+        self.calls = []
+        # одновременно выполняемые вызовы slow: сейчас и максимум
+        self.running = 0
+        self.peak = 0
+        self._server = None
+        self._task = None
+
+    def app(self):
+        mcp = FastMCP("TestServer")
+
+        @mcp.tool()
+        async def echo(text: str) -> str:
+            self.calls.append(("echo", text))
+            return text
+
+        @mcp.tool()
+        async def slow(seconds: float) -> str:
+            self.calls.append(("slow", seconds))
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                self.running -= 1
+            return "done"
+
+        return mcp.streamable_http_app()
+
+    async def start(self) -> None:
+        config = uvicorn.Config(self.app(), host="127.0.0.1", port=self.port, log_level="error")
+        self._server = uvicorn.Server(config)
+        self._task = asyncio.create_task(self._server.serve())
+        while not self._server.started:
+            await asyncio.sleep(0.01)
+
+    async def stop(self) -> None:
+        self._server.should_exit = True
+        # открытые SSE-потоки клиентов не дают завершиться штатно
+        self._server.force_exit = True
+        await self._task
+
+
+@pytest.fixture
+async def mcp_server():
+    """Запущенный McpServer; тест может остановить и снова запустить его."""
+    server = McpServer()
+    await server.start()
+    yield server
+    if not server._task.done():
+        await server.stop()
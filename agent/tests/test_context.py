@@ -0,0 +1,102 @@
+# tests/test_context.py
+import json
+
+from agno.models.message import Message
+from agno.run.agent import RunOutput
+
+from src.context import (
+    OMITTED,
+    ContextCompactor,
+    _cut_longest_list,
+)
+
+EMAILS = {
+    "emails": [
+        {
+            "uid": str(uid),
+            "from": "alexey@example.com",
+            "subject": f"Отчёт {uid}",
+            "date": "Mon, 6 Oct 2025 10:00:00 +0300",
+            "body": "Текст письма " * 200,
+        }
+        for uid in range(30)
+    ]
+}
+
+
+def _tool(content: str, tool_name: str = "email_list_emails", **kwargs) -> Message:
+    return Message(role="tool", content=content, tool_name=tool_name, **kwargs)
+
+
+def test_compact_fits_budget_and_keeps_key_fields():
+    compactor = ContextCompactor(token_budget=800)
+    text = json.dumps(EMAILS, ensure_ascii=False, indent=2)
+
+    compact = compactor.compact(text)
+
+    assert compactor.tokens(compact) <= 800
+    data = json.loads(compact)
+    emails = [email for email in data["emails"] if isinstance(email, dict)]
+    # тела обрезаны, поля для инструкций агента — целиком
+    assert all(len(email["body"]) < len(EMAILS["emails"][0]["body"]) for email in emails)
+    assert emails[0]["subject"] == "Отчёт 0"
+    assert emails[0]["date"] == EMAILS["emails"][0]["date"]
+    # укороченный список кончается маркером с числом опущенных писем
+    assert data["emails"][-1] == f"{OMITTED}{30 - len(emails)}"
+
+
+def test_compact_leaves_small_results_and_truncates_plain_text():
+    compactor = ContextCompactor(token_budget=100)
+    assert compactor.compact('{"uid": "1",  "subject": "Привет"}') == '{"uid":"1","subject":"Привет"}'
+    assert compactor.compact("короткий ответ") == "короткий ответ"
+
+    compact = compactor.compact("x" * 1000)
+    assert compact.startswith("x" * 300) and compact.endswith("[обрезано 700 симв.]")
+
+
+def test_cut_longest_list_accumulates_omitted_count():
+    data = {"events": list(range(8)), "tags": ["a", "b"]}
+
+    assert _cut_longest_list(data)
+    assert data["events"] == [0, 1, 2, 3, 4, 5, f"{OMITTED}2"]
+    # маркер не считается элементом, а число опущенных суммируется
+    assert _cut_longest_list(data)
+    assert data["events"] == [0, 1, 2, 3, f"{OMITTED}4"]
+    while _cut_longest_list(data):
+        pass
+    assert data == {"events": [0, f"{OMITTED}7"], "tags": ["a", f"{OMITTED}1"]}
+
+
+def test_compress_replaces_earlier_duplicates_with_reference():
+    compactor = ContextCompactor(token_budget=800)
+    result = json.dumps({"emails": [{"uid": "1", "subject": "Отчёт"}]}, ensure_ascii=False)
+    earlier = _tool(result, from_history=True)
+    other = _tool(result, tool_name="email_search_emails")
+    latest = _tool(result)
+
+    compactor.compress([Message(role="user", content="Что нового?"), earlier, other, latest])
+
+    assert earlier.compressed_content.startswith("[повтор")
+    assert json.loads(latest.compressed_content) == json.loads(result)
+    assert other.compressed_content == latest.compressed_content
+    assert compactor.stats == {"deduplicated": 1, "compacted": 2}
+
+
+def test_post_hook_counts_only_this_run():
+    compactor = ContextCompactor(token_budget=800)
+    text = json.dumps(EMAILS, ensure_ascii=False)
+    history = _tool(text, from_history=True)
+    current = _tool(text.replace("Отчёт", "План"))
+    compactor.compress([history, current])
+    run = RunOutput(run_id="run-1", messages=[history, current])
+
+    compactor.post_hook(run)
+
+    report = run.metadata["context"]
+    assert report["tool_tokens"] == compactor.tokens(current.content)
+    assert report["tool_tokens_sent"] == compactor.tokens(current.compressed_content)
+    assert compactor.report()["runs"] == 1
+
+    # прогон, где результаты инструментов только из истории, не учитывается
+    compactor.post_hook(RunOutput(run_id="run-2", messages=[history]))
+    assert compactor.report()["runs"] == 1
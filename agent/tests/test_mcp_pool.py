@@ -0,0 +1,77 @@
+# tests/test_mcp_pool.py
+import asyncio
+
+from mcp import types
+
+from src import mcp_pool
+from src.mcp_pool import McpSessionPool
+
+
+async def test_pool_caches_tool_list_and_spreads_calls(mcp_server):
+    pool = McpSessionPool(mcp_server.url, size=2, timeout=5)
+    await pool.initialize()
+    try:
+        first = await pool.list_tools()
+        assert {tool.name for tool in first.tools} == {"echo", "slow"}
+        assert await pool.list_tools() is first
+
+        # пинг agno перед вызовом не уходит на сервер
+        assert isinstance(await pool.send_ping(), types.EmptyResult)
+
+        results = await asyncio.gather(
+            *(pool.call_tool("slow", {"seconds": 0.1}) for _ in range(4))
+        )
+        assert all(result.content[0].text == "done" for result in results)
+        stats = pool.stats()
+        assert stats["ready"] == 2
+        assert stats["calls"] == 4
+        assert stats["peak_inflight"] == 4
+        assert (stats["list_hits"], stats["list_misses"]) == (1, 1)
+    finally:
+        await pool.close()
+
+
+async def test_pool_reconnects_after_server_restart(mcp_server, monkeypatch):
+    monkeypatch.setattr(mcp_pool, "RECONNECT_DELAY", 0.05)
+    pool = McpSessionPool(mcp_server.url, size=1, timeout=2)
+    await pool.initialize()
+    try:
+        result = await pool.call_tool("echo", {"text": "до"})
+        assert result.content[0].text == "до"
+
+        await mcp_server.stop()
+        # вызов через разорванную сессию падает и помечает её сломанной
+        try:
+            await pool.call_tool("echo", {"text": "обрыв"})
+        except Exception:
+            pass
+        await mcp_server.start()
+
+        result = await pool.call_tool("echo", {"text": "после"})
+        assert result.content[0].text == "после"
+        stats = pool.stats()
+        assert stats["connects"] >= 2
+        assert stats["disconnects"] >= 1
+    finally:
+        await pool.close()
+
+
+async def test_run_concurrency_and_mcp_time(mcp_server):
+    pool = McpSessionPool(mcp_server.url, size=2, timeout=5, run_concurrency=2)
+    await pool.initialize()
+
+    async def run():
+        pool.begin_run()
+        await asyncio.gather(*(pool.call_tool("slow", {"seconds": 0.2}) for _ in range(4)))
+        return pool.run_mcp_time()
+
+    try:
+        seconds, calls = await asyncio.create_task(run())
+        assert calls == 4
+        assert mcp_server.peak == 2
+        # время прогона в MCP — две волны по 0.2 с, параллельные вызовы не суммируются
+        assert 0.4 <= seconds < 0.8
+        # вне прогона счётчиков нет
+        assert pool.run_mcp_time() is None
+    finally:
+        await pool.close()
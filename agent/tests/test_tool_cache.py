@@ -0,0 +1,167 @@
+# tests/test_tool_cache.py
+import asyncio
+import time
+
+from mcp import types
+
+from src.tool_cache import (
+    CachedToolSession,
+    MemoryBackend,
+    SqliteBackend,
+    cache_key,
+)
+
+
+class FakeSession:
+    """ClientSession с заранее заданными ответами; записывает вызовы."""
+
+    def __init__(self):
+        self.calls = []
+        self.errors = {}
+        self.delay = 0.0
+
+    async def call_tool(self, name, arguments=None, **kwargs):
+        self.calls.append((name, arguments))
+        await asyncio.sleep(self.delay)
+        data = {"tool": name, "call": len(self.calls), "errors": self.errors.get(name, {})}
+        return types.CallToolResult(
+            content=[types.TextContent(type="text", text=str(data))],
+            structuredContent=data,
+        )
+
+    async def list_prompts(self):
+        return "prompts"
+
+
+def _cached(session, **kwargs) -> CachedToolSession:
+    return CachedToolSession(
+        session,
+        MemoryBackend(),
+        ttls={"email_list_emails": 60, "calendar_list_calendar_events": 60, "daily_digest": 30},
+        invalidates={"calendar_create_calendar_event": ("calendar_", "daily_digest")},
+        **kwargs,
+    )
+
+
+def test_cache_key_ignores_none_and_argument_order():
+    assert cache_key("t", {"a": 1, "b": None, "c": "x"}) == cache_key("t", {"c": "x", "a": 1})
+    assert cache_key("t", None) == cache_key("t", {})
+    assert cache_key("t", {"a": 1}) != cache_key("t", {"a": 2})
+    assert cache_key("t", {"a": 1}) != cache_key("u", {"a": 1})
+
+
+async def test_reads_are_cached_and_writes_invalidate_by_prefix():
+    session = FakeSession()
+    cached = _cached(session)
+
+    first = await cached.call_tool("email_list_emails", {"limit": 5})
+    assert await cached.call_tool("email_list_emails", {"limit": 5, "x": None}) == first
+    await cached.call_tool("calendar_list_calendar_events", {})
+    await cached.call_tool("daily_digest", {})
+    assert len(session.calls) == 3
+
+    await cached.call_tool("calendar_create_calendar_event", {"summary": "Созвон"})
+    await cached.call_tool("email_list_emails", {"limit": 5})
+    await cached.call_tool("calendar_list_calendar_events", {})
+    await cached.call_tool("daily_digest", {})
+    # сброшены только события и сводка, почта осталась в кеше
+    assert [name for name, _ in session.calls[4:]] == [
+        "calendar_list_calendar_events",
+        "daily_digest",
+    ]
+    stats = cached.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 5)
+    assert stats["tools"]["daily_digest"]["invalidations"] == 1
+    # остальные методы ClientSession проходят насквозь
+    assert await cached.list_prompts() == "prompts"
+
+
+async def test_result_received_before_write_is_not_stored():
+    session = FakeSession()
+    cached = _cached(session)
+    session.delay = 0.05
+
+    read = asyncio.create_task(cached.call_tool("calendar_list_calendar_events", {}))
+    await asyncio.sleep(0.01)
+    await cached.call_tool("calendar_create_calendar_event", {})
+    await read
+    session.delay = 0.0
+
+    await cached.call_tool("calendar_list_calendar_events", {})
+    assert [name for name, _ in session.calls].count("calendar_list_calendar_events") == 2
+
+
+async def test_partial_and_fresh_digests_bypass_cache():
+    session = FakeSession()
+    cached = _cached(session)
+
+    session.errors["daily_digest"] = {"calendar": "CalDAV недоступен"}
+    await cached.call_tool("daily_digest", {})
+    session.errors.clear()
+    await cached.call_tool("daily_digest", {})
+    assert len(session.calls) == 2
+
+    # fresh не входит в ключ: fresh=false читает ту же запись, fresh=true обновляет её
+    await cached.call_tool("daily_digest", {"fresh": False})
+    assert len(session.calls) == 2
+    refreshed = await cached.call_tool("daily_digest", {"fresh": True})
+    assert len(session.calls) == 3
+    assert await cached.call_tool("daily_digest", {}) == refreshed
+
+
+async def test_pending_suggestions_are_not_cached():
+    class Suggestions(FakeSession):
+        async def call_tool(self, name, arguments=None, **kwargs):
+            self.calls.append((name, arguments))
+            status = "pending" if len(self.calls) == 1 else "done"
+            return types.CallToolResult(
+                content=[types.TextContent(type="text", text=status)],
+                structuredContent={"suggestions": [{"uid": "7", "status": status}]},
+            )
+
+    session = Suggestions()
+    cached = CachedToolSession(session, MemoryBackend())
+    arguments = {"uids": ["7"]}
+
+    first = await cached.call_tool("email_get_event_suggestions", arguments)
+    assert first.structuredContent["suggestions"][0]["status"] == "pending"
+    # опрос доходит до сервера, пока предложение не готово, а готовое — из кеша
+    for _ in range(2):
+        ready = await cached.call_tool("email_get_event_suggestions", arguments)
+        assert ready.structuredContent["suggestions"][0]["status"] == "done"
+    assert len(session.calls) == 2
+
+    # новое чтение письма ставит предложение — кеш предложений сбрасывается
+    await cached.call_tool("email_get_email", {"uid": "7"})
+    await cached.call_tool("email_get_event_suggestions", arguments)
+    assert len(session.calls) == 4
+
+
+async def test_memory_backend_expires_and_evicts():
+    backend = MemoryBackend(max_entries=2)
+    await backend.put("a", "t", "1", ttl=60)
+    await backend.put("b", "t", "2", ttl=0.01)
+    await asyncio.sleep(0.02)
+    assert await backend.get("b") is None
+
+    await backend.put("c", "u", "3", ttl=60)
+    await backend.put("d", "u", "4", ttl=60)
+    assert await backend.get("a") is None
+    await backend.invalidate({"u"})
+    assert await backend.get("c") is None and await backend.get("d") is None
+
+
+async def test_sqlite_backend_survives_reopen_and_expires(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache" / "agentos.db")
+    backend = SqliteBackend(path)
+    await backend.put("a", "email_list_emails", "payload", ttl=60)
+    await backend.put("b", "daily_digest", "digest", ttl=60)
+
+    reopened = SqliteBackend(path)
+    assert await reopened.get("a") == "payload"
+    await reopened.invalidate({"daily_digest"})
+    assert await reopened.get("b") is None
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert await reopened.get("a") is None
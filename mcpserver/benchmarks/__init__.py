@@ -0,0 +1,23 @@
+"""
+Бенчмарки модулей сервера. Модули импортируют `src`, который читает
+конфигурацию при импорте, поэтому для запуска без .env задаются значения
+по умолчанию.
+"""
+
+import os
+
+for key, value in {
+    "EMAIL_ADDRESS": "bench@example.com",
+    "EMAIL_PASSWORD": "bench",
+    "SMTP_HOST": "127.0.0.1",
+    "SMTP_PORT": "25",
+    "IMAP_HOST": "127.0.0.1",
+    "IMAP_PORT": "143",
+    "CALDAV_URL": "http://127.0.0.1",
+    "CALDAV_USERNAME": "bench",
+    "CALDAV_PASSWORD": "bench",
+    "CALDAV_CALENDAR_NAME": "bench",
+    "MCP_HOST": "127.0.0.1",
+    "MCP_PORT": "8000",
+}.items():
+    os.environ.setdefault(key, value)
@@ -0,0 +1,135 @@
+"""
+Бенчмарк списка событий календаря на 10–50 тыс. событий: прежний путь
+(разбор всех событий окна через vobject, срез events[:limit] без
+сортировки) против локального хранилища (построчный разбор при
+синхронизации, индекс интервалов, обход до limit). Проверяет, что оба
+разбора дают одинаковые события.
+
+    uv run python -m benchmarks.bench_calendar
+"""
+
+import asyncio
+import random
+import time
+from datetime import (
+    datetime,
+    timedelta,
+)
+
+import vobject
+
+from src.core.calendar.store import (
+    DEFAULT_TZ,
+    EventStore,
+    _parse_event,
+)
+
+SIZES = (10_000, 50_000)
+WINDOW = timedelta(days=7)
+LIMIT = 10
+QUERIES = 50
+START = datetime(2025, 1, 1, tzinfo=DEFAULT_TZ)
+SPAN = timedelta(days=730)
+
+
+def build_calendar(size: int, seed: int = 42) -> dict[str, str]:
+    """{href: ics} — встречи от 15 минут до 3 часов, изредка на несколько дней."""
+    rnd = random.Random(seed)
+    events = {}
+    for i in range(size):
+        start = START + timedelta(minutes=15 * rnd.randrange(int(SPAN.total_seconds() // 900)))
+        if rnd.random() < 0.01:
+            end = start + timedelta(days=3)
+        else:
+            end = start + timedelta(minutes=15 * rnd.randint(1, 12))
+        events[f"/calendars/user/0/ev{i}.ics"] = (
+            "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//bench//EN\r\nBEGIN:VEVENT\r\n"
+            f"UID:ev{i}\r\nSUMMARY:Встреча {i}\r\n"
+            f"DESCRIPTION:Обсуждение задачи {i}\\, повестка в трекере\r\n"
+            f"LOCATION:Переговорная {i % 12}\r\n"
+            f"DTSTART;TZID=Europe/Moscow:{start.strftime('%Y%m%dT%H%M%S')}\r\n"
+            f"DTEND;TZID=Europe/Moscow:{end.strftime('%Y%m%dT%H%M%S')}\r\n"
+            "BEGIN:VALARM\r\nACTION:DISPLAY\r\nTRIGGER:-PT10M\r\nEND:VALARM\r\n"
+            "END:VEVENT\r\nEND:VCALENDAR\r\n"
+        )
+    return events
+
+
+def vobject_span(ics: str) -> tuple[str, int, int]:
+    vevent = vobject.readOne(ics).vevent
+    return (
+        str(vevent.uid.value),
+        int(vevent.dtstart.value.timestamp()),
+        int(vevent.dtend.value.timestamp()),
+    )
+
+
+def legacy_list(calendar: dict[str, str], spans: dict[str, tuple], start, end) -> list:
+    """
+    Прежний list_calendar_events: сервер (date_search) отдаёт все события
+    окна в произвольном порядке, каждое разбирается vobject, затем срез.
+    """
+    in_window = [href for href, (_, a, b) in spans.items() if a < end and b > start]
+    events = [vobject.readOne(calendar[href]) for href in in_window]
+    return [ev.vevent for ev in events[:LIMIT]]
+
+
+def build_store(calendar: dict[str, str]) -> EventStore:
+    store = EventStore(calendar=None, max_staleness=float("inf"))
+    for href, ics in calendar.items():
+        store.upsert(_parse_event(href, None, ics))
+    store.synced_at = time.monotonic()
+    return store
+
+
+def _ms(started: float, count: int = 1) -> float:
+    return (time.perf_counter() - started) / count * 1000
+
+
+async def main() -> None:
+    print(
+        f"{'events':>7} | {'vobject, ms':>12} {'lines, ms':>10} | "
+        f"{'legacy list, ms':>15} {'store list, ms':>14} {'speedup':>8}"
+    )
+    for size in SIZES:
+        calendar = build_calendar(size)
+
+        started = time.perf_counter()
+        spans = {href: vobject_span(ics) for href, ics in calendar.items()}
+        vobject_ms = _ms(started)
+
+        started = time.perf_counter()
+        store = build_store(calendar)
+        lines_ms = _ms(started)
+
+        mismatches = sum(
+            (event.uid, event.start, event.end) != spans[event.href]
+            for event in store._events.values()
+        )
+        assert mismatches == 0, f"расхождений разбора: {mismatches}"
+
+        rnd = random.Random(size)
+        windows = []
+        for _ in range(QUERIES):
+            start = START + timedelta(days=rnd.randrange(SPAN.days - 7))
+            windows.append((start, start + WINDOW))
+
+        started = time.perf_counter()
+        for start, end in windows:
+            legacy_list(calendar, spans, start.timestamp(), end.timestamp())
+        legacy_ms = _ms(started, QUERIES)
+
+        started = time.perf_counter()
+        for start, end in windows:
+            events, _ = await store.events_page(start, end, LIMIT)
+            [event.to_dict() for event in events]
+        store_ms = _ms(started, QUERIES)
+
+        print(
+            f"{size:>7} | {vobject_ms:>12.0f} {lines_ms:>10.0f} | "
+            f"{legacy_ms:>15.2f} {store_ms:>14.3f} {legacy_ms / store_ms:>7.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,145 @@
+"""
+Бенчмарк очистки текста письма: прежний конвейер из ~15 re.sub против
+однопроходного _clean_email_body. Проверяет совпадение результатов на
+корпусе писем (HTML → html2text) и время на «враждебных» входах.
+
+    uv run python -m benchmarks.bench_clean
+"""
+
+import random
+import re
+import time
+
+from html2text import html2text
+
+from src.core.email.cleaner import _clean_email_body
+
+CORPUS_SIZE = 300
+REPEAT = 5
+
+GREETINGS = ["Привет", "Добрый день, коллеги!", "Hello team,", "Здравствуйте"]
+SENTENCES = [
+    "Отправляю отчёт по проекту за ноябрь, посмотрите, пожалуйста.",
+    "Встреча переносится на четверг, 11:00, переговорная 3.",
+    "Please review the attached document before Friday.",
+    "Ссылка на задачу: https://tracker.example.com/issue/PRJ-1234?from=mail&utm_source=digest",
+    "Трекинг: https://click.example.com/c/{uuid}?u={uuid}&f=0&id=42",
+    "Напишите мне на <a href='mailto:ivan@example.com'>ivan@example.com</a>.",
+    "Вопросы — в чат <ops-team@example.com> или по телефону.",
+    "Бюджет согласован, осталось подписать договор.",
+    "Итоги 04.12.2025, 15:15 — смотрите ниже в таблице.",
+    "Картинка: <img src='https://cdn.example.com/{uuid}.png' alt=''> в теле.",
+]
+SIGNATURES = ["Спасибо", "С уважением, Иван", "--<br>Best regards,<br>Anna"]
+
+
+def legacy_clean_email_body(body: str) -> str:
+    """
+    Прежняя реализация _clean_email_body. Единственное отличие от исходной —
+    класс разделителей `[-–=\\\\]`: в оригинале `[\\\\-–=]` задавал диапазон
+    от '\\\\' до '–' и удалял любые строки из одного слова («Спасибо»).
+    """
+    body = re.sub(r"!\$$[^$$]*\$$\s*$$[^)]*\)", "", body, flags=re.DOTALL)
+    body = re.sub(r"!\$$[^)]*\)", "", body, flags=re.DOTALL)
+    body = re.sub(r"!\$$\s*\$$", "", body)
+    body = re.sub(r"<$$$[^$$]*$$\([^)]*\)>", "", body, flags=re.DOTALL)
+    body = re.sub(r"$$$[^$$]*$$\([^)]*mailto:[^)]*\)", "", body, flags=re.DOTALL)
+    body = re.sub(r"$$$[^$$]*$$\([^)]*\)", "", body, flags=re.DOTALL)
+    body = re.sub(r"<[^>]*@[^>]*>", "", body)
+    body = re.sub(
+        r"(?i)^\s*(Кому|Тема|From|To|Date|Sent):.*$", "", body, flags=re.MULTILINE
+    )
+    body = re.sub(r"\d{2}\.\d{2}\.\d{4},\s*\d{2}:\d{2}.*", "", body)
+    body = re.sub(r"^\s*[-–=\\]{3,}\s*$", "", body, flags=re.MULTILINE)
+    body = re.sub(
+        r"[a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12}", "", body
+    )
+    body = re.sub(r"&[a-z0-9]+=[^&\s]*", "", body, flags=re.IGNORECASE)
+    body = re.sub(r"https?://[^\s)]*", "", body)
+    lines = [line.strip() for line in body.splitlines() if line.strip()]
+    clean_lines = []
+    for line in lines:
+        if re.search(
+            r"(написал|:.*<.*@.*>|^\d{2}\.\d{2}\.\d{4}|>.*$)", line, re.IGNORECASE
+        ):
+            break
+        clean_lines.append(line)
+    result = "\n".join(clean_lines)
+    result = re.sub(r"\s{2,}", " ", result)
+    result = re.sub(r"\s*\n\s*", "\n", result).strip()
+    return result
+
+
+def _uuid(rnd: random.Random) -> str:
+    return "-".join(
+        "".join(rnd.choice("0123456789abcdef") for _ in range(n)) for n in (8, 4, 4, 4, 12)
+    )
+
+
+def build_corpus(size: int = CORPUS_SIZE, seed: int = 42) -> list[str]:
+    """Письма, похожие на реальные: HTML с цитатами и пересылками → html2text."""
+    rnd = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        paragraphs = [rnd.choice(GREETINGS)]
+        for _ in range(rnd.randint(2, 12)):
+            sentence = rnd.choice(SENTENCES).replace("{uuid}", _uuid(rnd))
+            paragraphs.append(sentence)
+        if rnd.random() < 0.5:
+            paragraphs.append("<hr>")
+        paragraphs.append(rnd.choice(SIGNATURES))
+        html = "".join(f"<p>{p}</p>" for p in paragraphs)
+        if rnd.random() < 0.3:
+            html += (
+                "<p>-------- Пересылаемое сообщение --------</p>"
+                "<p>From: Пётр &lt;petr@example.com&gt;<br>Date: 03.12.2025, 10:00<br>"
+                "Тема: Отчёт</p><p>Старое письмо</p>"
+            )
+        if rnd.random() < 0.5:
+            quoted = "".join(f"<p>{rnd.choice(SENTENCES)}</p>" for _ in range(20))
+            html += (
+                "<p>04.12.2025, 15:15, Иван &lt;ivan@example.com&gt; написал:</p>"
+                f"<blockquote>{quoted}</blockquote>"
+            )
+        corpus.append(html2text(html).strip())
+    return corpus
+
+
+# Размеры подобраны так, чтобы прежняя реализация укладывалась в секунды:
+# её время растёт квадратично, а на ':<@' — как четвёртая степень длины
+ADVERSARIAL = {
+    "'<' без '>'": "<" * 20_000,
+    "':<@' без '>'": ":<@" * 200,
+    "пустые строки": "\n" * 5_000 + "x",
+}
+
+
+def _timeit(func, texts: list[str], repeat: int = REPEAT) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            func(text)
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main() -> None:
+    corpus = build_corpus()
+    mismatches = [
+        text for text in corpus if legacy_clean_email_body(text) != _clean_email_body(text)
+    ]
+    size_kb = sum(len(text) for text in corpus) // 1024
+    print(f"Корпус: {len(corpus)} писем, {size_kb} KB; расхождений: {len(mismatches)}")
+
+    legacy_ms = _timeit(legacy_clean_email_body, corpus)
+    new_ms = _timeit(_clean_email_body, corpus)
+    print(f"{'':<16} {'legacy, ms':>12} {'new, ms':>10} {'speedup':>8}")
+    print(f"{'корпус':<16} {legacy_ms:>12.1f} {new_ms:>10.1f} {legacy_ms / new_ms:>7.1f}x")
+
+    for name, text in ADVERSARIAL.items():
+        legacy_ms = _timeit(legacy_clean_email_body, [text], repeat=1)
+        new_ms = _timeit(_clean_email_body, [text], repeat=1)
+        print(f"{name:<16} {legacy_ms:>12.1f} {new_ms:>10.1f} {legacy_ms / new_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Бенчмарк списка писем: RFC822 на каждое письмо против одного UID FETCH
+только по заголовкам. Работает против локального IMAP-сервера из aioimaplib.
+
+    uv run python -m benchmarks.bench_fetch
+"""
+
+import asyncio
+import email as email_lib
+import time
+
+from aioimaplib.imap_testing_server import (
+    Mail,
+    MockImapServer,
+)
+
+from src.core.email.pool import ImapPool
+from src.core.email.utils import (
+    _decode_mime_words,
+    _fetch_headers,
+)
+
+USER = "bench@example.com"
+MAILBOX_SIZE = 60
+BODY_SIZE = 256 * 1024
+LIMITS = (1, 5, 10, 25, 50)
+
+
+async def legacy_fetch(client, limit: int) -> list:
+    "прежняя реализация _fetch_emails: FETCH (RFC822) на каждое письмо"
+    _, data = await client.search("ALL")
+    ids = data[0].split()[-limit:] if data[0] else []
+    emails = []
+    for uid in ids:
+        _, msg_data = await client.fetch(uid.decode(), "(RFC822)")
+        parsed = email_lib.message_from_bytes(msg_data[1])
+        emails.append(
+            {
+                "from": _decode_mime_words(parsed.get("From", "")),
+                "subject": _decode_mime_words(parsed.get("Subject", "")),
+                "date": parsed.get("Date", ""),
+            }
+        )
+    return emails
+
+
+async def batched_fetch(client, limit: int) -> list:
+    _, data = await client.uid_search("ALL")
+    uids = data[0].split()[-limit:] if data[0] else []
+    return await _fetch_headers(client, uids)
+
+
+async def measure(session, fetch, limit: int) -> tuple:
+    protocol = session.client.protocol
+    received = 0
+    data_received = protocol.data_received
+
+    def counting(data):
+        nonlocal received
+        received += len(data)
+        data_received(data)
+
+    protocol.data_received = counting
+    try:
+        started = time.perf_counter()
+        emails = await fetch(session.client, limit)
+        elapsed = time.perf_counter() - started
+    finally:
+        protocol.data_received = data_received
+    assert len(emails) == limit
+    return received, elapsed
+
+
+async def main():
+    server = MockImapServer(loop=asyncio.get_running_loop())
+    srv = await server.run_server(host="127.0.0.1", port=0)
+    port = srv.sockets[0].getsockname()[1]
+    for i in range(MAILBOX_SIZE):
+        mail = Mail.create(
+            [USER], mail_from="sender@example.com", subject=f"Письмо {i}",
+            content="x" * BODY_SIZE,
+        )
+        server.receive(mail, imap_user=USER)
+
+    pool = ImapPool("127.0.0.1", port, USER, "bench", size=1, use_ssl=False)
+    print(f"{'limit':>5} | {'legacy KB':>10} {'ms':>8} | {'batched KB':>10} {'ms':>8}")
+    try:
+        async with pool.session() as session:
+            for limit in LIMITS:
+                legacy_bytes, legacy_time = await measure(session, legacy_fetch, limit)
+                batched_bytes, batched_time = await measure(
+                    session, batched_fetch, limit
+                )
+                print(
+                    f"{limit:>5} | {legacy_bytes / 1024:>10.1f} {legacy_time * 1000:>8.1f}"
+                    f" | {batched_bytes / 1024:>10.1f} {batched_time * 1000:>8.1f}"
+                )
+    finally:
+        await pool.close()
+        srv.close()
+        await srv.wait_closed()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
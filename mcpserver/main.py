@@ -2,6 +2,11 @@ from fastmcp import FastMCP
 
 from src.core.email import create_email_module
 from src.core.calendar import create_calendar_module
+from src.core.digest import (
+    DailyDigest,
+    setup_digest,
+)
+from src.core.subscriptions import subscriptions
 from src.config import Config
 
 
@@ -10,8 +15,11 @@ config = Config.load()
 
 def create_app() -> FastMCP:
     mcp = FastMCP("UnifiedEmailCalendarMCP")
-    mcp.mount(create_email_module(), prefix="email")
-    mcp.mount(create_calendar_module(), prefix="calendar")
+    mcp.mount(create_email_module(), prefix="email", as_proxy=False)
+    mcp.mount(create_calendar_module(), prefix="calendar", as_proxy=False)
+    # сводка дня читает ресурсы обоих модулей
+    setup_digest(mcp, DailyDigest(ttl=config.mcp.DIGEST_TTL))
+    subscriptions.install(mcp)
     return mcp
 
 
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import Field
 from pydantic_settings import (
     BaseSettings,
@@ -16,8 +18,42 @@ class EmailСonfig(ConfigBase):
     EMAIL_PASSWORD: str
     SMTP_HOST: str
     SMTP_PORT: int
+    SMTP_SSL: bool = True
+    SMTP_TIMEOUT: float = 10.0
+    SMTP_CONNECTIONS: int = 1
+    SMTP_RATE_LIMIT: float = 0.0
+    SMTP_RETRIES: int = 3
+    SMTP_RETRY_BACKOFF: float = 1.0
+    OUTBOX_PATH: str = "tmp/outbox.db"
+    OUTBOX_MAX_ATTEMPTS: int = 5
+    OUTBOX_RETRY_BACKOFF: float = 30.0
+    OUTBOX_POLL_INTERVAL: float = 5.0
     IMAP_HOST: str
     IMAP_PORT: int
+    IMAP_SSL: bool = True
+    IMAP_TIMEOUT: float = 10.0
+    IMAP_POOL_SIZE: int = 4
+    IMAP_POOL_NOOP_INTERVAL: float = 30.0
+    IMAP_POOL_MAX_IDLE: float = 600.0
+    MAIL_INDEX_PATH: str = "tmp/mail_index.db"
+    MAIL_INDEX_STALE_AFTER: float = 60.0
+    MAIL_INDEX_SYNC_INTERVAL: float = 300.0
+    MAIL_INDEX_BODY_BYTES: int = 65536
+    INBOX_WATCH_ENABLED: bool = True
+    INBOX_IDLE_TIMEOUT: float = 300.0
+    INBOX_POLL_INTERVAL: float = 30.0
+    EMAIL_BODY_MAX_BYTES: int = 65536
+    PARSE_EXECUTOR: Literal["thread", "process"] = "thread"
+    PARSE_WORKERS: int = 4
+    PARSE_MAX_PENDING: int = 64
+    MESSAGE_CACHE_MAX_BYTES: int = 8 * 1024 * 1024
+    MESSAGE_CACHE_DISK_PATH: str = ""
+    MESSAGE_CACHE_DISK_MAX_BYTES: int = 64 * 1024 * 1024
+    EVENT_SUGGESTIONS_ENABLED: bool = True
+    EVENT_SUGGESTION_PROMPT: str = "calendar_generate_event_from_email"
+    EVENT_SUGGESTIONS_CONCURRENCY: int = 2
+    EVENT_SUGGESTIONS_MAX_PENDING: int = 32
+    EVENT_SUGGESTIONS_CACHE_SIZE: int = 1024
 
 
 class CalDavСonfig(ConfigBase):
@@ -25,11 +61,19 @@ class CalDavСonfig(ConfigBase):
     CALDAV_USERNAME: str
     CALDAV_PASSWORD: str
     CALDAV_CALENDAR_NAME: str
+    CALDAV_SESSION_TTL: float = 900.0
+    CALDAV_MAX_FAILURES: int = 3
+    CALDAV_POOL_SIZE: int = 8
+    CALDAV_TIMEOUT: float = 30.0
+    CALDAV_MAX_STALENESS: float = 60.0
+    CALDAV_WRITE_CONCURRENCY: int = 4
+    CALDAV_TIMEZONE: str = "Europe/Moscow"
 
 
 class McpServerConfig(ConfigBase):
     MCP_HOST: str
     MCP_PORT: int
+    DIGEST_TTL: float = 30.0
 
 
 class Config(BaseSettings):
@@ -1,57 +1,79 @@
 # src/core/calendar/__init__.py
 
-import aiocaldav
+from contextlib import asynccontextmanager
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+import anyio
 from aiocaldav import Calendar
 from src.config import Config
 from fastmcp import FastMCP
 
 from .prompts import setup_prompts
 from .resources import setup_resources
+from .session import CalendarSession
+from .store import EventStore
 from .tools import setup_tools
 
-_client = None
-_calendar = None
+_session = None
+_stores: dict[str, EventStore] = {}
 config = Config.load()
 
 
-async def _get_calendar():
+def _get_calendar_session() -> CalendarSession:
+    "подключение к CalDAV и список календарей"
+    global _session
+    if _session is None:
+        _session = CalendarSession(
+            url=config.cal_dav.CALDAV_URL,
+            username=config.cal_dav.CALDAV_USERNAME,
+            password=config.cal_dav.CALDAV_PASSWORD,
+            default_name=config.cal_dav.CALDAV_CALENDAR_NAME,
+            ttl=config.cal_dav.CALDAV_SESSION_TTL,
+            max_failures=config.cal_dav.CALDAV_MAX_FAILURES,
+            pool_size=config.cal_dav.CALDAV_POOL_SIZE,
+            timeout=config.cal_dav.CALDAV_TIMEOUT,
+        )
+    return _session
+
+
+async def _get_calendar(name: Optional[str] = None) -> Calendar:
     "получение календаря"
-    global _client, _calendar
-    if _calendar:
-        return _calendar
-    if not all(
-        [
-            config.cal_dav.CALDAV_URL,
-            config.cal_dav.CALDAV_USERNAME,
-            config.cal_dav.CALDAV_PASSWORD,
-        ]
-    ):
-        raise RuntimeError("CalDAV not configured")
-
-    _client = aiocaldav.DAVClient(
-        url=config.cal_dav.CALDAV_URL,
-        username=config.cal_dav.CALDAV_USERNAME,
-        password=config.cal_dav.CALDAV_PASSWORD,
-    )
-    principal = await _client.principal()
-    calendars: list[Calendar] = await principal.calendars()
-    if not calendars:
-        raise RuntimeError("No calendars found")
-
-    for cal in calendars:
-        name = cal.name
-        if name == config.cal_dav.CALDAV_CALENDAR_NAME:
-            _calendar = cal
-            return cal
-    _calendar = calendars[0]
-    return _calendar
+    return await _get_calendar_session().calendar(name)
+
+
+async def _get_event_store(name: Optional[str] = None) -> EventStore:
+    "локальная копия событий календаря"
+    cal = await _get_calendar(name)
+    store = _stores.get(str(cal.url))
+    if store is None:
+        store = _stores[str(cal.url)] = EventStore(
+            cal,
+            max_staleness=config.cal_dav.CALDAV_MAX_STALENESS,
+            write_concurrency=config.cal_dav.CALDAV_WRITE_CONCURRENCY,
+            tz=ZoneInfo(config.cal_dav.CALDAV_TIMEZONE),
+        )
+    # после переподключения сессии календарь — новый объект с новым клиентом
+    store.calendar = cal
+    return store
+
+
+@asynccontextmanager
+async def _lifespan(mcp: FastMCP):
+    "закрывает HTTP-соединения с CalDAV-сервером"
+    try:
+        yield {}
+    finally:
+        with anyio.CancelScope(shield=True):
+            if _session is not None:
+                await _session.close()
 
 
 def create_calendar_module() -> FastMCP:
-    mcp = FastMCP("CalendarModule")
+    mcp = FastMCP("CalendarModule", lifespan=_lifespan)
 
-    setup_tools(mcp, _get_calendar)
-    setup_resources(mcp, _get_calendar)
+    setup_tools(mcp, _get_calendar, _get_calendar_session, _get_event_store)
+    setup_resources(mcp, _get_calendar, _get_calendar_session, _get_event_store)
     setup_prompts(mcp)
 
     return mcp
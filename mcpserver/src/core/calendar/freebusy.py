@@ -0,0 +1,179 @@
+"""
+Занятость календаря: объединённые интервалы занятости и поиск свободных
+окон в рабочих часах.
+"""
+
+import bisect
+import re
+from datetime import (
+    datetime,
+    time,
+    timedelta,
+    timezone,
+)
+from typing import (
+    Iterable,
+    Optional,
+)
+
+from . import ical
+
+WEEKDAYS = {"mon": 0, "tue": 1, "wed": 2, "thu": 3, "fri": 4, "sat": 5, "sun": 6}
+
+# "Mon-Fri 09:00-18:00", "Sat 10:00-14:00" или просто "09:00-18:00" (каждый день)
+_WORKING_HOURS = re.compile(
+    r"^\s*(?:(?P<first>[a-z]{3})(?:-(?P<last>[a-z]{3}))?\s+)?"
+    r"(?P<start>\d{1,2}:\d{2})\s*-\s*(?P<end>\d{1,2}:\d{2})\s*$",
+    re.IGNORECASE,
+)
+
+# Типы FREEBUSY, которые считаются занятостью
+_BUSY_TYPES = {"BUSY", "BUSY-UNAVAILABLE", "BUSY-TENTATIVE"}
+
+
+def merge_intervals(intervals: Iterable[tuple[int, int]]) -> list[tuple[int, int]]:
+    "объединяет пересекающиеся и смежные интервалы; вход упорядочен по началу"
+    merged: list[list[int]] = []
+    for start, end in intervals:
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+class BusyIndex:
+    """
+    Непересекающиеся интервалы занятости [start, end), упорядоченные по
+    началу. Добавление интервала сливает его с соседями за O(log n + k),
+    запрос занятости в окне — бинарный поиск и k интервалов.
+    """
+
+    def __init__(self, intervals: Iterable[tuple[int, int]] = ()):
+        merged = merge_intervals(sorted(intervals))
+        self._starts = [start for start, _ in merged]
+        self._ends = [end for _, end in merged]
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def add(self, start: int, end: int) -> None:
+        if end <= start:
+            return
+        # все интервалы, пересекающие или касающиеся [start, end]
+        first = bisect.bisect_left(self._ends, start)
+        last = bisect.bisect_right(self._starts, end)
+        if first < last:
+            start = min(start, self._starts[first])
+            end = max(end, self._ends[last - 1])
+        self._starts[first:last] = [start]
+        self._ends[first:last] = [end]
+
+    def busy(self, start: int, end: int) -> list[tuple[int, int]]:
+        """Интервалы занятости, обрезанные по окну [start, end)."""
+        first = bisect.bisect_right(self._ends, start)
+        result = []
+        for index in range(first, len(self._starts)):
+            if self._starts[index] >= end:
+                break
+            result.append((max(self._starts[index], start), min(self._ends[index], end)))
+        return result
+
+    def gaps(self, start: int, end: int) -> list[tuple[int, int]]:
+        "части окна, не покрытые интервалами"
+        result, cursor = [], start
+        for busy_start, busy_end in self.busy(start, end):
+            if busy_start > cursor:
+                result.append((cursor, busy_start))
+            cursor = max(cursor, busy_end)
+        if cursor < end:
+            result.append((cursor, end))
+        return result
+
+
+def parse_working_hours(value: Optional[str]) -> tuple[set[int], time, time]:
+    """
+    Рабочие часы → (дни недели, начало, конец). Пустое значение — круглые
+    сутки без выходных.
+    """
+    if not value:
+        return set(range(7)), time(0, 0), time(0, 0)
+    match = _WORKING_HOURS.match(value)
+    if match is None:
+        raise ValueError(
+            f"Некорректные рабочие часы {value!r}: ожидается 'Mon-Fri 09:00-18:00'"
+        )
+    first, last = match["first"], match["last"] or match["first"]
+    if first:
+        try:
+            first_day, last_day = WEEKDAYS[first.lower()], WEEKDAYS[last.lower()]
+        except KeyError as e:
+            raise ValueError(f"Неизвестный день недели: {e.args[0]}") from e
+        days = {(first_day + offset) % 7 for offset in range((last_day - first_day) % 7 + 1)}
+    else:
+        days = set(range(7))
+    opens = time.fromisoformat(match["start"].zfill(5))
+    closes = time.fromisoformat(match["end"].zfill(5))
+    return days, opens, closes
+
+
+def working_windows(
+    start: datetime, end: datetime, working_hours: Optional[str], tz
+) -> list[tuple[int, int]]:
+    "рабочие интервалы (секунды UTC) внутри [start, end) в часовом поясе tz"
+    days, opens, closes = parse_working_hours(working_hours)
+    window_start, window_end = int(start.timestamp()), int(end.timestamp())
+    result = []
+    day = start.astimezone(tz).date() - timedelta(days=1)
+    last_day = end.astimezone(tz).date()
+    while day <= last_day:
+        if day.weekday() in days:
+            opening = datetime.combine(day, opens, tz)
+            # конец не позже начала (например, 00:00-00:00 или 22:00-06:00) — следующий день
+            closing_day = day if closes > opens else day + timedelta(days=1)
+            closing = datetime.combine(closing_day, closes, tz)
+            a = max(int(opening.timestamp()), window_start)
+            b = min(int(closing.timestamp()), window_end)
+            if a < b:
+                result.append((a, b))
+        day += timedelta(days=1)
+    return merge_intervals(result)
+
+
+def free_slots(
+    busy: BusyIndex, windows: list[tuple[int, int]], duration: int, limit: Optional[int] = None
+) -> list[tuple[int, int]]:
+    "свободные промежутки не короче duration секунд внутри рабочих интервалов"
+    result = []
+    for window_start, window_end in windows:
+        for gap_start, gap_end in busy.gaps(window_start, window_end):
+            if gap_end - gap_start >= duration:
+                result.append((gap_start, gap_end))
+                if limit is not None and len(result) >= limit:
+                    return result
+    return result
+
+
+def parse_freebusy(text: str) -> list[tuple[int, int]]:
+    "интервалы занятости из VFREEBUSY (ответ free-busy-query)"
+    intervals = []
+    for component in ical.iter_components(text, "VFREEBUSY", {"FREEBUSY"}):
+        for params, value in component.get("FREEBUSY", ()):
+            if params.get("FBTYPE", "BUSY").upper() not in _BUSY_TYPES:
+                continue
+            for period in value.split(","):
+                first, _, second = period.partition("/")
+                start = ical.timestamp(ical.parse_datetime({}, first))
+                if second.upper().lstrip("+-").startswith("P"):
+                    end = start + int(ical.parse_duration(second).total_seconds())
+                else:
+                    end = ical.timestamp(ical.parse_datetime({}, second))
+                intervals.append((start, end))
+    return merge_intervals(sorted(intervals))
+
+
+def format_utc(timestamp: int) -> str:
+    "время для CALDAV:time-range"
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y%m%dT%H%M%SZ")
@@ -0,0 +1,456 @@
+"""
+Построчный разбор iCalendar (RFC 5545) без построения дерева vobject:
+из VEVENT извлекаются только нужные свойства, вложенные компоненты
+(VALARM) пропускаются. Запись — так же построчно: новое событие
+собирается из строк, а при изменении заменяются только затронутые
+свойства основного VEVENT.
+"""
+
+import re
+from datetime import (
+    date,
+    datetime,
+    timedelta,
+    timezone,
+    tzinfo,
+)
+from functools import lru_cache
+from typing import (
+    Iterable,
+    Iterator,
+    Optional,
+)
+from zoneinfo import (
+    ZoneInfo,
+    ZoneInfoNotFoundError,
+)
+
+# Часовой пояс по умолчанию для дат без зоны (floating) и событий на весь
+# день; пояс пользователя задаётся CALDAV_TIMEZONE
+DEFAULT_TZ = ZoneInfo("Europe/Moscow")
+
+_UTC_KEYS = {"UTC", "Etc/UTC", "Etc/GMT", "GMT", "Z"}
+
+# Свойства VEVENT, нужные списку событий и развёртыванию серий
+EVENT_PROPERTIES = frozenset(
+    {
+        "UID",
+        "SUMMARY",
+        "DESCRIPTION",
+        "LOCATION",
+        "ORGANIZER",
+        "DTSTART",
+        "DTEND",
+        "DURATION",
+        "RECURRENCE-ID",
+        "RRULE",
+        "EXDATE",
+        "RDATE",
+        "STATUS",
+        "TRANSP",
+    }
+)
+
+PRODID = "-//AIDevToolsHack//MCP Calendar//RU"
+
+# Поля события в инструментах → свойства VEVENT
+TEXT_FIELDS = {"summary": "SUMMARY", "description": "DESCRIPTION", "location": "LOCATION"}
+TIME_FIELDS = {"start": "DTSTART", "end": "DTEND"}
+
+# Длина строки в октетах, после которой она переносится (RFC 5545, 3.1)
+_LINE_OCTETS = 75
+
+_DURATION = re.compile(
+    r"([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$"
+)
+_UNESCAPE = re.compile(r"\\([\\;,nN])")
+
+
+def unfold(text: str) -> Iterator[str]:
+    "логические строки: продолжения (строки с пробелом или табом в начале) склеиваются"
+    current = None
+    for line in text.splitlines():
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current:
+            yield current
+        current = line
+    if current:
+        yield current
+
+
+def split_line(line: str) -> tuple[str, dict[str, str], str]:
+    "NAME;PARAM=VALUE:значение → (NAME, {PARAM: VALUE}, значение)"
+    quoted = False
+    for position, char in enumerate(line):
+        if char == '"':
+            quoted = not quoted
+        elif char == ":" and not quoted:
+            head, value = line[:position], line[position + 1 :]
+            break
+    else:
+        return line.upper(), {}, ""
+    name, *params = _split_params(head)
+    parsed = {}
+    for param in params:
+        key, _, param_value = param.partition("=")
+        parsed[key.upper()] = param_value.strip('"')
+    return name.upper(), parsed, value
+
+
+def _split_params(head: str) -> list[str]:
+    if '"' not in head:
+        return head.split(";")
+    parts, quoted, start = [], False, 0
+    for position, char in enumerate(head):
+        if char == '"':
+            quoted = not quoted
+        elif char == ";" and not quoted:
+            parts.append(head[start:position])
+            start = position + 1
+    parts.append(head[start:])
+    return parts
+
+
+def iter_components(
+    text: str, component: str = "VEVENT", properties: Optional[Iterable[str]] = None
+) -> Iterator[dict[str, list[tuple[dict, str]]]]:
+    """
+    Компоненты `component` верхнего уровня VCALENDAR по одному, лениво.
+    Каждый — {СВОЙСТВО: [(параметры, значение), ...]}; если задан
+    `properties`, остальные свойства пропускаются. Вложенные компоненты
+    (VALARM) пропускаются целиком.
+    """
+    wanted = frozenset(properties) if properties is not None else None
+    begin, end = f"BEGIN:{component}", f"END:{component}"
+    current = None
+    depth = 0
+    for line in unfold(text):
+        if current is None:
+            if line.upper() == begin:
+                current, depth = {}, 0
+            continue
+        upper = line[:6].upper()
+        if upper == "BEGIN:":
+            depth += 1
+            continue
+        if upper.startswith("END:"):
+            if depth:
+                depth -= 1
+                continue
+            if line.upper() == end:
+                yield current
+                current = None
+            continue
+        if depth:
+            continue
+        name, params, value = split_line(line)
+        if wanted is None or name in wanted:
+            current.setdefault(name, []).append((params, value))
+
+
+def date_values(event: dict, name: str, tz: tzinfo = DEFAULT_TZ) -> list[date | datetime]:
+    "все значения многозначного свойства дат (EXDATE, RDATE): строки и списки через запятую"
+    result = []
+    for params, value in event.get(name, ()):
+        if params.get("VALUE") == "PERIOD":
+            continue
+        result.extend(parse_datetime(params, item, tz) for item in value.split(",") if item)
+    return result
+
+
+def text_value(event: dict, name: str) -> str:
+    "текстовое свойство без экранирования RFC 5545"
+    values = event.get(name)
+    if not values:
+        return ""
+    return _UNESCAPE.sub(_unescape_char, values[0][1])
+
+
+def _unescape_char(match: re.Match) -> str:
+    char = match.group(1)
+    return "\n" if char in "nN" else char
+
+
+@lru_cache(maxsize=256)
+def zone(tzid: str) -> Optional[tzinfo]:
+    "часовой пояс IANA по TZID; None для неизвестных (например, имён Windows)"
+    try:
+        return ZoneInfo(tzid.strip("/"))
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+def parse_datetime(params: dict, value: str, tz: tzinfo = DEFAULT_TZ) -> date | datetime:
+    "DATE или DATE-TIME (UTC, с TZID или floating — в поясе tz)"
+    value = value.strip()
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        return date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+    result = datetime(
+        int(value[:4]),
+        int(value[4:6]),
+        int(value[6:8]),
+        int(value[9:11]),
+        int(value[11:13]),
+        int(value[13:15]),
+    )
+    if value.endswith("Z"):
+        return result.replace(tzinfo=timezone.utc)
+    tzid = params.get("TZID")
+    return result.replace(tzinfo=(zone(tzid) if tzid else None) or tz)
+
+
+def timestamp(value: date | datetime, tz: tzinfo = DEFAULT_TZ) -> int:
+    "секунды UTC; дата — полночь в поясе tz"
+    if not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day, tzinfo=tz)
+    elif value.tzinfo is None:
+        value = value.replace(tzinfo=tz)
+    return int(value.timestamp())
+
+
+def parse_duration(value: str) -> timedelta:
+    "DURATION (например, PT1H30M или -P1D)"
+    match = _DURATION.match(value.strip())
+    if match is None:
+        raise ValueError(f"Некорректная длительность: {value!r}")
+    sign, weeks, days, hours, minutes, seconds = match.groups()
+    result = timedelta(
+        weeks=int(weeks or 0),
+        days=int(days or 0),
+        hours=int(hours or 0),
+        minutes=int(minutes or 0),
+        seconds=int(seconds or 0),
+    )
+    return -result if sign == "-" else result
+
+
+# === Запись ===
+
+
+def escape_text(value: str) -> str:
+    "экранирование значения TEXT (RFC 5545, 3.3.11)"
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def fold(line: str) -> str:
+    "перенос строки длиннее 75 октетов; многобайтовые символы UTF-8 не разрываются"
+    data = line.encode()
+    if len(data) <= _LINE_OCTETS:
+        return line
+    parts, start, limit = [], 0, _LINE_OCTETS
+    while start < len(data):
+        end = min(start + limit, len(data))
+        # байты 10xxxxxx — продолжение символа
+        while end < len(data) and data[end] & 0xC0 == 0x80:
+            end -= 1
+        parts.append(data[start:end].decode())
+        # строка продолжения начинается с пробела, он тоже занимает октет
+        start, limit = end, _LINE_OCTETS - 1
+    return "\r\n ".join(parts)
+
+
+def format_datetime(value: date | datetime) -> tuple[str, str]:
+    """
+    (параметры, значение): дата — VALUE=DATE, время в поясе IANA — TZID и
+    местное время (переход на летнее время не сдвигает встречу), время с
+    фиксированным смещением — UTC, без зоны — floating.
+    """
+    if not isinstance(value, datetime):
+        return ";VALUE=DATE", value.strftime("%Y%m%d")
+    if value.tzinfo is None:
+        return "", value.strftime("%Y%m%dT%H%M%S")
+    tzid = _tzid(value)
+    if tzid is not None:
+        return f";TZID={tzid}", value.strftime("%Y%m%dT%H%M%S")
+    return "", value.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _tzid(value) -> Optional[str]:
+    "имя пояса IANA у datetime; None — UTC, фиксированное смещение или дата"
+    key = getattr(getattr(value, "tzinfo", None), "key", None)
+    return key if key and key not in _UTC_KEYS else None
+
+
+@lru_cache(maxsize=64)
+def vtimezone(tzid: str, first_year: int, last_year: int) -> tuple[str, ...]:
+    """
+    Строки VTIMEZONE пояса IANA на годы first_year..last_year: смещение на
+    начало периода и каждый переход из базы zoneinfo. Поиск переходов —
+    проход по дням и бинарный поиск внутри дня, результат кешируется.
+    """
+    tz = ZoneInfo(tzid)
+    start = datetime(first_year, 1, 1, tzinfo=tz).astimezone(timezone.utc)
+    end = datetime(last_year + 1, 1, 1, tzinfo=tz).astimezone(timezone.utc)
+    offset = start.astimezone(tz).utcoffset()
+    lines = ["BEGIN:VTIMEZONE", f"TZID:{tzid}"]
+    lines += _observance(start, offset, tz)
+    for moment, before in _transitions(tz, start, end):
+        lines += _observance(moment, before, tz)
+    lines.append("END:VTIMEZONE")
+    return tuple(lines)
+
+
+def _transitions(tz: tzinfo, start: datetime, end: datetime) -> Iterator[tuple[datetime, timedelta]]:
+    "(момент UTC, смещение до него) для каждой смены смещения в [start, end)"
+    day = timedelta(days=1)
+    moment, offset = start, start.astimezone(tz).utcoffset()
+    while moment < end:
+        following = min(moment + day, end)
+        next_offset = following.astimezone(tz).utcoffset()
+        if next_offset != offset:
+            low, high = moment, following
+            while high - low > timedelta(seconds=1):
+                middle = low + (high - low) / 2
+                if middle.astimezone(tz).utcoffset() == offset:
+                    low = middle
+                else:
+                    high = middle
+            yield high.replace(microsecond=0), offset
+            offset = next_offset
+        moment = following
+
+
+def _observance(moment: datetime, before: timedelta, tz: tzinfo) -> list[str]:
+    "STANDARD или DAYLIGHT с началом в moment (DTSTART — по смещению до перехода)"
+    local = moment.astimezone(tz)
+    kind = "DAYLIGHT" if local.dst() else "STANDARD"
+    return [
+        f"BEGIN:{kind}",
+        f"DTSTART:{(moment + before).strftime('%Y%m%dT%H%M%S')}",
+        f"TZOFFSETFROM:{_format_offset(before)}",
+        f"TZOFFSETTO:{_format_offset(local.utcoffset())}",
+        f"TZNAME:{local.tzname()}",
+        f"END:{kind}",
+    ]
+
+
+def _format_offset(offset: timedelta) -> str:
+    seconds = int(offset.total_seconds())
+    sign = "-" if seconds < 0 else "+"
+    hours, rest = divmod(abs(seconds), 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{sign}{hours:02d}{minutes:02d}" + (f"{seconds:02d}" if seconds else "")
+
+
+def _vtimezones(fields: dict, defined: Iterable[str] = ()) -> list[str]:
+    "VTIMEZONE для поясов start/end, которых ещё нет в календаре"
+    years: dict[str, list[int]] = {}
+    for key in TIME_FIELDS:
+        tzid = _tzid(fields.get(key))
+        if tzid is not None and tzid not in defined:
+            years.setdefault(tzid, []).append(fields[key].year)
+    lines = []
+    for tzid, values in years.items():
+        lines.extend(vtimezone(tzid, min(values), max(values)))
+    return lines
+
+
+def event_lines(fields: dict) -> dict[str, Optional[str]]:
+    """
+    Поля события (summary, description, location — строки, start, end —
+    date или datetime) → {СВОЙСТВО: строка iCalendar}; None — свойство
+    удаляется (пустой текст, DURATION при заданном DTEND).
+    """
+    lines = {}
+    for key, value in fields.items():
+        if key in TEXT_FIELDS:
+            name = TEXT_FIELDS[key]
+            lines[name] = f"{name}:{escape_text(value)}" if value else None
+        elif key in TIME_FIELDS:
+            name = TIME_FIELDS[key]
+            params, text = format_datetime(value)
+            lines[name] = f"{name}{params}:{text}"
+    if "DTEND" in lines:
+        lines["DURATION"] = None
+    return lines
+
+
+def serialize_event(uid: str, fields: dict) -> str:
+    "VCALENDAR с одним VEVENT"
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        *_vtimezones(fields),
+        "BEGIN:VEVENT",
+        f"UID:{escape_text(uid)}",
+        f"DTSTAMP:{_stamp()}",
+        *(line for line in event_lines(fields).values() if line),
+        "END:VEVENT",
+        "END:VCALENDAR",
+    ]
+    return "".join(fold(line) + "\r\n" for line in lines)
+
+
+def patch_event(text: str, fields: dict) -> str:
+    """
+    Меняет свойства основного VEVENT (без RECURRENCE-ID); остальное
+    остаётся как было: неизвестные свойства, VALARM, VTIMEZONE и
+    изменённые экземпляры серии. SEQUENCE увеличивается, DTSTAMP
+    обновляется. ValueError, если основного VEVENT нет.
+    """
+    lines = list(unfold(text))
+    begin, end = _master_bounds(lines)
+    replaced = event_lines(fields)
+    # без SEQUENCE номер версии — 0
+    body, depth, sequence = [], 0, 1
+    for line in lines[begin + 1 : end]:
+        upper = line[:6].upper()
+        if upper == "BEGIN:":
+            depth += 1
+        elif upper.startswith("END:"):
+            depth -= 1
+        elif not depth:
+            name, _, value = split_line(line)
+            if name == "SEQUENCE":
+                sequence = int(value) + 1 if value.strip().isdigit() else 1
+                continue
+            if name == "DTSTAMP" or name in replaced:
+                continue
+        body.append(line)
+    head = [
+        f"SEQUENCE:{sequence}",
+        f"DTSTAMP:{_stamp()}",
+        *(line for line in replaced.values() if line),
+    ]
+    defined = {line[5:] for line in lines if line[:5].upper() == "TZID:"}
+    timezones = _vtimezones(fields, defined)
+    # новые свойства — сразу после BEGIN:VEVENT, до вложенных компонентов;
+    # недостающие VTIMEZONE — перед первым компонентом календаря
+    first = next(i for i in range(1, len(lines)) if lines[i][:6].upper() == "BEGIN:")
+    result = (
+        lines[:first] + timezones + lines[first : begin + 1] + head + body + lines[end:]
+    )
+    return "".join(fold(line) + "\r\n" for line in result)
+
+
+def _master_bounds(lines: list[str]) -> tuple[int, int]:
+    "номера строк BEGIN:VEVENT и END:VEVENT основного события"
+    depth, begin, override = 0, None, False
+    for index, line in enumerate(lines):
+        upper = line.upper()
+        if upper.startswith("BEGIN:"):
+            depth += 1
+            if depth == 2 and upper == "BEGIN:VEVENT":
+                begin, override = index, False
+        elif upper.startswith("END:"):
+            if depth == 2 and begin is not None:
+                if not override:
+                    return begin, index
+                begin = None
+            depth -= 1
+        elif depth == 2 and begin is not None and upper.startswith("RECURRENCE-ID"):
+            override = True
+    raise ValueError("В ресурсе нет основного VEVENT")
+
+
+def _stamp() -> str:
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
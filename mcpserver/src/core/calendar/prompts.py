@@ -1,3 +1,5 @@
+import json
+
 from fastmcp import (
     Context,
     FastMCP,
@@ -49,12 +51,21 @@ def setup_prompts(mcp: FastMCP):
 
     @mcp.prompt
     async def plan_day_from_calendar(ctx: Context = None) -> str:
-        # Читаем сегодняшние события
-        today_events = await ctx.read_resource("events://calendar/today")
+        # Читаем сегодняшние события; read_resource возвращает содержимое, а не dict
+        contents = await ctx.read_resource("events://calendar/today")
+        today = json.loads(contents[0].content) if contents else {}
+        events = [
+            f"- {e['start'][11:16]}–{e['end'][11:16]} {e['summary']}"
+            if "T" in e["start"]
+            else f"- весь день: {e['summary']}"
+            for e in today.get("events", [])
+        ]
 
         return (
             f"Составь краткий план дня на основе следующих данных:\n\n"
-            f"События сегодня: {len(today_events.get('events', []))} шт.\n"
+            f"События сегодня ({len(events)} шт.):\n"
+            + "\n".join(events or ["- нет событий"])
+            + "\n\n"
             f"Выведи структурированный план в формате:\n"
             f"- Утро: ...\n- День: ...\n- Вечер: ...\n"
             f"Или напиши 'Спокойный день', если нет срочных дел."
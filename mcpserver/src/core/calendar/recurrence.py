@@ -0,0 +1,312 @@
+"""
+Развёртывание повторяющихся событий (RRULE, RFC 5545) в заданном окне.
+
+Экземпляры считаются по периодам правила (день, неделя, месяц, год), и
+номер первого периода, пересекающего окно, вычисляется арифметически:
+развернуть день ежедневной серии длиной в пять лет стоит O(1), а не
+O(число экземпляров). Время экземпляров — местное время DTSTART, поэтому
+переход на летнее время не сдвигает встречи.
+"""
+
+import bisect
+import calendar
+import heapq
+import logging
+from dataclasses import dataclass
+from datetime import (
+    date,
+    datetime,
+    time,
+    timedelta,
+)
+from typing import (
+    Iterator,
+    Optional,
+)
+
+from . import ical
+
+WEEKDAYS = {"MO": 0, "TU": 1, "WE": 2, "TH": 3, "FR": 4, "SA": 5, "SU": 6}
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY", "YEARLY")
+# Части правила, которые не поддерживаются и игнорируются при развёртывании
+UNSUPPORTED_PARTS = ("BYSECOND", "BYMINUTE", "BYHOUR", "BYYEARDAY", "BYWEEKNO")
+
+log = logging.getLogger(__name__)
+
+# Подряд пустых периодов, после которых правило считается исчерпанным
+# (например, BYMONTH=2;BYMONTHDAY=30)
+_MAX_EMPTY_PERIODS = 1000
+
+
+@dataclass(frozen=True)
+class Rule:
+    """Разобранное RRULE; by_day — пары (номер или 0, день недели)."""
+
+    freq: str
+    interval: int = 1
+    count: Optional[int] = None
+    until: Optional[date | datetime] = None
+    by_day: tuple[tuple[int, int], ...] = ()
+    by_month_day: tuple[int, ...] = ()
+    by_month: tuple[int, ...] = ()
+    by_set_pos: tuple[int, ...] = ()
+    week_start: int = 0
+
+
+def parse_rule(value: str) -> Rule:
+    """RRULE → Rule; ValueError для неподдерживаемой частоты."""
+    parts = dict(part.partition("=")[::2] for part in value.upper().split(";") if part)
+    freq = parts.get("FREQ")
+    if freq not in FREQUENCIES:
+        raise ValueError(f"Неподдерживаемая частота повторения: {freq}")
+    ignored = [name for name in UNSUPPORTED_PARTS if name in parts]
+    if ignored:
+        log.warning("RRULE %s: %s не поддерживаются и игнорируются", value, ", ".join(ignored))
+    by_day = []
+    for item in filter(None, parts.get("BYDAY", "").split(",")):
+        by_day.append((int(item[:-2] or 0), WEEKDAYS[item[-2:]]))
+
+    def numbers(name: str) -> tuple[int, ...]:
+        return tuple(int(item) for item in parts.get(name, "").split(",") if item)
+
+    until = None
+    if "UNTIL" in parts:
+        until = ical.parse_datetime({}, parts["UNTIL"])
+        if isinstance(until, datetime) and not parts["UNTIL"].endswith("Z"):
+            until = until.replace(tzinfo=None)
+    return Rule(
+        freq=freq,
+        interval=max(int(parts.get("INTERVAL", 1)), 1),
+        count=int(parts["COUNT"]) if "COUNT" in parts else None,
+        until=until,
+        by_day=tuple(by_day),
+        by_month_day=numbers("BYMONTHDAY"),
+        by_month=numbers("BYMONTH"),
+        by_set_pos=numbers("BYSETPOS"),
+        week_start=WEEKDAYS.get(parts.get("WKST", "MO"), 0),
+    )
+
+
+class Recurrence:
+    """
+    Серия: правило, DTSTART (aware), длительность экземпляра в секундах,
+    исключённые (EXDATE) и добавленные (RDATE) начала — секунды UTC.
+
+    Для правил с COUNT последнее начало вычисляется один раз (O(COUNT)) и
+    кешируется на объекте; дальше такая серия разворачивается, как с UNTIL.
+    """
+
+    def __init__(
+        self,
+        rule: Rule,
+        dtstart: datetime,
+        duration: int,
+        exdates: frozenset[int] = frozenset(),
+        rdates: tuple[int, ...] = (),
+    ):
+        self.rule = rule
+        self.tz = dtstart.tzinfo
+        self.local = dtstart.replace(tzinfo=None)
+        self.start = int(dtstart.timestamp())
+        self.duration = duration
+        self.exdates = exdates
+        self.rdates = sorted(rdates)
+        # сколько периодов правила просмотрено — для оценки стоимости развёртывания
+        self.periods = 0
+        self._until = self._until_timestamp(rule.until)
+        self._until_day = self._day(self._until)
+        if rule.count is not None:
+            self._until = self._last_by_count(rule.count)
+            self._until_day = self._day(self._until)
+
+    def between(self, start: int, end: int) -> Iterator[int]:
+        """Начала экземпляров, пересекающих [start, end), по возрастанию."""
+        lower = start - self.duration
+        position = bisect.bisect_left(self.rdates, lower)
+        candidates = heapq.merge(
+            (self.start,),
+            self._starts(self._first_period(lower)),
+            self.rdates[position:],
+        )
+        previous = None
+        for value in candidates:
+            if value >= end:
+                return
+            if value == previous or value in self.exdates:
+                continue
+            previous = value
+            if value + self.duration > start or value >= start:
+                yield value
+
+    def _until_timestamp(self, until) -> Optional[int]:
+        if until is None:
+            return None
+        if not isinstance(until, datetime):
+            # UNTIL датой включает весь этот день
+            return int(datetime.combine(until, time.max, self.tz).timestamp())
+        if until.tzinfo is None:
+            # UNTIL без зоны — в зоне DTSTART
+            until = until.replace(tzinfo=self.tz)
+        return int(until.timestamp())
+
+    def _last_by_count(self, count: int) -> int:
+        last = self.start
+        for index, value in enumerate(heapq.merge((self.start,), self._starts(0))):
+            if index and value == last:
+                continue
+            last = value
+            count -= 1
+            if count <= 0:
+                break
+        return last
+
+    def _first_period(self, timestamp: int) -> int:
+        "номер периода, раньше которого экземпляров с началом ≥ timestamp нет"
+        if timestamp <= self.start:
+            return 0
+        target = datetime.fromtimestamp(timestamp, self.tz).date()
+        origin = self.local.date()
+        rule = self.rule
+        if rule.freq == "DAILY":
+            index = (target - origin).days // rule.interval
+        elif rule.freq == "WEEKLY":
+            index = (target - self._week_start(origin)).days // 7 // rule.interval
+        elif rule.freq == "MONTHLY":
+            months = (target.year - origin.year) * 12 + target.month - origin.month
+            index = months // rule.interval
+        else:
+            index = (target.year - origin.year) // rule.interval
+        # запас в один период: граница периода в местном времени может не
+        # совпасть с timestamp из-за часового пояса
+        return max(index - 1, 0)
+
+    def _starts(self, period: int) -> Iterator[int]:
+        "начала по правилу, начиная с периода period, до UNTIL"
+        empty = 0
+        while empty < _MAX_EMPTY_PERIODS:
+            if self._until is not None and self._period_begins_after_until(period):
+                return
+            self.periods += 1
+            days = self._period_days(period)
+            for day in days:
+                value = int(datetime.combine(day, self.local.time(), self.tz).timestamp())
+                if value < self.start:
+                    continue
+                if self._until is not None and value > self._until:
+                    return
+                yield value
+            empty = 0 if days else empty + 1
+            period += 1
+
+    def _period_begins_after_until(self, period: int) -> bool:
+        return self._period_first_day(period) > self._until_day
+
+    def _day(self, timestamp: Optional[int]) -> Optional[date]:
+        return datetime.fromtimestamp(timestamp, self.tz).date() if timestamp is not None else None
+
+    def _period_first_day(self, period: int) -> date:
+        origin = self.local.date()
+        step = period * self.rule.interval
+        freq = self.rule.freq
+        if freq == "DAILY":
+            return origin + timedelta(days=step)
+        if freq == "WEEKLY":
+            return self._week_start(origin) + timedelta(weeks=step)
+        if freq == "MONTHLY":
+            year, month = divmod(origin.month - 1 + step, 12)
+            return date(origin.year + year, month + 1, 1)
+        return date(origin.year + step, 1, 1)
+
+    def _period_days(self, period: int) -> list[date]:
+        "дни периода, подходящие под BYxxx, по возрастанию"
+        rule = self.rule
+        first = self._period_first_day(period)
+        if rule.freq == "DAILY":
+            days = [first] if self._matches(first) else []
+        elif rule.freq == "WEEKLY":
+            weekdays = {weekday for _, weekday in rule.by_day} or {self.local.weekday()}
+            days = [
+                day
+                for day in (first + timedelta(days=offset) for offset in range(7))
+                if day.weekday() in weekdays and (not rule.by_month or day.month in rule.by_month)
+            ]
+        elif rule.freq == "MONTHLY":
+            days = self._month_days(first.year, first.month) if self._month_ok(first.month) else []
+        elif rule.by_day and not rule.by_month and not rule.by_month_day:
+            days = self._year_weekdays(first.year)
+        else:
+            # BYMONTHDAY без BYMONTH — каждый месяц года, иначе — месяц DTSTART
+            months = rule.by_month or (range(1, 13) if rule.by_month_day else (self.local.month,))
+            days = []
+            for month in months:
+                days.extend(self._month_days(first.year, month))
+        if rule.by_set_pos and days:
+            days = sorted(
+                {
+                    days[pos - 1 if pos > 0 else pos]
+                    for pos in rule.by_set_pos
+                    if pos and -len(days) <= pos <= len(days)
+                }
+            )
+        return days
+
+    def _matches(self, day: date) -> bool:
+        "фильтры BYxxx для ежедневного правила"
+        rule = self.rule
+        if rule.by_month and day.month not in rule.by_month:
+            return False
+        if rule.by_day and day.weekday() not in {weekday for _, weekday in rule.by_day}:
+            return False
+        if rule.by_month_day:
+            days_in_month = calendar.monthrange(day.year, day.month)[1]
+            allowed = {d if d > 0 else days_in_month + 1 + d for d in rule.by_month_day}
+            return day.day in allowed
+        return True
+
+    def _month_ok(self, month: int) -> bool:
+        return not self.rule.by_month or month in self.rule.by_month
+
+    def _month_days(self, year: int, month: int) -> list[date]:
+        rule = self.rule
+        days_in_month = calendar.monthrange(year, month)[1]
+        selected = None
+        if rule.by_month_day:
+            selected = {
+                d if d > 0 else days_in_month + 1 + d
+                for d in rule.by_month_day
+                if 1 <= abs(d) <= days_in_month
+            }
+        if rule.by_day:
+            by_day = set()
+            for ordinal, weekday in rule.by_day:
+                matching = [
+                    day
+                    for day in range(1, days_in_month + 1)
+                    if date(year, month, day).weekday() == weekday
+                ]
+                if not ordinal:
+                    by_day.update(matching)
+                elif -len(matching) <= ordinal <= len(matching):
+                    by_day.add(matching[ordinal - 1 if ordinal > 0 else ordinal])
+            selected = by_day if selected is None else selected & by_day
+        if selected is None:
+            # без BYMONTHDAY/BYDAY — число DTSTART; месяцы без него пропускаются
+            selected = {self.local.day} if self.local.day <= days_in_month else set()
+        return [date(year, month, day) for day in sorted(selected)]
+
+    def _year_weekdays(self, year: int) -> list[date]:
+        "YEARLY с BYDAY без BYMONTH: номер дня недели считается от начала года"
+        days = set()
+        first = date(year, 1, 1)
+        total = 366 if calendar.isleap(year) else 365
+        for ordinal, weekday in self.rule.by_day:
+            offset = (weekday - first.weekday()) % 7
+            matching = [first + timedelta(days=d) for d in range(offset, total, 7)]
+            if not ordinal:
+                days.update(matching)
+            elif -len(matching) <= ordinal <= len(matching):
+                days.add(matching[ordinal - 1 if ordinal > 0 else ordinal])
+        return sorted(days)
+
+    def _week_start(self, day: date) -> date:
+        return day - timedelta(days=(day.weekday() - self.rule.week_start) % 7)
@@ -1,7 +1,6 @@
 from datetime import (
     datetime,
     timedelta,
-    timezone,
 )
 
 from fastmcp import (
@@ -9,44 +8,31 @@ from fastmcp import (
     FastMCP,
 )
 
+from .store import day_bounds
 
-def setup_resources(mcp: FastMCP, _get_calendar: callable):
+
+def setup_resources(
+    mcp: FastMCP,
+    _get_calendar: callable,
+    _get_calendar_session: callable,
+    _get_event_store: callable,
+):
     @mcp.resource("events://today")
     async def get_todays_events(ctx: Context = None) -> dict:
         """
         Ресурс для автоматической загрузки всех событий на текущую дату.
         Используется агентом для понимания, какие встречи сегодня.
         """
+        store = await _get_event_store()
+        now = datetime.now(store.tz)
+        start_dt, end_dt = day_bounds(now.date(), store.tz)
 
-        today = datetime.now().date()
-        start_dt = datetime.combine(today, datetime.min.time())
-        end_dt = start_dt + timedelta(days=1)
-
-        cal = await _get_calendar()
-        events = await cal.date_search(start_dt, end_dt)
         today_events = []
-        for ev in events:
-            comp = ev.instance.vevent
-            today_events.append(
-                {
-                    "uid": str(comp.uid.value),
-                    "summary": comp.summary.value
-                    if hasattr(comp.summary, "value")
-                    else "",
-                    "description": comp.description.value
-                    if hasattr(comp, "description")
-                    else "",
-                    "location": comp.location.value
-                    if hasattr(comp, "location")
-                    else "",
-                    "organizer": comp.organizer if hasattr(comp, "organizer") else "",
-                    "start": comp.dtstart.value.isoformat(),
-                    "end": comp.dtend.value.isoformat(),
-                }
-            )
+        for event in await store.events_between(start_dt, end_dt):
+            today_events.append({**event.to_dict(), "organizer": event.organizer})
 
         return {
-            "description": f"События на {today.isoformat()}",
+            "description": f"События на {now.date().isoformat()}",
             "events": today_events,
         }
 
@@ -54,28 +40,26 @@ def setup_resources(mcp: FastMCP, _get_calendar: callable):
     @mcp.resource("calendar://next-hour")
     async def get_next_hour_event(ctx: Context = None) -> dict:
         """Возвращает ближайшее событие в течение следующего часа."""
-        msk_tz = timezone(timedelta(hours=3), name="MSK")
-        now = datetime.now(msk_tz)
+        store = await _get_event_store()
+        now = datetime.now(store.tz)
         end = now + timedelta(hours=1)
 
-        cal = await _get_calendar()
-        events = await cal.date_search(now, end)
+        events = await store.events_between(now, end, limit=1)
         if not events:
             return {"description": "Нет событий в ближайший час", "event": None}
 
         # Берём первое (самое ближайшее)
-        ev = events[0]
-        comp = ev.instance.vevent
-        return {
-            "description": "Ближайшее событие",
-            "event": {
-                "uid": str(comp.uid.value),
-                "summary": comp.summary.value if hasattr(comp.summary, "value") else "",
-                "description": comp.description.value
-                if hasattr(comp, "description")
-                else "",
-                "location": comp.location.value if hasattr(comp, "location") else "",
-                "start": comp.dtstart.value.isoformat(),
-                "end": comp.dtend.value.isoformat(),
-            },
-        }
+        return {"description": "Ближайшее событие", "event": events[0].to_dict()}
+
+    # === РЕСУРС: calendar://session ===
+    @mcp.resource("calendar://session")
+    async def get_calendar_session_stats(ctx: Context = None) -> dict:
+        """Состояние подключения к CalDAV: календари, запросы, ошибки, переподключения."""
+        return {"description": "Подключение к CalDAV", "session": _get_calendar_session().stats()}
+
+    # === РЕСУРС: calendar://store ===
+    @mcp.resource("calendar://store")
+    async def get_event_store_stats(ctx: Context = None) -> dict:
+        """Локальная копия событий основного календаря: размер, возраст, синхронизации."""
+        store = await _get_event_store()
+        return {"description": "Локальная копия событий", "store": store.stats()}
@@ -0,0 +1,238 @@
+import asyncio
+import base64
+import logging
+import time
+from typing import (
+    Callable,
+    Optional,
+)
+
+import aiocaldav
+import aiohttp
+from aiocaldav import (
+    Calendar,
+    Principal,
+)
+from aiocaldav.davclient import DAVResponse
+from aiocaldav.elements import dav
+from aiocaldav.lib import error
+from aiocaldav.lib.python_utilities import to_wire
+from aiocaldav.lib.url import URL
+
+log = logging.getLogger(__name__)
+
+# Ошибки, после которых соединение с сервером считается неисправным
+_CONNECTION_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, OSError)
+
+
+class PooledDAVClient(aiocaldav.DAVClient):
+    """
+    DAVClient с общим aiohttp.ClientSession. Исходный клиент открывает новую
+    сессию (TCP + TLS) на каждый запрос; здесь соединения переиспользуются
+    (keep-alive), одновременно открыто не больше `pool_size`.
+    `on_result(ok)` получает исход каждого запроса: сетевая ошибка или
+    ответ 5xx — неудача.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        username: str,
+        password: str,
+        pool_size: int = 8,
+        timeout: float = 30.0,
+        on_result: Optional[Callable[[bool], None]] = None,
+    ):
+        super().__init__(url, username=username, password=password)
+        credentials = f"{username}:{password}".encode()
+        self.headers["Authorization"] = "Basic " + base64.b64encode(credentials).decode()
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.on_result = on_result
+        self.requests = 0
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def request(self, url, method="GET", body="", headers={}):
+        url = str(URL.objectify(url))
+        combined_headers = dict(self.headers)
+        combined_headers.update(headers)
+        if body is None or body == "" and "Content-Type" in combined_headers:
+            del combined_headers["Content-Type"]
+
+        self.requests += 1
+        try:
+            async with self._get_session().request(
+                method,
+                url,
+                data=to_wire(body),
+                headers=combined_headers,
+                proxy=self.proxy,
+                ssl=self.ssl_verify_cert,
+            ) as r:
+                response = DAVResponse()
+                await response.load(r)
+        except _CONNECTION_ERRORS:
+            self._report(False)
+            raise
+        self._report(response.status < 500)
+
+        if response.status in (401, 403):
+            ex = error.AuthorizationError()
+            ex.url = url
+            ex.reason = response.reason
+            raise ex
+        return response
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    def _report(self, ok: bool) -> None:
+        if self.on_result is not None:
+            self.on_result(ok)
+
+
+class CalendarSession:
+    """
+    Подключение к CalDAV-серверу и найденные на нём календари.
+
+    Поиск principal и календарей (несколько PROPFIND) выполняется один раз:
+    параллельные первые вызовы ждут одну инициализацию под asyncio.Lock.
+    Список календарей перечитывается раз в `ttl` секунд, а после
+    `max_failures` сетевых ошибок подряд клиент пересоздаётся целиком.
+    Календари выбираются по имени; без имени — `default_name`, а если его
+    нет на сервере — первый найденный.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        username: str,
+        password: str,
+        default_name: Optional[str] = None,
+        ttl: float = 900.0,
+        max_failures: int = 3,
+        pool_size: int = 8,
+        timeout: float = 30.0,
+    ):
+        self.url = url
+        self.username = username
+        self.password = password
+        self.default_name = default_name
+        self.ttl = ttl
+        self.max_failures = max_failures
+        self.pool_size = pool_size
+        self.timeout = timeout
+
+        self._client: Optional[PooledDAVClient] = None
+        self._calendars: Optional[dict[str, Calendar]] = None
+        self._loaded_at = 0.0
+        self._failures = 0
+        self._lock = asyncio.Lock()
+        self.metrics = {"connects": 0, "discoveries": 0, "failures": 0, "resets": 0}
+
+    async def calendar(self, name: Optional[str] = None) -> Calendar:
+        """Календарь по имени; без имени — календарь по умолчанию."""
+        calendars = await self._ensure()
+        if name is not None and name != self.default_name:
+            if name not in calendars:
+                raise ValueError(
+                    f"Календарь {name!r} не найден, доступны: {', '.join(calendars)}"
+                )
+            return calendars[name]
+        if self.default_name in calendars:
+            return calendars[self.default_name]
+        return next(iter(calendars.values()))
+
+    async def calendars(self) -> dict[str, Calendar]:
+        """Все календари пользователя по именам."""
+        return dict(await self._ensure())
+
+    def invalidate(self) -> None:
+        """Следующий вызов заново найдёт календари."""
+        self._calendars = None
+
+    def stats(self) -> dict:
+        return {
+            **self.metrics,
+            "calendars": list(self._calendars or ()),
+            "consecutive_failures": self._failures,
+            "requests": self._client.requests if self._client else 0,
+            "age": round(time.monotonic() - self._loaded_at, 1) if self._calendars else None,
+        }
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+        self._calendars = None
+
+    def _fresh(self) -> bool:
+        return (
+            self._calendars is not None
+            and self._failures < self.max_failures
+            and time.monotonic() - self._loaded_at < self.ttl
+        )
+
+    async def _ensure(self) -> dict[str, Calendar]:
+        if self._fresh():
+            return self._calendars
+        async with self._lock:
+            # пока ждали блокировку, календари мог загрузить другой вызов
+            if not self._fresh():
+                await self._discover()
+            return self._calendars
+
+    async def _discover(self) -> None:
+        if not all([self.url, self.username, self.password]):
+            raise RuntimeError("CalDAV not configured")
+        if self._client is None or self._failures >= self.max_failures:
+            if self._client is not None:
+                log.warning("CalDAV: %d ошибок подряд, переподключение", self._failures)
+                self.metrics["resets"] += 1
+                await self._client.close()
+            self._client = PooledDAVClient(
+                self.url,
+                self.username,
+                self.password,
+                pool_size=self.pool_size,
+                timeout=self.timeout,
+                on_result=self._on_result,
+            )
+            self._failures = 0
+            self.metrics["connects"] += 1
+
+        self.metrics["discoveries"] += 1
+        principal = await self._principal()
+        found: list[Calendar] = await principal.calendars()
+        if not found:
+            raise RuntimeError("No calendars found")
+        calendars = {}
+        for cal in found:
+            calendars.setdefault(cal.name or str(cal.url), cal)
+        self._calendars = calendars
+        self._loaded_at = time.monotonic()
+
+    async def _principal(self) -> Principal:
+        "как DAVClient.principal(), но без паузы в 1 секунду из Principal.ainit"
+        principal = Principal(self._client)
+        principal.url = self._client.url
+        props = await principal.get_properties([dav.CurrentUserPrincipal()])
+        principal.url = self._client.url.join(URL.objectify(props[dav.CurrentUserPrincipal.tag]))
+        return principal
+
+    def _on_result(self, ok: bool) -> None:
+        if ok:
+            self._failures = 0
+        else:
+            self._failures += 1
+            self.metrics["failures"] += 1
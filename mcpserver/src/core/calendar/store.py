@@ -0,0 +1,847 @@
+import asyncio
+import base64
+import bisect
+import heapq
+import json
+import logging
+import re
+import time
+import uuid
+from dataclasses import (
+    dataclass,
+    field,
+    replace,
+)
+from datetime import (
+    date,
+    datetime,
+    timedelta,
+    tzinfo,
+)
+from typing import (
+    AsyncIterator,
+    Iterator,
+    Optional,
+)
+from urllib.parse import (
+    quote,
+    unquote,
+)
+from xml.sax.saxutils import escape
+
+from aiocaldav import Calendar
+from aiocaldav.lib import error
+
+from . import ical
+from .ical import DEFAULT_TZ
+from .freebusy import (
+    BusyIndex,
+    format_utc,
+    merge_intervals,
+    parse_freebusy,
+)
+from .recurrence import (
+    Recurrence,
+    parse_rule,
+)
+
+log = logging.getLogger(__name__)
+
+# События длиннее суток хранятся отдельно, чтобы не расширять окно поиска
+LONG_EVENT = 24 * 3600
+
+# Сколько событий запрашивается одним calendar-multiget
+MULTIGET_BATCH = 100
+
+# UID, пригодный для имени ресурса как есть; прочие заменяются на uuid5
+_SAFE_NAME = re.compile(r"[\w.@-]+")
+
+_DAV = "{DAV:}"
+_CALDAV = "{urn:ietf:params:xml:ns:caldav}"
+_CS = "{http://calendarserver.org/ns/}"
+
+_PROPFIND_STATE = """<?xml version="1.0" encoding="utf-8"?>
+<D:propfind xmlns:D="DAV:" xmlns:CS="http://calendarserver.org/ns/">
+  <D:prop><CS:getctag/><D:sync-token/></D:prop>
+</D:propfind>"""
+
+_PROPFIND_ETAGS = """<?xml version="1.0" encoding="utf-8"?>
+<D:propfind xmlns:D="DAV:"><D:prop><D:getetag/></D:prop></D:propfind>"""
+
+_SYNC_COLLECTION = """<?xml version="1.0" encoding="utf-8"?>
+<D:sync-collection xmlns:D="DAV:">
+  <D:sync-token>{token}</D:sync-token>
+  <D:sync-level>1</D:sync-level>
+  <D:prop><D:getetag/></D:prop>
+</D:sync-collection>"""
+
+_FREE_BUSY_QUERY = """<?xml version="1.0" encoding="utf-8"?>
+<C:free-busy-query xmlns:C="urn:ietf:params:xml:ns:caldav">
+  <C:time-range start="{start}" end="{end}"/>
+</C:free-busy-query>"""
+
+_MULTIGET = """<?xml version="1.0" encoding="utf-8"?>
+<C:calendar-multiget xmlns:D="DAV:" xmlns:C="urn:ietf:params:xml:ns:caldav">
+  <D:prop><D:getetag/><C:calendar-data/></D:prop>
+  {hrefs}
+</C:calendar-multiget>"""
+
+
+class SyncTokenInvalid(Exception):
+    """Сервер больше не принимает sync-token: нужна полная синхронизация."""
+
+
+class ReportUnsupported(Exception):
+    """Сервер не поддерживает отчёт (sync-collection, free-busy-query)."""
+
+
+class PreconditionFailed(Exception):
+    """
+    Условная запись отклонена (412): событие с таким UID уже есть или
+    изменено другим клиентом после чтения.
+    """
+
+
+class EventNotFound(Exception):
+    """События нет на сервере (404) или в локальной копии."""
+
+
+@dataclass
+class StoredEvent:
+    """Событие календаря; время — секунды UTC."""
+
+    href: str
+    etag: Optional[str]
+    uid: str
+    summary: str
+    start: int
+    end: int
+    all_day: bool = False
+    # пояс, в котором заданы floating-время и даты событий на весь день
+    tz: tzinfo = DEFAULT_TZ
+    description: str = ""
+    location: str = ""
+    organizer: str = ""
+    # TRANSP:TRANSPARENT или отменённое событие не занимает время
+    transparent: bool = False
+    # повторяющаяся серия: правило и изменённые экземпляры по RECURRENCE-ID
+    recurrence: Optional[Recurrence] = None
+    overrides: dict[int, "StoredEvent"] = field(default_factory=dict)
+    # экземпляр серии: начало по правилу
+    recurrence_id: Optional[int] = None
+
+    def instances(self, start: int, end: int) -> Iterator[tuple[int, int, str, "StoredEvent"]]:
+        """Экземпляры серии, пересекающие [start, end), по возрастанию начала."""
+        duration = self.end - self.start
+        generated = (
+            (value, value + duration, self.href, self._instance(value, duration))
+            for value in self.recurrence.between(start, end)
+            if value not in self.overrides
+        )
+        # перенесённые экземпляры могут попасть в окно откуда угодно
+        moved = sorted(
+            (
+                (event.start, event.end, self.href, event)
+                for event in self.overrides.values()
+                if event.start < end and (event.end > start or event.start >= start)
+            ),
+            key=_position,
+        )
+        return heapq.merge(generated, moved, key=_position)
+
+    def _instance(self, start: int, duration: int) -> "StoredEvent":
+        return replace(
+            self,
+            start=start,
+            end=start + duration,
+            recurrence=None,
+            overrides={},
+            recurrence_id=start,
+        )
+
+    def to_dict(self, tz: Optional[tzinfo] = None) -> dict:
+        "время — в поясе tz, по умолчанию в поясе, с которым событие загружено"
+        tz = tz or self.tz
+        if self.all_day:
+            start = datetime.fromtimestamp(self.start, self.tz).date().isoformat()
+            end = datetime.fromtimestamp(self.end, self.tz).date().isoformat()
+        else:
+            start = datetime.fromtimestamp(self.start, tz).isoformat()
+            end = datetime.fromtimestamp(self.end, tz).isoformat()
+        data = {
+            "uid": self.uid,
+            "summary": self.summary,
+            "description": self.description,
+            "location": self.location,
+            "start": start,
+            "end": end,
+        }
+        if self.organizer:
+            data["organizer"] = self.organizer
+        if self.recurrence_id is not None:
+            data["recurrence_id"] = datetime.fromtimestamp(self.recurrence_id, tz).isoformat()
+        return data
+
+
+def _position(item: tuple) -> tuple[int, int, str]:
+    "ключ порядка выдачи: (начало, конец, href)"
+    return item[:3]
+
+
+def _parse_event(
+    href: str, etag: Optional[str], ics: str, tz: tzinfo = DEFAULT_TZ
+) -> Optional[StoredEvent]:
+    """
+    Событие из calendar-data; None, если в ресурсе нет VEVENT с DTSTART.
+    Время сразу переводится в секунды UTC; floating-время и даты — в поясе tz.
+    Для серии (RRULE) изменённые экземпляры (VEVENT с RECURRENCE-ID)
+    сохраняются в overrides, отменённые — исключаются как EXDATE.
+    """
+    try:
+        vevents = list(ical.iter_components(ics, "VEVENT", ical.EVENT_PROPERTIES))
+        vevents = [vevent for vevent in vevents if "DTSTART" in vevent]
+        # основное событие серии — без RECURRENCE-ID
+        master = next((vevent for vevent in vevents if "RECURRENCE-ID" not in vevent), None)
+        if master is None:
+            return _component_event(href, etag, vevents[0], tz) if vevents else None
+        event = _component_event(href, etag, master, tz)
+        if "RRULE" in master:
+            _attach_recurrence(event, master, vevents, tz)
+        return event
+    except (ValueError, KeyError) as e:
+        log.warning("CalDAV: не удалось разобрать %s: %s", href, e)
+        return None
+
+
+def _component_event(href: str, etag: Optional[str], vevent: dict, tz: tzinfo) -> StoredEvent:
+    dtstart = ical.parse_datetime(*vevent["DTSTART"][0], tz)
+    all_day = not isinstance(dtstart, datetime)
+    start = ical.timestamp(dtstart, tz)
+    if "DTEND" in vevent:
+        end = ical.timestamp(ical.parse_datetime(*vevent["DTEND"][0], tz), tz)
+    elif "DURATION" in vevent:
+        end = start + int(ical.parse_duration(vevent["DURATION"][0][1]).total_seconds())
+    else:
+        end = start + (86400 if all_day else 0)
+    return StoredEvent(
+        href=href,
+        etag=etag,
+        uid=ical.text_value(vevent, "UID"),
+        summary=ical.text_value(vevent, "SUMMARY"),
+        start=start,
+        end=max(end, start),
+        all_day=all_day,
+        tz=tz,
+        description=ical.text_value(vevent, "DESCRIPTION"),
+        location=ical.text_value(vevent, "LOCATION"),
+        organizer=ical.text_value(vevent, "ORGANIZER"),
+        transparent=(
+            ical.text_value(vevent, "TRANSP").upper() == "TRANSPARENT"
+            or ical.text_value(vevent, "STATUS").upper() == "CANCELLED"
+        ),
+    )
+
+
+def _attach_recurrence(
+    event: StoredEvent, master: dict, vevents: list[dict], tz: tzinfo
+) -> None:
+    try:
+        rule = parse_rule(master["RRULE"][0][1])
+    except ValueError as e:
+        # серия, которую развернуть не можем, остаётся разовым событием
+        log.warning("CalDAV: %s показывается без повторений: %s", event.href, e)
+        return
+    dtstart = ical.parse_datetime(*master["DTSTART"][0], tz)
+    if not isinstance(dtstart, datetime):
+        dtstart = datetime.combine(dtstart, datetime.min.time(), tz)
+    exdates = {ical.timestamp(value, tz) for value in ical.date_values(master, "EXDATE", tz)}
+    for vevent in vevents:
+        if "RECURRENCE-ID" not in vevent:
+            continue
+        recurrence_id = ical.timestamp(ical.parse_datetime(*vevent["RECURRENCE-ID"][0], tz), tz)
+        if ical.text_value(vevent, "STATUS").upper() == "CANCELLED":
+            exdates.add(recurrence_id)
+            continue
+        override = _component_event(event.href, event.etag, vevent, tz)
+        override.recurrence_id = recurrence_id
+        event.overrides[recurrence_id] = override
+    event.recurrence = Recurrence(
+        rule,
+        dtstart,
+        event.end - event.start,
+        exdates=frozenset(exdates),
+        rdates=tuple(
+            ical.timestamp(value, tz) for value in ical.date_values(master, "RDATE", tz)
+        ),
+    )
+
+
+def _busy_span(event: Optional[StoredEvent]) -> Optional[tuple[int, int]]:
+    "интервал, который разовое событие добавляет в индекс занятости"
+    if event is None or event.recurrence is not None or event.transparent:
+        return None
+    return event.start, event.end
+
+
+def encode_cursor(item: tuple[int, int, str]) -> str:
+    "непрозрачный курсор страницы: позиция последнего выданного события"
+    return base64.urlsafe_b64encode(json.dumps(item).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[int, int, str]:
+    try:
+        start, end, href = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return int(start), int(end), str(href)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Некорректный cursor: {cursor!r}") from e
+
+
+class IntervalIndex:
+    """
+    Интервалы [start, end), упорядоченные по началу. Поиск пересечений с
+    окном — бинарный поиск по началу с запасом на самый длинный интервал:
+    O(log n + k). Интервалы длиннее `LONG_EVENT` лежат в отдельном списке и
+    не раздувают этот запас.
+    """
+
+    def __init__(self):
+        self._items: list[tuple[int, int, str]] = []
+        self._long: list[tuple[int, int, str]] = []
+        self._spans: dict[str, tuple[int, int]] = {}
+        self._max_length = 0
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+    def rebuild(self, spans: dict[str, tuple[int, int]]) -> None:
+        self._spans = dict(spans)
+        items = sorted((start, end, key) for key, (start, end) in spans.items())
+        self._items = [item for item in items if item[1] - item[0] <= LONG_EVENT]
+        self._long = [item for item in items if item[1] - item[0] > LONG_EVENT]
+        self._max_length = max((end - start for start, end, _ in self._items), default=0)
+
+    def add(self, key: str, start: int, end: int) -> None:
+        self.remove(key)
+        self._spans[key] = (start, end)
+        if end - start > LONG_EVENT:
+            bisect.insort(self._long, (start, end, key))
+        else:
+            bisect.insort(self._items, (start, end, key))
+            self._max_length = max(self._max_length, end - start)
+
+    def remove(self, key: str) -> None:
+        span = self._spans.pop(key, None)
+        if span is None:
+            return
+        items = self._long if span[1] - span[0] > LONG_EVENT else self._items
+        position = bisect.bisect_left(items, (span[0], span[1], key))
+        if position < len(items) and items[position][2] == key:
+            del items[position]
+
+    def overlapping(
+        self, start: int, end: int, after: Optional[tuple[int, int, str]] = None
+    ) -> Iterator[tuple[int, int, str]]:
+        """
+        Интервалы (start, end, key), пересекающие [start, end), по возрастанию
+        начала (лениво); `after` — продолжить после этого элемента.
+        """
+        return heapq.merge(
+            self._scan(self._items, start, end, self._max_length, after),
+            (
+                item
+                for item in self._long
+                if item[0] < end and item[1] > start and (after is None or item > after)
+            ),
+        )
+
+    @staticmethod
+    def _scan(items, start: int, end: int, max_length: int, after=None):
+        position = bisect.bisect_left(items, (start - max_length,))
+        if after is not None:
+            position = max(position, bisect.bisect_right(items, after))
+        for index in range(position, len(items)):
+            item = items[index]
+            if item[0] >= end:
+                break
+            # события нулевой длины попадают в окно, если начинаются в нём
+            if item[1] > start or item[0] == item[1] >= start:
+                yield item
+
+
+class EventStore:
+    """
+    Локальная копия событий календаря по href и etag.
+
+    Синхронизация инкрементальная: сначала сравнивается ctag календаря
+    (один PROPFIND), затем отчёт sync-collection (RFC 6578) возвращает
+    только изменённые и удалённые href, и изменённые события скачиваются
+    через calendar-multiget. Если сервер не поддерживает sync-collection,
+    etag'и сравниваются по PROPFIND Depth 1. Запросы по времени отвечают
+    из IntervalIndex; данные старше `max_staleness` секунд обновляются
+    перед ответом.
+
+    Запись — условными PUT/DELETE (не больше `write_concurrency`
+    одновременно) с etag; записанное событие сразу попадает в локальную
+    копию со своим etag, и синхронизация его повторно не скачивает.
+    """
+
+    def __init__(
+        self,
+        calendar: Calendar,
+        max_staleness: float = 60.0,
+        write_concurrency: int = 4,
+        tz: tzinfo = DEFAULT_TZ,
+    ):
+        self.calendar = calendar
+        self.max_staleness = max_staleness
+        # пояс пользователя: floating-время, даты событий на весь день и
+        # ответы по умолчанию
+        self.tz = tz
+        self.ctag: Optional[str] = None
+        self.sync_token: Optional[str] = None
+        self.supports_sync: Optional[bool] = None
+        self.synced_at: Optional[float] = None
+        self._events: dict[str, StoredEvent] = {}
+        self._uids: dict[str, str] = {}
+        self._index = IntervalIndex()
+        # повторяющиеся серии не лежат в индексе: их экземпляры
+        # разворачиваются под окно запроса
+        self._series: dict[str, StoredEvent] = {}
+        # занятость разовых событий строится при первом запросе и дальше
+        # обновляется по одному событию; None — нужно перестроить
+        self._busy: Optional[BusyIndex] = None
+        # занятость от free-busy-query и окна, для которых она получена
+        self.supports_freebusy: Optional[bool] = None
+        self._server_busy = BusyIndex()
+        self._server_coverage = BusyIndex()
+        # href, записанные этим процессом: их появление при синхронизации
+        # не делает недействительной занятость от сервера
+        self._own_writes: set[str] = set()
+        self._lock = asyncio.Lock()
+        # одновременных PUT/DELETE не больше write_concurrency
+        self._write_slots = asyncio.Semaphore(write_concurrency)
+        self.metrics = {
+            "syncs": 0,
+            "ctag_hits": 0,
+            "full_syncs": 0,
+            "etag_scans": 0,
+            "fetched": 0,
+            "deleted": 0,
+            "queries": 0,
+            "freebusy_queries": 0,
+            "writes": 0,
+            "conflicts": 0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def stats(self) -> dict:
+        return {
+            **self.metrics,
+            "events": len(self._events),
+            "series": len(self._series),
+            "busy_intervals": len(self._busy) if self._busy is not None else None,
+            "free_busy_query": self.supports_freebusy,
+            "sync_collection": self.supports_sync,
+            "age": round(time.monotonic() - self.synced_at, 1) if self.synced_at else None,
+        }
+
+    def is_stale(self) -> bool:
+        return self.synced_at is None or time.monotonic() - self.synced_at > self.max_staleness
+
+    def mark_stale(self) -> None:
+        """Следующий запрос сверится с сервером."""
+        self.synced_at = None
+
+    async def ensure_fresh(self) -> None:
+        if not self.is_stale():
+            return
+        async with self._lock:
+            if self.is_stale():
+                await self.sync()
+
+    async def events_between(
+        self, start: datetime, end: datetime, limit: Optional[int] = None
+    ) -> list[StoredEvent]:
+        """События, пересекающие [start, end), по возрастанию начала."""
+        events, _ = await self.events_page(start, end, limit)
+        return events
+
+    async def events_page(
+        self,
+        start: datetime,
+        end: datetime,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> tuple[list[StoredEvent], Optional[str]]:
+        """
+        Не больше `limit` событий из [start, end) по возрастанию начала и
+        курсор следующей страницы (None — событий больше нет). Обход индекса
+        и развёртывание серий останавливаются на limit + 1-м событии.
+        """
+        after = decode_cursor(cursor) if cursor else None
+        await self.ensure_fresh()
+        self.metrics["queries"] += 1
+        window_start, window_end = int(start.timestamp()), int(end.timestamp())
+        streams = [
+            (
+                (*item, self._events[item[2]])
+                for item in self._index.overlapping(window_start, window_end, after)
+            )
+        ]
+        # экземпляры раньше курсора не нужны: окно серий начинается с него
+        lower = max(window_start, after[0]) if after else window_start
+        for series in self._series.values():
+            streams.append(series.instances(lower, window_end))
+        result, last = [], None
+        for item in heapq.merge(*streams, key=_position):
+            if after is not None and _position(item) <= after:
+                continue
+            if limit is not None and len(result) >= limit:
+                return result, encode_cursor(_position(last))
+            result.append(item[3])
+            last = item
+        return result, None
+
+    async def busy(self, start: int, end: int) -> tuple[list[tuple[int, int]], str]:
+        """
+        Объединённые интервалы занятости в [start, end) и их источник:
+        "server" — отчёт free-busy-query (запрашиваются только ещё не
+        покрытые части окна), "local" — события локальной копии.
+        """
+        await self.ensure_fresh()
+        if self.supports_freebusy is not False:
+            try:
+                for gap_start, gap_end in self._server_coverage.gaps(start, end):
+                    for busy_start, busy_end in await self._free_busy_query(gap_start, gap_end):
+                        self._server_busy.add(busy_start, busy_end)
+                    self._server_coverage.add(gap_start, gap_end)
+                self.supports_freebusy = True
+                return self._server_busy.busy(start, end), "server"
+            except ReportUnsupported as e:
+                log.info("CalDAV: free-busy-query недоступен (%s), занятость считается локально", e)
+                self.supports_freebusy = False
+        return self._local_busy(start, end), "local"
+
+    def find(self, uid: str) -> Optional[StoredEvent]:
+        "событие локальной копии по UID"
+        href = self._uids.get(uid)
+        return self._events.get(href) if href is not None else None
+
+    def href_for(self, uid: str) -> str:
+        "путь нового ресурса события в календаре"
+        name = uid if _SAFE_NAME.fullmatch(uid) else uuid.uuid5(uuid.NAMESPACE_URL, uid).hex
+        return f"{self._collection_path()}{name}.ics"
+
+    # === Запись ===
+
+    async def put_event(
+        self, href: str, ics: str, etag: Optional[str] = None, create: bool = False
+    ) -> Optional[StoredEvent]:
+        """
+        PUT события. create — только если ресурса ещё нет (If-None-Match: *),
+        иначе с etag — только если он не изменился (If-Match). 412 —
+        PreconditionFailed. Локальная копия обновляется без синхронизации.
+        """
+        headers = {"Content-Type": "text/calendar; charset=utf-8"}
+        if create:
+            headers["If-None-Match"] = "*"
+        elif etag:
+            headers["If-Match"] = etag
+        response = await self._write("PUT", href, ics, headers)
+        # сервер, изменивший данные при записи, ETag не возвращает:
+        # тогда событие скачается при следующей синхронизации
+        return self.record_write(href, ics, response.headers.get("ETag"))
+
+    async def delete_event(self, href: str, etag: Optional[str] = None) -> None:
+        """DELETE события (If-Match, если etag известен); 404 — EventNotFound."""
+        headers = {"If-Match": etag} if etag else {}
+        try:
+            await self._write("DELETE", href, None, headers)
+        except EventNotFound:
+            # уже удалено на сервере — в локальной копии тоже не нужно
+            self.record_delete(href)
+            raise
+        self.record_delete(href)
+
+    async def raw_events(self, hrefs: list[str]) -> dict[str, tuple[Optional[str], str]]:
+        "{href: (etag, calendar-data)} для изменения событий"
+        return {href: (etag, data) async for href, etag, data in self._multiget(hrefs)}
+
+    def record_write(
+        self, href: str, ics: str, etag: Optional[str] = None
+    ) -> Optional[StoredEvent]:
+        """
+        Добавляет событие, только что записанное на сервер, без синхронизации:
+        индексы и занятость обновляются по одному событию.
+        """
+        event = _parse_event(href, etag, ics, self.tz)
+        if event is None:
+            return None
+        previous = self._events.get(href)
+        self._own_writes.add(href)
+        self.upsert(event)
+        span = _busy_span(event)
+        if previous is None and event.recurrence is None:
+            if span is not None:
+                self._server_busy.add(*span)
+        elif (
+            event.recurrence is not None
+            or previous.recurrence is not None
+            or _busy_span(previous) != span
+        ):
+            # освободившееся время из ответа сервера не вычесть — запросить заново
+            self._reset_server_busy()
+        return event
+
+    def record_delete(self, href: str) -> None:
+        "убирает удалённое этим процессом событие из локальной копии"
+        event = self._events.get(href)
+        if event is None:
+            return
+        self._own_writes.add(href)
+        if event.recurrence is not None or _busy_span(event) is not None:
+            self._reset_server_busy()
+        self._remove(href)
+
+    async def _write(self, method: str, href: str, body: Optional[str], headers: dict):
+        async with self._write_slots:
+            self.metrics["writes"] += 1
+            response = await self.calendar.client.request(
+                self.calendar.url.join(quote(href)), method, body, headers
+            )
+        if response.status == 412:
+            self.metrics["conflicts"] += 1
+            raise PreconditionFailed(f"{href}: {response.status} {response.reason}")
+        if response.status == 404:
+            raise EventNotFound(href)
+        if response.status >= 400:
+            raise RuntimeError(f"CalDAV {method}: {response.status} {response.reason}")
+        return response
+
+    def _local_busy(self, start: int, end: int) -> list[tuple[int, int]]:
+        if self._busy is None:
+            self._busy = BusyIndex(
+                (event.start, event.end)
+                for event in self._events.values()
+                if event.recurrence is None and not event.transparent
+            )
+        instances = (
+            (instance.start, instance.end)
+            for series in self._series.values()
+            for *_, instance in series.instances(start, end)
+            if not instance.transparent
+        )
+        busy = heapq.merge(self._busy.busy(start, end), sorted(instances))
+        return [(max(a, start), min(b, end)) for a, b in merge_intervals(busy)]
+
+    def _reset_server_busy(self) -> None:
+        self._server_busy = BusyIndex()
+        self._server_coverage = BusyIndex()
+
+    async def _free_busy_query(self, start: int, end: int) -> list[tuple[int, int]]:
+        self.metrics["freebusy_queries"] += 1
+        body = _FREE_BUSY_QUERY.format(start=format_utc(start), end=format_utc(end))
+        try:
+            response = await self.calendar.client.request(
+                self.calendar.url,
+                "REPORT",
+                body,
+                {"Depth": "1", "Content-Type": 'application/xml; charset="utf-8"'},
+            )
+        except error.AuthorizationError as e:
+            # 403 — нет права CALDAV:read-free-busy
+            raise ReportUnsupported(e.reason) from e
+        if response.status >= 400 or not response.raw:
+            raise ReportUnsupported(f"{response.status} {response.reason}")
+        raw = response.raw.decode() if isinstance(response.raw, bytes) else response.raw
+        return parse_freebusy(raw)
+
+    # === Синхронизация ===
+
+    async def sync(self) -> None:
+        """Приводит локальную копию в соответствие с сервером."""
+        self.metrics["syncs"] += 1
+        ctag, token = await self._collection_state()
+        if ctag is not None and ctag == self.ctag:
+            self.metrics["ctag_hits"] += 1
+            self.synced_at = time.monotonic()
+            return
+
+        changed, deleted = None, set()
+        if self.supports_sync is not False:
+            try:
+                try:
+                    changed, deleted, token = await self._sync_collection(self.sync_token or "")
+                except SyncTokenInvalid:
+                    log.info("CalDAV: sync-token устарел, полная синхронизация")
+                    self._reset()
+                    changed, deleted, token = await self._sync_collection("")
+                self.supports_sync = True
+            except ReportUnsupported as e:
+                log.info("CalDAV: sync-collection недоступен (%s), сравниваем etag", e)
+                self.supports_sync = False
+        if changed is None:
+            etags = await self._list_etags()
+            deleted = set(self._events) - set(etags)
+            changed = etags
+            token = None
+            self.metrics["etag_scans"] += 1
+
+        stale = [href for href, etag in changed.items() if self._etag(href) != etag or etag is None]
+        # занятость от сервера устарела, если изменения сделаны не этим процессом
+        if any(href not in self._own_writes for href in (*stale, *deleted)):
+            self._reset_server_busy()
+        self._own_writes.difference_update(changed)
+        self._own_writes.difference_update(deleted)
+        await self._fetch(stale)
+        for href in deleted:
+            self._remove(href)
+        self.ctag = ctag
+        self.sync_token = token
+        self.synced_at = time.monotonic()
+
+    def upsert(self, event: StoredEvent) -> None:
+        previous = self._events.get(event.href)
+        self._events[event.href] = event
+        self._uids[event.uid] = event.href
+        self._update_busy(previous, event)
+        if event.recurrence is not None:
+            self._index.remove(event.href)
+            self._series[event.href] = event
+        else:
+            self._series.pop(event.href, None)
+            self._index.add(event.href, event.start, event.end)
+
+    def _update_busy(self, previous: Optional[StoredEvent], event: StoredEvent) -> None:
+        "новое разовое событие сливается с индексом занятости, прочие изменения его сбрасывают"
+        if self._busy is None or _busy_span(previous) == _busy_span(event):
+            return
+        if _busy_span(previous) is None and event.recurrence is None:
+            self._busy.add(event.start, event.end)
+        else:
+            self._busy = None
+
+    def _remove(self, href: str) -> None:
+        event = self._events.pop(href, None)
+        if event is not None:
+            if self._uids.get(event.uid) == href:
+                del self._uids[event.uid]
+            if _busy_span(event) is not None:
+                self._busy = None
+            self._index.remove(href)
+            self._series.pop(href, None)
+            self.metrics["deleted"] += 1
+
+    def _reset(self) -> None:
+        self._events = {}
+        self._uids = {}
+        self._index = IntervalIndex()
+        self._series = {}
+        self._busy = None
+        self.metrics["full_syncs"] += 1
+
+    def _etag(self, href: str) -> Optional[str]:
+        event = self._events.get(href)
+        return event.etag if event else None
+
+    async def _request(self, method: str, body: str, depth: int):
+        client = self.calendar.client
+        response = await client.request(
+            self.calendar.url,
+            method,
+            body,
+            {"Depth": str(depth), "Content-Type": 'application/xml; charset="utf-8"'},
+        )
+        if response.status >= 400:
+            raise RuntimeError(f"CalDAV {method}: {response.status} {response.reason}")
+        return response
+
+    async def _collection_state(self) -> tuple[Optional[str], Optional[str]]:
+        "ctag и sync-token календаря одним PROPFIND"
+        response = await self._request("PROPFIND", _PROPFIND_STATE, 0)
+        tree = response.tree
+        ctag = tree.findtext(f".//{_CS}getctag") if tree is not None else None
+        token = tree.findtext(f".//{_DAV}sync-token") if tree is not None else None
+        return ctag or None, token or None
+
+    async def _sync_collection(self, token: str):
+        "изменённые (href → etag) и удалённые href с момента token"
+        try:
+            response = await self.calendar.client.request(
+                self.calendar.url,
+                "REPORT",
+                _SYNC_COLLECTION.format(token=escape(token)),
+                {"Depth": "0", "Content-Type": 'application/xml; charset="utf-8"'},
+            )
+        except error.AuthorizationError as e:
+            # 403 — и устаревший токен (DAV:valid-sync-token), и неподдерживаемый отчёт
+            if token:
+                raise SyncTokenInvalid(e.reason) from e
+            raise ReportUnsupported(e.reason) from e
+        if response.status in (403, 409) and token:
+            raise SyncTokenInvalid(response.reason)
+        if response.status >= 400 or response.tree is None:
+            raise ReportUnsupported(f"{response.status} {response.reason}")
+        changed, deleted = {}, set()
+        for item in response.tree.iter(f"{_DAV}response"):
+            href = self._href(item)
+            if href is None or href == self._collection_path():
+                continue
+            status = item.findtext(f"{_DAV}status") or ""
+            if " 404 " in status:
+                deleted.add(href)
+            else:
+                changed[href] = item.findtext(f".//{_DAV}getetag")
+        return changed, deleted, response.tree.findtext(f"{_DAV}sync-token")
+
+    async def _list_etags(self) -> dict[str, Optional[str]]:
+        response = await self._request("PROPFIND", _PROPFIND_ETAGS, 1)
+        etags = {}
+        for item in response.tree.iter(f"{_DAV}response"):
+            href = self._href(item)
+            if href is not None and href != self._collection_path():
+                etags[href] = item.findtext(f".//{_DAV}getetag")
+        return etags
+
+    async def _fetch(self, hrefs: list[str]) -> None:
+        "скачивает события и обновляет локальную копию"
+        async for href, etag, data in self._multiget(hrefs):
+            self.metrics["fetched"] += 1
+            event = _parse_event(href, etag, data, self.tz)
+            if event is None:
+                self._remove(href)
+            else:
+                self.upsert(event)
+
+    async def _multiget(
+        self, hrefs: list[str]
+    ) -> AsyncIterator[tuple[str, Optional[str], str]]:
+        "(href, etag, calendar-data) через calendar-multiget пачками по MULTIGET_BATCH"
+        for offset in range(0, len(hrefs), MULTIGET_BATCH):
+            batch = hrefs[offset : offset + MULTIGET_BATCH]
+            body = _MULTIGET.format(
+                hrefs="".join(f"<D:href>{escape(href)}</D:href>" for href in batch)
+            )
+            response = await self._request("REPORT", body, 1)
+            for item in response.tree.iter(f"{_DAV}response"):
+                href = self._href(item)
+                data = item.findtext(f".//{_CALDAV}calendar-data")
+                if href is None or not data:
+                    continue
+                yield href, item.findtext(f".//{_DAV}getetag"), data
+
+    def _collection_path(self) -> str:
+        return unquote(self.calendar.url.path)
+
+    @staticmethod
+    def _href(item) -> Optional[str]:
+        href = item.findtext(f"{_DAV}href")
+        return unquote(href) if href else None
+
+
+def day_bounds(day: date, tz=DEFAULT_TZ) -> tuple[datetime, datetime]:
+    "начало и конец суток day в часовом поясе tz"
+    start = datetime(day.year, day.month, day.day, tzinfo=tz)
+    return start, start + timedelta(days=1)
@@ -1,17 +1,45 @@
-import uuid
 from datetime import (
     datetime,
     timedelta,
-    timezone,
 )
 from typing import Optional
 
-import vobject
-from aiocaldav import Event
 from fastmcp import FastMCP
 
+from . import ical
+from .freebusy import (
+    BusyIndex,
+    free_slots,
+    working_windows,
+)
+from .writes import (
+    create_events,
+    delete_events,
+    update_events,
+)
+
+
+def _aware(value: datetime, tz) -> datetime:
+    "время без часового пояса считается заданным в tz"
+    return value if value.tzinfo else value.replace(tzinfo=tz)
 
-def setup_tools(mcp: FastMCP, _get_calendar: callable):
+
+def _zone(name: Optional[str], default):
+    "часовой пояс IANA по имени; без имени — default (пояс пользователя)"
+    if not name:
+        return default
+    zone = ical.zone(name)
+    if zone is None:
+        raise ValueError(f"Неизвестный часовой пояс: {name!r}")
+    return zone
+
+
+def setup_tools(
+    mcp: FastMCP,
+    _get_calendar: callable,
+    _get_calendar_session: callable,
+    _get_event_store: callable,
+):
     @mcp.tool
     async def create_calendar_event(
         summary: str,
@@ -19,58 +47,155 @@ def setup_tools(mcp: FastMCP, _get_calendar: callable):
         end: str,
         description: Optional[str] = None,
         location: Optional[str] = None,
+        calendar: Optional[str] = None,
+        tz: Optional[str] = None,
     ) -> dict:
         """
         Создать новое событие в календаре.
         Формат даты/времени: ISO 8601 (например, "2025-12-05T10:00:00").
+        Время без смещения понимается в поясе tz (IANA, например,
+        "Europe/Berlin"), по умолчанию — в поясе пользователя.
+        calendar — имя календаря (см. list_calendars), по умолчанию основной.
         """
-        cal = await _get_calendar()
-        start_dt = datetime.fromisoformat(start)
-        end_dt = datetime.fromisoformat(end)
-        vevent = vobject.iCalendar()
-        vevent.add("vevent")
-        vevent.vevent.add("uid").value = str(uuid.uuid4())
-        vevent.vevent.add("summary").value = summary
-        vevent.vevent.add("dtstart").value = start_dt
-        vevent.vevent.add("dtend").value = end_dt
+        store = await _get_event_store(calendar)
+        item = {"summary": summary, "start": start, "end": end}
         if description:
-            vevent.vevent.add("description").value = description
+            item["description"] = description
         if location:
-            vevent.vevent.add("location").value = location
-        await cal.add_event(vevent.serialize())
-        return {"status": "event_created", "summary": summary}
+            item["location"] = location
+        [result] = await create_events(store, [item], _zone(tz, store.tz))
+        if result["status"] != "created":
+            raise ValueError(result.get("error", result["status"]))
+        return {"status": "event_created", "summary": summary, "uid": result["uid"]}
+
+    @mcp.tool
+    async def create_calendar_events(
+        events: list[dict],
+        calendar: Optional[str] = None,
+        tz: Optional[str] = None,
+    ) -> dict:
+        """
+        Создать несколько событий за один вызов.
+        events — список объектов с полями summary, start, end (ISO 8601;
+        дата без времени — событие на весь день), необязательными
+        description, location и uid. Время без смещения — в поясе tz,
+        по умолчанию в поясе пользователя.
+        Результат — по каждому событию в том же порядке: status "created",
+        "conflict" (событие с таким uid уже есть) или "error".
+        """
+        store = await _get_event_store(calendar)
+        return {"results": await create_events(store, events, _zone(tz, store.tz))}
+
+    @mcp.tool
+    async def update_calendar_event(
+        events: list[dict],
+        calendar: Optional[str] = None,
+        tz: Optional[str] = None,
+    ) -> dict:
+        """
+        Изменить одно или несколько событий.
+        events — список объектов с uid события (см. list_calendar_events) и
+        полями, которые нужно изменить: summary, start, end, description,
+        location; пустая строка удаляет описание или место. Остальные
+        свойства события сохраняются. Если задан только start, событие
+        переносится целиком: конец сдвигается на столько же. Время без
+        смещения — в поясе tz, по умолчанию в поясе пользователя.
+        Результат — по каждому событию: status "updated", "not_found",
+        "conflict" (событие изменили параллельно — прочитайте заново) или
+        "error".
+        """
+        store = await _get_event_store(calendar)
+        return {"results": await update_events(store, events, _zone(tz, store.tz))}
+
+    @mcp.tool
+    async def delete_calendar_events(
+        uids: list[str],
+        calendar: Optional[str] = None,
+    ) -> dict:
+        """
+        Удалить события по uid (см. list_calendar_events).
+        Результат — по каждому uid: status "deleted", "not_found",
+        "conflict" (событие изменили параллельно) или "error".
+        """
+        store = await _get_event_store(calendar)
+        return {"results": await delete_events(store, uids)}
+
+    @mcp.tool
+    async def list_calendars() -> dict:
+        """Список календарей пользователя; основной помечен default."""
+        session = _get_calendar_session()
+        calendars = await session.calendars()
+        default = await session.calendar()
+        return {
+            "calendars": [
+                {"name": name, "url": str(cal.url), "default": cal is default}
+                for name, cal in calendars.items()
+            ]
+        }
 
     @mcp.tool
     async def list_calendar_events(
-        start: str = None, end: str = None, limit: int = 10
+        start: str = None,
+        end: str = None,
+        limit: int = 10,
+        calendar: Optional[str] = None,
+        cursor: Optional[str] = None,
+        tz: Optional[str] = None,
     ) -> dict:
         """
         Получить список событий в заданном временном диапазоне.
         Если диапазон не указан — возвращает события за ближайшие 7 дней.
+        События отсортированы по началу; первые `limit` событий, а если есть
+        ещё — next_cursor: передайте его в cursor с тем же диапазоном,
+        чтобы получить следующую страницу.
+        calendar — имя календаря (см. list_calendars), по умолчанию основной.
+        tz — часовой пояс IANA для диапазона без смещения и времени в ответе,
+        по умолчанию пояс пользователя.
         """
-        cal = await _get_calendar()
-        msk_tz = timezone(timedelta(hours=3), name="MSK")
-        now = datetime.now(msk_tz)
-        start_dt = datetime.fromisoformat(start) if start else now
-        end_dt = datetime.fromisoformat(end) if end else (now + timedelta(days=7))
-        events: list[Event] = await cal.date_search(start_dt, end_dt)
-        result = []
-        for ev in events[:limit]:
-            comp = ev.instance.vevent
-            result.append(
+        store = await _get_event_store(calendar)
+        zone = _zone(tz, store.tz)
+        now = datetime.now(zone)
+        start_dt = _aware(datetime.fromisoformat(start), zone) if start else now
+        end_dt = _aware(datetime.fromisoformat(end), zone) if end else (now + timedelta(days=7))
+        events, next_cursor = await store.events_page(start_dt, end_dt, limit, cursor)
+        return {"events": [event.to_dict(zone) for event in events], "next_cursor": next_cursor}
+
+    @mcp.tool
+    async def find_free_slots(
+        duration: int = 30,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        working_hours: Optional[str] = "Mon-Fri 09:00-18:00",
+        tz: Optional[str] = None,
+        limit: int = 10,
+        calendar: Optional[str] = None,
+    ) -> dict:
+        """
+        Найти свободные окна для встречи длительностью duration минут.
+        Диапазон start–end в ISO 8601, по умолчанию ближайшие 7 дней.
+        working_hours — рабочие часы, например "Mon-Fri 09:00-18:00" или
+        "09:00-18:00" (каждый день); пустая строка — круглые сутки.
+        tz — часовой пояс IANA (например, "Europe/Berlin") для рабочих часов
+        и ответа, по умолчанию пояс пользователя. Возвращает до limit свободных промежутков не короче
+        duration: встречу можно поставить в любое место промежутка.
+        """
+        store = await _get_event_store(calendar)
+        zone = _zone(tz, store.tz)
+        now = datetime.now(zone)
+        start_dt = _aware(datetime.fromisoformat(start), zone) if start else now
+        end_dt = _aware(datetime.fromisoformat(end), zone) if end else start_dt + timedelta(days=7)
+        windows = working_windows(start_dt, end_dt, working_hours, zone)
+
+        busy, source = await store.busy(int(start_dt.timestamp()), int(end_dt.timestamp()))
+        slots = free_slots(BusyIndex(busy), windows, duration * 60, limit)
+        return {
+            "slots": [
                 {
-                    "uid": str(comp.uid.value),
-                    "summary": comp.summary.value
-                    if hasattr(comp.summary, "value")
-                    else "",
-                    "description": comp.description.value
-                    if hasattr(comp, "description")
-                    else "",
-                    "location": comp.location.value
-                    if hasattr(comp, "location")
-                    else "",
-                    "start": comp.dtstart.value.isoformat(),
-                    "end": comp.dtend.value.isoformat(),
+                    "start": datetime.fromtimestamp(slot_start, zone).isoformat(),
+                    "end": datetime.fromtimestamp(slot_end, zone).isoformat(),
+                    "minutes": (slot_end - slot_start) // 60,
                 }
-            )
-        return {"events": result}
+                for slot_start, slot_end in slots
+            ],
+            "source": source,
+        }
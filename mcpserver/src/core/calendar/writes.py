@@ -0,0 +1,181 @@
+"""
+Пакетная запись событий календаря. Элементы пакета записываются
+параллельно (ограничение числа одновременных запросов — в EventStore),
+результат возвращается по каждому элементу: ошибка одного не отменяет
+остальные.
+"""
+
+import asyncio
+import logging
+import uuid
+from datetime import (
+    date,
+    datetime,
+    timedelta,
+    tzinfo,
+)
+from typing import (
+    Awaitable,
+    Callable,
+    Optional,
+)
+
+from . import ical
+from .store import (
+    EventNotFound,
+    EventStore,
+    PreconditionFailed,
+)
+
+log = logging.getLogger(__name__)
+
+FIELDS = (*ical.TEXT_FIELDS, *ical.TIME_FIELDS)
+
+
+def parse_time(value: str, tz: tzinfo) -> date | datetime:
+    """
+    ISO 8601: YYYY-MM-DD — событие на весь день, иначе дата и время;
+    время без смещения — в поясе tz.
+    """
+    value = value.strip()
+    if len(value) == 10:
+        return date.fromisoformat(value)
+    result = datetime.fromisoformat(value)
+    return result if result.tzinfo else result.replace(tzinfo=tz)
+
+
+def event_fields(item: dict, tz: tzinfo, partial: bool = False) -> dict:
+    """
+    Поля события из элемента пакета; partial — изменение, где достаточно
+    любых полей. ValueError для неизвестных полей и некорректного времени.
+    """
+    unknown = set(item) - set(FIELDS) - {"uid"}
+    if unknown:
+        raise ValueError(f"Неизвестные поля: {', '.join(sorted(unknown))}")
+    fields = {key: item[key] or "" for key in ical.TEXT_FIELDS if key in item}
+    fields.update({key: parse_time(item[key], tz) for key in ical.TIME_FIELDS if item.get(key)})
+    if not partial and not (fields.get("summary") and "start" in fields and "end" in fields):
+        raise ValueError("Нужны summary, start и end")
+    if not fields:
+        raise ValueError("Нет полей для изменения")
+    start, end = fields.get("start"), fields.get("end")
+    if start is not None and end is not None:
+        _check_span(start, end)
+    return fields
+
+
+def _check_span(start: date | datetime, end: date | datetime) -> None:
+    if isinstance(start, datetime) != isinstance(end, datetime):
+        raise ValueError("start и end должны быть оба датами или оба датой и временем")
+    if end < start:
+        raise ValueError("end раньше start")
+
+
+def merge_times(fields: dict, ics: str, tz: tzinfo) -> dict:
+    """
+    Изменение времени с учётом сохранённого события: при одном start конец
+    сдвигается, чтобы длительность не изменилась; один end проверяется
+    относительно текущего начала. ValueError, если end раньше start или
+    одно из них — дата, а другое — дата и время.
+    """
+    start, end = fields.get("start"), fields.get("end")
+    if (start is None) == (end is None):
+        return fields
+    master = next(
+        (
+            vevent
+            for vevent in ical.iter_components(ics, "VEVENT", ical.EVENT_PROPERTIES)
+            if "DTSTART" in vevent and "RECURRENCE-ID" not in vevent
+        ),
+        None,
+    )
+    if master is None:
+        return fields
+    old_start = ical.parse_datetime(*master["DTSTART"][0], tz)
+    if end is not None:
+        _check_span(old_start, end)
+        return fields
+    if isinstance(start, datetime) != isinstance(old_start, datetime):
+        raise ValueError("start меняет тип события (дата или дата и время) — укажите и end")
+    if "DTEND" in master:
+        old_end = ical.parse_datetime(*master["DTEND"][0], tz)
+    elif "DURATION" in master:
+        old_end = old_start + ical.parse_duration(master["DURATION"][0][1])
+    else:
+        # без DTEND и DURATION событие на весь день длится день, остальные — ноль
+        old_end = old_start if isinstance(old_start, datetime) else old_start + timedelta(days=1)
+    return {**fields, "end": start + (old_end - old_start)}
+
+
+async def create_events(store: EventStore, items: list[dict], tz: tzinfo) -> list[dict]:
+    """Создаёт события; UID, если не задан, генерируется."""
+
+    async def create(item: dict) -> dict:
+        fields = event_fields(item, tz)
+        uid = item.get("uid") or str(uuid.uuid4())
+        await store.put_event(store.href_for(uid), ical.serialize_event(uid, fields), create=True)
+        return {"uid": uid, "status": "created", "summary": fields["summary"]}
+
+    return await _each(items, lambda item: item.get("uid"), create)
+
+
+async def update_events(store: EventStore, items: list[dict], tz: tzinfo) -> list[dict]:
+    """
+    Меняет поля событий по UID. Текущие данные всех событий пакета
+    скачиваются одним calendar-multiget, изменённые записываются с
+    If-Match: если событие успели изменить — conflict.
+    """
+    await store.ensure_fresh()
+    hrefs = {}
+    for item in items:
+        event = store.find(item.get("uid") or "")
+        if event is not None:
+            hrefs[event.uid] = event.href
+    current = await store.raw_events(list(set(hrefs.values())))
+
+    async def update(item: dict) -> dict:
+        fields = event_fields(item, tz, partial=True)
+        href = hrefs.get(item.get("uid"))
+        if href is None or href not in current:
+            raise EventNotFound(item.get("uid"))
+        etag, ics = current[href]
+        fields = merge_times(fields, ics, tz)
+        await store.put_event(href, ical.patch_event(ics, fields), etag)
+        return {"uid": item["uid"], "status": "updated"}
+
+    return await _each(items, lambda item: item.get("uid"), update)
+
+
+async def delete_events(store: EventStore, uids: list[str]) -> list[dict]:
+    """Удаляет события по UID; изменённые после синхронизации — conflict."""
+    await store.ensure_fresh()
+
+    async def delete(uid: str) -> dict:
+        event = store.find(uid)
+        if event is None:
+            raise EventNotFound(uid)
+        await store.delete_event(event.href, event.etag)
+        return {"uid": uid, "status": "deleted"}
+
+    return await _each(uids, lambda uid: uid, delete)
+
+
+async def _each(
+    items: list,
+    uid_of: Callable[[object], Optional[str]],
+    write: Callable[[object], Awaitable[dict]],
+) -> list[dict]:
+    "write для всех элементов параллельно; результаты в порядке элементов"
+
+    async def guarded(item) -> dict:
+        try:
+            return await write(item)
+        except PreconditionFailed as e:
+            return {"uid": uid_of(item), "status": "conflict", "error": str(e)}
+        except EventNotFound:
+            return {"uid": uid_of(item), "status": "not_found"}
+        except Exception as e:
+            log.warning("CalDAV: не удалось записать %s: %s", uid_of(item), e)
+            return {"uid": uid_of(item), "status": "error", "error": str(e)}
+
+    return list(await asyncio.gather(*(guarded(item) for item in items)))
@@ -0,0 +1,135 @@
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime
+from typing import (
+    Awaitable,
+    Callable,
+    Optional,
+)
+
+from fastmcp import (
+    Context,
+    FastMCP,
+)
+
+log = logging.getLogger(__name__)
+
+# Ресурсы модулей, из которых собирается сводка: имя раздела → URI
+DIGEST_SOURCES = {
+    "today": "events://calendar/today",
+    "next_hour": "calendar://calendar/next-hour",
+    "unread": "emails://email/unread",
+}
+
+# Поля событий и писем, которые попадают в сводку
+_EVENT_FIELDS = ("uid", "summary", "start", "end", "location")
+_EMAIL_FIELDS = ("uid", "from", "subject", "date")
+
+
+class DailyDigest:
+    """
+    Сводка дня одним вызовом: события на сегодня, ближайшая встреча и
+    непрочитанные письма. Источники читаются параллельно, собранный снимок
+    живёт `ttl` секунд; одновременные запросы после его устаревания ждут
+    одну сборку. Недоступный источник не ломает сводку — он попадает в
+    errors.
+    """
+
+    def __init__(self, sources: dict[str, str] = DIGEST_SOURCES, ttl: float = 30.0):
+        self.sources = sources
+        self.ttl = ttl
+        self._snapshot: Optional[dict] = None
+        self._expires = 0.0
+        self._lock = asyncio.Lock()
+        self.metrics = {"hits": 0, "builds": 0, "errors": 0}
+
+    def stats(self) -> dict:
+        requests = self.metrics["hits"] + self.metrics["builds"]
+        return {
+            **self.metrics,
+            "hit_rate": round(self.metrics["hits"] / requests, 3) if requests else None,
+            "ttl": self.ttl,
+        }
+
+    async def get(self, read: Callable[[str], Awaitable[dict]], fresh: bool = False) -> dict:
+        """Снимок из кеша или новая сборка; fresh — собрать заново."""
+        if not fresh and self._is_fresh():
+            self.metrics["hits"] += 1
+            return self._snapshot
+        async with self._lock:
+            if not fresh and self._is_fresh():
+                self.metrics["hits"] += 1
+                return self._snapshot
+            snapshot = await self._build(read)
+            self.metrics["builds"] += 1
+            # сводку с ошибками не кешируем: следующий запрос попробует снова
+            if not snapshot["errors"]:
+                self._snapshot = snapshot
+                self._expires = time.monotonic() + self.ttl
+            return snapshot
+
+    def _is_fresh(self) -> bool:
+        return self._snapshot is not None and time.monotonic() < self._expires
+
+    async def _build(self, read: Callable[[str], Awaitable[dict]]) -> dict:
+        names = list(self.sources)
+        results = await asyncio.gather(
+            *(read(self.sources[name]) for name in names), return_exceptions=True
+        )
+        data, errors = {}, {}
+        for name, result in zip(names, results):
+            if isinstance(result, Exception):
+                log.warning("Сводка дня: %s недоступен: %s", self.sources[name], result)
+                self.metrics["errors"] += 1
+                errors[name] = str(result) or type(result).__name__
+            else:
+                data[name] = result
+        today = data.get("today") or {}
+        unread = data.get("unread") or {}
+        next_event = (data.get("next_hour") or {}).get("event")
+        emails = unread.get("emails", [])
+        return {
+            "generated_at": datetime.now().astimezone().isoformat(timespec="seconds"),
+            "events": [_pick(event, _EVENT_FIELDS) for event in today.get("events", [])],
+            "next_event": _pick(next_event, _EVENT_FIELDS) if next_event else None,
+            "unread": {
+                "total": unread.get("total", len(emails)),
+                "emails": [_pick(email, _EMAIL_FIELDS) for email in emails],
+            },
+            "errors": errors,
+        }
+
+
+def _pick(item: dict, fields: tuple[str, ...]) -> dict:
+    return {key: item[key] for key in fields if item.get(key) not in (None, "")}
+
+
+def setup_digest(mcp: FastMCP, digest: DailyDigest):
+    async def read(ctx: Context, uri: str) -> dict:
+        contents = await ctx.read_resource(uri)
+        return json.loads(contents[0].content) if contents else {}
+
+    # === РЕСУРС: digest://daily ===
+    @mcp.resource("digest://daily")
+    async def get_daily_digest(ctx: Context = None) -> dict:
+        """Сводка дня: события на сегодня, ближайшая встреча, непрочитанные письма."""
+        return await digest.get(lambda uri: read(ctx, uri))
+
+    # === ИНСТРУМЕНТ: daily_digest ===
+    @mcp.tool
+    async def daily_digest(fresh: bool = False, ctx: Context = None) -> dict:
+        """
+        Сводка для планирования дня одним вызовом: события на сегодня,
+        ближайшая встреча в течение часа и непрочитанные письма. Вместо
+        отдельных запросов к календарю и почте. Сводка кешируется на
+        несколько секунд; fresh=true — собрать заново.
+        """
+        return await digest.get(lambda uri: read(ctx, uri), fresh=fresh)
+
+    # === РЕСУРС: digest://stats ===
+    @mcp.resource("digest://stats")
+    async def get_daily_digest_stats(ctx: Context = None) -> dict:
+        """Метрики сводки дня: попадания в кеш, сборки, ошибки источников."""
+        return {"description": "Сводка дня", "digest": digest.stats()}
@@ -1,30 +1,182 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import anyio
 from fastmcp import FastMCP
 
 from src.config import Config
+from src.core.subscriptions import subscriptions
+from .cache import MessageCache
+from .index import MailIndex
+from .outbox import Outbox
+from .pool import ImapPool
 from .prompts import setup_prompts
 from .resources import setup_resources
+from .suggestions import EventSuggester
 from .tools import setup_tools
+from .watcher import InboxWatcher
 from .utils import (
-    _send_raw_email,
+    _deliver_email,
+    _send_bulk_emails,
     _fetch_emails,
-    _decode_mime_words,
-    _clean_email_body,
+    _fetch_headers,
+    _fetch_messages,
+    _decode_messages,
+    _get_imap_pool,
+    _get_parse_executor,
+    _get_smtp_sender,
 )
 
+_mail_index = None
+_message_cache = None
+_inbox_watcher = None
+_event_suggester = None
+_outbox = None
+config = Config.load()
+
+UNREAD_URI = "emails://email/unread"
+SUGGESTIONS_URI = "emails://email/event-suggestions"
+
+
+def _get_mail_index() -> MailIndex:
+    "локальный индекс писем"
+    global _mail_index
+    if _mail_index is None:
+        _mail_index = MailIndex(
+            config.email.MAIL_INDEX_PATH,
+            stale_after=config.email.MAIL_INDEX_STALE_AFTER,
+            body_bytes=config.email.MAIL_INDEX_BODY_BYTES,
+        )
+    return _mail_index
+
+
+def _get_outbox() -> Outbox:
+    "очередь исходящих писем на диске"
+    global _outbox
+    if _outbox is None:
+        _outbox = Outbox(
+            config.email.OUTBOX_PATH,
+            max_attempts=config.email.OUTBOX_MAX_ATTEMPTS,
+            backoff=config.email.OUTBOX_RETRY_BACKOFF,
+        )
+    return _outbox
+
+
+def _get_message_cache() -> MessageCache:
+    "кеш разобранных писем для get_email"
+    global _message_cache
+    if _message_cache is None:
+        _message_cache = MessageCache(
+            max_bytes=config.email.MESSAGE_CACHE_MAX_BYTES,
+            disk_path=config.email.MESSAGE_CACHE_DISK_PATH or None,
+            disk_max_bytes=config.email.MESSAGE_CACHE_DISK_MAX_BYTES,
+        )
+    return _message_cache
+
+
+def _get_event_suggester() -> EventSuggester:
+    "фоновая очередь предложений задач по письмам"
+    global _event_suggester
+    if _event_suggester is None:
+        _event_suggester = EventSuggester(
+            concurrency=config.email.EVENT_SUGGESTIONS_CONCURRENCY,
+            max_pending=config.email.EVENT_SUGGESTIONS_MAX_PENDING,
+            cache_size=config.email.EVENT_SUGGESTIONS_CACHE_SIZE,
+        )
+    return _event_suggester
+
+
+async def _notify_suggestions() -> None:
+    await subscriptions.notify(SUGGESTIONS_URI)
+
+
+def _get_inbox_watcher() -> InboxWatcher:
+    "наблюдатель за входящими на отдельном IMAP-соединении (IDLE)"
+    global _inbox_watcher
+    if _inbox_watcher is None:
+        pool = ImapPool(
+            host=config.email.IMAP_HOST,
+            port=config.email.IMAP_PORT,
+            user=config.email.EMAIL_ADDRESS,
+            password=config.email.EMAIL_PASSWORD,
+            size=1,
+            use_ssl=config.email.IMAP_SSL,
+            timeout=config.email.IMAP_TIMEOUT,
+        )
+        _inbox_watcher = InboxWatcher(
+            pool,
+            idle_timeout=config.email.INBOX_IDLE_TIMEOUT,
+            poll_interval=config.email.INBOX_POLL_INTERVAL,
+            on_change=lambda: subscriptions.notify(UNREAD_URI),
+        )
+    return _inbox_watcher
+
+
+@asynccontextmanager
+async def _lifespan(mcp: FastMCP):
+    "фоновые задачи модуля почты"
+    tasks = []
+    if config.email.MAIL_INDEX_SYNC_INTERVAL > 0:
+        tasks.append(
+            asyncio.create_task(
+                _get_mail_index().run_sync_loop(
+                    _get_imap_pool(), config.email.MAIL_INDEX_SYNC_INTERVAL
+                )
+            )
+        )
+    tasks.append(
+        asyncio.create_task(
+            _get_outbox().run(_deliver_email, config.email.OUTBOX_POLL_INTERVAL)
+        )
+    )
+    if config.email.INBOX_WATCH_ENABLED:
+        tasks.append(asyncio.create_task(_get_inbox_watcher().run()))
+    try:
+        yield {}
+    finally:
+        for task in tasks:
+            task.cancel()
+        # транспорт может завершать lifespan внутри уже отменённой области
+        with anyio.CancelScope(shield=True):
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await _get_imap_pool().close()
+            _get_parse_executor().close()
+            await _get_smtp_sender().close()
+            if _event_suggester is not None:
+                await _event_suggester.close()
+            if _inbox_watcher is not None:
+                await _inbox_watcher.pool.close()
+
 
 def create_email_module() -> FastMCP:
-    mcp = FastMCP("EmailModule")
-    config = Config.load()
+    mcp = FastMCP("EmailModule", lifespan=_lifespan)
 
     setup_tools(
         mcp,
         config,
-        _send_raw_email,
+        _get_outbox,
+        _send_bulk_emails,
         _fetch_emails,
-        _decode_mime_words,
-        _clean_email_body,
+        _fetch_messages,
+        _decode_messages,
+        _get_imap_pool,
+        _get_mail_index,
+        _get_message_cache,
+        _get_event_suggester,
+        _notify_suggestions,
+    )
+    setup_resources(
+        mcp,
+        config,
+        _fetch_headers,
+        _get_imap_pool,
+        _get_inbox_watcher,
+        _get_message_cache,
+        _get_parse_executor,
+        _get_event_suggester,
+        _get_smtp_sender,
+        _get_outbox,
     )
-    setup_resources(mcp, config, _decode_mime_words)
     setup_prompts(mcp)
 
     return mcp
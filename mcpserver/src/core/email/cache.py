@@ -0,0 +1,193 @@
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS parsed_messages (
+    mailbox TEXT NOT NULL,
+    uidvalidity INTEGER NOT NULL,
+    uid TEXT NOT NULL,
+    data TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL,
+    PRIMARY KEY (mailbox, uidvalidity, uid)
+);
+CREATE INDEX IF NOT EXISTS parsed_messages_accessed ON parsed_messages (accessed);
+"""
+
+
+class MessageCache:
+    """
+    LRU-кеш разобранных писем (from, subject, очищенный текст).
+
+    Письмо неизменно для пары (UIDVALIDITY, UID), поэтому UIDVALIDITY входит
+    в ключ, а его смена для ящика удаляет все записи прежнего поколения.
+    Память ограничена `max_bytes`; при заданном `disk_path` вытесненные
+    и новые записи хранятся ещё и в SQLite (до `disk_max_bytes`).
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 8 * 1024 * 1024,
+        disk_path: Optional[str] = None,
+        disk_max_bytes: int = 64 * 1024 * 1024,
+    ):
+        self.max_bytes = max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self._entries: OrderedDict[tuple, tuple[dict, int]] = OrderedDict()
+        self._bytes = 0
+        self._uidvalidity: dict[str, int] = {}
+        self._db = None
+        # объём записей на диске: считается один раз при открытии, дальше ведётся по изменениям
+        self._disk_size = 0
+        if disk_path:
+            if disk_path != ":memory:":
+                Path(disk_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.executescript(_SCHEMA)
+            self._disk_size = self._db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM parsed_messages"
+            ).fetchone()[0]
+        self.metrics = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "invalidations": 0,
+        }
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+
+    def stats(self) -> dict:
+        """Счётчики попаданий/промахов и текущий объём кеша."""
+        lookups = self.metrics["hits"] + self.metrics["disk_hits"] + self.metrics["misses"]
+        hits = self.metrics["hits"] + self.metrics["disk_hits"]
+        return {
+            **self.metrics,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "disk_bytes": self._disk_bytes() if self._db else 0,
+        }
+
+    def get(self, mailbox: str, uidvalidity: int, uid: str) -> Optional[dict]:
+        """Разобранное письмо из памяти или с диска; None при промахе."""
+        self._check_uidvalidity(mailbox, uidvalidity)
+        key = (mailbox, uidvalidity, str(uid))
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.metrics["hits"] += 1
+            return entry[0]
+
+        if self._db is not None:
+            row = self._db.execute(
+                "SELECT data FROM parsed_messages"
+                " WHERE mailbox = ? AND uidvalidity = ? AND uid = ?",
+                key,
+            ).fetchone()
+            if row is not None:
+                with self._db:
+                    self._db.execute(
+                        "UPDATE parsed_messages SET accessed = ?"
+                        " WHERE mailbox = ? AND uidvalidity = ? AND uid = ?",
+                        (time.time(), *key),
+                    )
+                value = json.loads(row[0])
+                self._remember(key, value, len(row[0].encode()))
+                self.metrics["disk_hits"] += 1
+                return value
+
+        self.metrics["misses"] += 1
+        return None
+
+    def put(self, mailbox: str, uidvalidity: int, uid: str, value: dict) -> None:
+        """Сохраняет разобранное письмо, вытесняя самые давно использованные."""
+        self._check_uidvalidity(mailbox, uidvalidity)
+        key = (mailbox, uidvalidity, str(uid))
+        data = json.dumps(value, ensure_ascii=False)
+        size = len(data.encode())
+        self._remember(key, value, size)
+        if self._db is not None:
+            replaced = self._db.execute(
+                "SELECT size FROM parsed_messages"
+                " WHERE mailbox = ? AND uidvalidity = ? AND uid = ?",
+                key,
+            ).fetchone()
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO parsed_messages VALUES (?, ?, ?, ?, ?, ?)",
+                    (*key, data, size, time.time()),
+                )
+            self._disk_size += size - (replaced[0] if replaced else 0)
+            self._trim_disk()
+
+    def invalidate(self, mailbox: Optional[str] = None) -> None:
+        """Удаляет записи ящика `mailbox` (или все записи)."""
+        self.metrics["invalidations"] += 1
+        for key in [k for k in self._entries if mailbox is None or k[0] == mailbox]:
+            self._bytes -= self._entries.pop(key)[1]
+        if self._db is not None:
+            with self._db:
+                if mailbox is None:
+                    self._db.execute("DELETE FROM parsed_messages")
+                    self._disk_size = 0
+                else:
+                    removed = self._db.execute(
+                        "SELECT COALESCE(SUM(size), 0) FROM parsed_messages WHERE mailbox = ?",
+                        (mailbox,),
+                    ).fetchone()[0]
+                    self._db.execute(
+                        "DELETE FROM parsed_messages WHERE mailbox = ?", (mailbox,)
+                    )
+                    self._disk_size -= removed
+
+    def _check_uidvalidity(self, mailbox: str, uidvalidity: int) -> None:
+        known = self._uidvalidity.get(mailbox)
+        if known is not None and known != uidvalidity:
+            self.invalidate(mailbox)
+        self._uidvalidity[mailbox] = uidvalidity
+
+    def _remember(self, key: tuple, value: dict, size: int) -> None:
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[1]
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= evicted
+            self.metrics["evictions"] += 1
+
+    def _disk_bytes(self) -> int:
+        return self._disk_size
+
+    def _trim_disk(self) -> None:
+        excess = self._disk_size - self.disk_max_bytes
+        if excess <= 0:
+            return
+        rows = self._db.execute(
+            "SELECT mailbox, uidvalidity, uid, size FROM parsed_messages"
+            " ORDER BY accessed"
+        )
+        stale, freed = [], 0
+        for mailbox, uidvalidity, uid, size in rows:
+            if excess <= 0:
+                break
+            stale.append((mailbox, uidvalidity, uid))
+            excess -= size
+            freed += size
+        with self._db:
+            self._db.executemany(
+                "DELETE FROM parsed_messages"
+                " WHERE mailbox = ? AND uidvalidity = ? AND uid = ?",
+                stale,
+            )
+        self._disk_size -= freed
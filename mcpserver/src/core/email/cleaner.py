@@ -0,0 +1,99 @@
+"""
+Очистка текста письма (после html2text) от служебного мусора.
+
+Правила компилируются один раз при импорте. Текст проходится линейно:
+сначала удаляются адреса в угловых скобках, затем одно регулярное
+выражение-альтернатива лениво вырезает строки заголовков, даты, UUID,
+параметры и URL, а строки тут же фильтруются и обрезаются на первой
+цитате или пересылке — цитируемая история дальше не разбирается.
+Ни в одном правиле нет вложенных квантификаторов, поэтому время работы
+линейно и на «враждебном» тексте.
+"""
+
+import re
+from typing import Iterator
+
+# Всё, что удаляется из текста одним проходом. Порядок альтернатив важен:
+# строка заголовка удаляется целиком раньше, чем дата внутри неё.
+_NOISE_RE = re.compile(
+    r"""
+    ^[^\S\n]*(?:Кому|Тема|From|To|Date|Sent):.*$      # строки "Кому:", "From:" ...
+    | \d{2}\.\d{2}\.\d{4},\s*\d{2}:\d{2}.*           # "04.12.2025, 15:15" до конца строки
+    | (?-i:[a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12})  # UUID
+    | &[a-z0-9]+=[^&\s]*                              # &f=0, &id=...
+    | (?-i:https?://[^\s)]*)                          # остаточные URL
+    """,
+    re.IGNORECASE | re.MULTILINE | re.VERBOSE,
+)
+
+# Горизонтальные разделители: ---, ===, –––
+_SEPARATOR_RE = re.compile(r"[-–=\\]{3,}")
+
+# Начало цитаты или пересылки: "написал:", ">", строка с даты "04.12.2025"
+_QUOTE_START_RE = re.compile(r"написал|>|^\d{2}\.\d{2}\.\d{4}", re.IGNORECASE)
+
+_SPACES_RE = re.compile(r"\s{2,}")
+
+
+def _strip_bracketed_addresses(text: str) -> str:
+    """
+    Удаляет вставки вида <parol.zd2@yandex.ru>: от '<' до ближайшего '>',
+    если между ними есть '@'. Каждый символ просматривается один раз.
+    """
+    parts = []
+    pos = 0
+    start = text.find("<")
+    while start != -1:
+        end = text.find(">", start)
+        if end == -1:
+            break
+        # у всех '<' внутри [start, end) тот же ближайший '>', их можно пропустить
+        if text.find("@", start, end) != -1:
+            parts.append(text[pos:start])
+            pos = end + 1
+        start = text.find("<", end + 1)
+    if not parts:
+        return text
+    parts.append(text[pos:])
+    return "".join(parts)
+
+
+def _noise_free_blocks(body: str) -> Iterator[str]:
+    """
+    Текст без шума блоками из целых строк. Поиск по _NOISE_RE идёт лениво,
+    поэтому после обрезки на цитате хвост письма не просматривается.
+    """
+    parts = []
+    pos = 0
+    for match in _NOISE_RE.finditer(body):
+        piece = body[pos : match.start()]
+        pos = match.end()
+        cut = piece.rfind("\n")
+        if cut == -1:
+            parts.append(piece)
+            continue
+        parts.append(piece[:cut])
+        yield "".join(parts)
+        parts = [piece[cut + 1 :]]
+    parts.append(body[pos:])
+    yield "".join(parts)
+
+
+def _clean_email_body(body: str) -> str:
+    """
+    Оставляет только первый блок письма до цитаты или пересылки, без
+    адресов, заголовков пересылки, разделителей, URL и трекинговых параметров.
+    """
+    body = _strip_bracketed_addresses(body)
+
+    clean_lines = []
+    for block in _noise_free_blocks(body):
+        for line in block.splitlines():
+            line = line.strip()
+            if not line or _SEPARATOR_RE.fullmatch(line):
+                continue
+            if _QUOTE_START_RE.search(line):
+                return "\n".join(clean_lines)
+            clean_lines.append(_SPACES_RE.sub(" ", line))
+
+    return "\n".join(clean_lines)
@@ -0,0 +1,115 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from typing import Optional
+
+EXECUTOR_KINDS = ("thread", "process")
+
+
+def _timed(func, *args):
+    "выполняет func в воркере и возвращает (результат, время выполнения)"
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+class ParseExecutor:
+    """
+    Пул для CPU-тяжёлого разбора писем (message_from_bytes, decode_header,
+    html2text, очистка текста), чтобы он не блокировал event loop.
+
+    `kind="thread"` — пул потоков, `kind="process"` — пул процессов для
+    чистого Python (обходит GIL; функции и аргументы должны сериализоваться).
+    Одновременно в пуле не больше `max_pending` задач: остальные вызовы
+    `run` ждут свободного места (backpressure). По каждому этапу копится
+    время ожидания и выполнения.
+    """
+
+    def __init__(self, kind: str = "thread", workers: int = 4, max_pending: int = 64):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Неизвестный тип пула {kind!r}, ожидается {EXECUTOR_KINDS}")
+        self.kind = kind
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[Executor] = None
+        self._slots = asyncio.Semaphore(max_pending)
+        self._in_flight = 0
+        self.metrics = {"submitted": 0, "waits": 0}
+        self._stages: dict[str, dict] = {}
+
+    def stats(self) -> dict:
+        """Загрузка пула и время по этапам разбора."""
+        stages = {}
+        for stage, data in self._stages.items():
+            calls = data["calls"] or 1
+            stages[stage] = {
+                "calls": data["calls"],
+                "errors": data["errors"],
+                "avg_wait_ms": round(data["wait"] / calls * 1000, 2),
+                "avg_run_ms": round(data["run"] / calls * 1000, 2),
+                "max_run_ms": round(data["max_run"] * 1000, 2),
+            }
+        return {
+            **self.metrics,
+            "kind": self.kind,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "in_flight": self._in_flight,
+            "stages": stages,
+        }
+
+    async def run(self, stage: str, func, *args):
+        """Выполняет `func(*args)` в пуле; `stage` — имя этапа для метрик."""
+        if self._slots.locked():
+            self.metrics["waits"] += 1
+        queued = time.perf_counter()
+        async with self._slots:
+            self.metrics["submitted"] += 1
+            self._in_flight += 1
+            loop = asyncio.get_running_loop()
+            try:
+                result, elapsed = await loop.run_in_executor(
+                    self._get_executor(), _timed, func, *args
+                )
+            except Exception:
+                self._record(stage, time.perf_counter() - queued, 0.0, error=True)
+                raise
+            finally:
+                self._in_flight -= 1
+        # ожидание = место в очереди + очередь пула + передача данных в процесс
+        self._record(stage, time.perf_counter() - queued - elapsed, elapsed)
+        return result
+
+    def close(self) -> None:
+        """Останавливает воркеры; следующий `run` создаст пул заново."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                # spawn: форк процесса с запущенным event loop и потоками небезопасен
+                self._executor = ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    self.workers, thread_name_prefix="mail-parse"
+                )
+        return self._executor
+
+    def _record(self, stage: str, wait: float, run: float, error: bool = False) -> None:
+        data = self._stages.setdefault(
+            stage, {"calls": 0, "errors": 0, "wait": 0.0, "run": 0.0, "max_run": 0.0}
+        )
+        data["calls"] += 1
+        data["errors"] += int(error)
+        data["wait"] += wait
+        data["run"] += run
+        data["max_run"] = max(data["max_run"], run)
@@ -0,0 +1,349 @@
+import asyncio
+import logging
+import sqlite3
+import time
+from datetime import (
+    date,
+    datetime,
+    timezone,
+)
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Optional
+
+from .pool import (
+    ImapPool,
+    ImapSession,
+)
+from .utils import (
+    _FETCH_SIZE_RE,
+    _FETCH_UID_RE,
+    _fetch_flags,
+    _get_parse_executor,
+    _parse_email,
+    _split_fetch,
+    _uid_set,
+)
+
+log = logging.getLogger(__name__)
+
+# Сколько новых писем скачивается одним UID FETCH при синхронизации
+SYNC_BATCH = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS mailboxes (
+    mailbox TEXT PRIMARY KEY,
+    uidvalidity INTEGER,
+    uidnext INTEGER,
+    highestmodseq INTEGER,
+    synced_at REAL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    mailbox TEXT NOT NULL,
+    uid INTEGER NOT NULL,
+    sender TEXT,
+    sender_key TEXT,
+    subject TEXT,
+    date TEXT,
+    ts REAL,
+    size INTEGER,
+    flags TEXT,
+    body TEXT,
+    UNIQUE (mailbox, uid)
+);
+CREATE INDEX IF NOT EXISTS messages_ts ON messages (mailbox, ts);
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    sender, subject, body, content='messages', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts (rowid, sender, subject, body)
+    VALUES (new.id, new.sender, new.subject, new.body);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, sender, subject, body)
+    VALUES ('delete', old.id, old.sender, old.subject, old.body);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_au AFTER UPDATE OF sender, subject, body ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, sender, subject, body)
+    VALUES ('delete', old.id, old.sender, old.subject, old.body);
+    INSERT INTO messages_fts (rowid, sender, subject, body)
+    VALUES (new.id, new.sender, new.subject, new.body);
+END;
+"""
+
+
+def _timestamp(value: str) -> Optional[float]:
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _day_start(day: date) -> float:
+    return datetime.combine(day, datetime.min.time(), timezone.utc).timestamp()
+
+
+def _fts_query(query: str) -> str:
+    "экранирует слова запроса для FTS5: все слова обязательны, поиск по префиксу"
+    terms = ['"' + term.replace('"', '""') + '"*' for term in query.split()]
+    return " ".join(terms)
+
+
+class MailIndex:
+    """
+    Локальный индекс писем в SQLite с полнотекстовым поиском (FTS5).
+
+    Хранит заголовки, очищенный текст и флаги по UID и синхронизируется
+    инкрементально: новые письма — по UID, флаги — через CONDSTORE
+    (CHANGEDSINCE), если сервер его поддерживает, удалённые — сравнением
+    списков UID. Смена UIDVALIDITY сбрасывает ящик целиком.
+    """
+
+    def __init__(self, path: str, stale_after: float = 60.0, body_bytes: int = 65536):
+        self.path = path
+        self.stale_after = stale_after
+        self.body_bytes = body_bytes
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(_SCHEMA)
+        self._lock = asyncio.Lock()
+
+    def close(self) -> None:
+        self._db.close()
+
+    # === Синхронизация ===
+
+    def synced_at(self, mailbox: str = "INBOX") -> Optional[float]:
+        row = self._mailbox_row(mailbox)
+        return row["synced_at"] if row else None
+
+    def is_stale(self, mailbox: str = "INBOX") -> bool:
+        synced_at = self.synced_at(mailbox)
+        return synced_at is None or time.time() - synced_at > self.stale_after
+
+    async def ensure_fresh(self, pool: ImapPool, mailbox: str = "INBOX") -> None:
+        """
+        Синхронизирует ящик, если индекс устарел. Если синхронизация не удалась,
+        но ранее собранные данные есть — отдаются они.
+        """
+        if not self.is_stale(mailbox):
+            return
+        async with self._lock:
+            if not self.is_stale(mailbox):
+                return
+            try:
+                await self._sync(pool, mailbox)
+            except Exception:
+                if self.synced_at(mailbox) is None:
+                    raise
+                log.warning("Mail index sync failed, serving stale data", exc_info=True)
+
+    async def sync(self, pool: ImapPool, mailbox: str = "INBOX") -> dict:
+        """Принудительная синхронизация ящика с IMAP."""
+        async with self._lock:
+            return await self._sync(pool, mailbox)
+
+    async def run_sync_loop(
+        self, pool: ImapPool, interval: float, mailbox: str = "INBOX"
+    ) -> None:
+        """Фоновая синхронизация раз в `interval` секунд."""
+        while True:
+            try:
+                await self.ensure_fresh(pool, mailbox)
+            except Exception:
+                log.warning("Background mail index sync failed", exc_info=True)
+            await asyncio.sleep(interval)
+
+    async def _sync(self, pool: ImapPool, mailbox: str) -> dict:
+        async with pool.session(None) as session:
+            # SELECT заново: нужны свежие UIDVALIDITY/UIDNEXT/HIGHESTMODSEQ
+            state = await session.select(mailbox)
+            stored = self._mailbox_row(mailbox)
+            if stored is not None and stored["uidvalidity"] != state.uidvalidity:
+                with self._db:
+                    self._db.execute("DELETE FROM messages WHERE mailbox = ?", (mailbox,))
+                stored = None
+
+            known = self._known_uids(mailbox)
+            _, data = await session.client.uid_search("ALL")
+            on_server = {int(uid) for uid in data[0].split()} if data[0] else set()
+
+            removed = known - on_server
+            kept = known & on_server
+            updated = await self._sync_flags(session, mailbox, stored, kept)
+            added = await self._fetch_new(session, mailbox, sorted(on_server - known))
+
+        with self._db:
+            self._db.executemany(
+                "DELETE FROM messages WHERE mailbox = ? AND uid = ?",
+                [(mailbox, uid) for uid in removed],
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO mailboxes VALUES (?, ?, ?, ?, ?)",
+                (
+                    mailbox,
+                    state.uidvalidity,
+                    state.uidnext or (max(on_server) + 1 if on_server else 1),
+                    state.highestmodseq,
+                    time.time(),
+                ),
+            )
+        return {
+            "added": added,
+            "updated": updated,
+            "removed": len(removed),
+            "total": len(on_server),
+        }
+
+    async def _sync_flags(
+        self, session: ImapSession, mailbox: str, stored, kept: set
+    ) -> int:
+        if not kept:
+            return 0
+        items = "(UID FLAGS)"
+        if (
+            session.has_capability("CONDSTORE")
+            and stored is not None
+            and stored["highestmodseq"]
+            and session.mailbox.highestmodseq
+        ):
+            if session.mailbox.highestmodseq == stored["highestmodseq"]:
+                return 0
+            items = f"(UID FLAGS) (CHANGEDSINCE {stored['highestmodseq']})"
+
+        response = await session.client.uid("fetch", f"1:{max(kept)}", items)
+        changes = []
+        for meta, _ in _split_fetch(response.lines[:-1]):
+            uid = _FETCH_UID_RE.search(meta)
+            if uid and int(uid.group(1)) in kept:
+                flags = " ".join(_fetch_flags(meta))
+                changes.append((flags, mailbox, int(uid.group(1)), flags))
+        with self._db:
+            cursor = self._db.executemany(
+                "UPDATE messages SET flags = ?"
+                " WHERE mailbox = ? AND uid = ? AND flags IS NOT ?",
+                changes,
+            )
+        return cursor.rowcount
+
+    async def _fetch_new(self, session: ImapSession, mailbox: str, uids: list) -> int:
+        body = f"BODY.PEEK[]<0.{self.body_bytes}>" if self.body_bytes else "BODY.PEEK[]"
+        items = f"(UID RFC822.SIZE FLAGS {body})"
+        for start in range(0, len(uids), SYNC_BATCH):
+            batch = uids[start : start + SYNC_BATCH]
+            response = await session.client.uid("fetch", _uid_set(batch), items)
+            fetched = []
+            for meta, raw in _split_fetch(response.lines[:-1]):
+                uid = _FETCH_UID_RE.search(meta)
+                if uid:
+                    fetched.append((int(uid.group(1)), meta, raw))
+            executor = _get_parse_executor()
+            parsed_all = await asyncio.gather(
+                *(executor.run("index", _parse_email, raw) for _, _, raw in fetched)
+            )
+            rows = []
+            for (uid, meta, raw), parsed in zip(fetched, parsed_all):
+                size = _FETCH_SIZE_RE.search(meta)
+                rows.append(
+                    (
+                        mailbox,
+                        uid,
+                        parsed["from"],
+                        parsed["from"].casefold(),
+                        parsed["subject"],
+                        parsed["date"],
+                        _timestamp(parsed["date"]),
+                        int(size.group(1)) if size else len(raw),
+                        " ".join(_fetch_flags(meta)),
+                        parsed["body"],
+                    )
+                )
+            self._store_messages(rows)
+        return len(uids)
+
+    def _store_messages(self, rows: list) -> None:
+        # UPSERT, а не INSERT OR REPLACE: REPLACE удаляет строку без триггера
+        # messages_ad, и в messages_fts остаётся старый текст
+        with self._db:
+            self._db.executemany(
+                "INSERT INTO messages (mailbox, uid, sender, sender_key,"
+                " subject, date, ts, size, flags, body)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (mailbox, uid) DO UPDATE SET"
+                " sender = excluded.sender, sender_key = excluded.sender_key,"
+                " subject = excluded.subject, date = excluded.date, ts = excluded.ts,"
+                " size = excluded.size, flags = excluded.flags, body = excluded.body",
+                rows,
+            )
+
+    def _mailbox_row(self, mailbox: str) -> Optional[sqlite3.Row]:
+        return self._db.execute(
+            "SELECT * FROM mailboxes WHERE mailbox = ?", (mailbox,)
+        ).fetchone()
+
+    def _known_uids(self, mailbox: str) -> set:
+        rows = self._db.execute("SELECT uid FROM messages WHERE mailbox = ?", (mailbox,))
+        return {row[0] for row in rows}
+
+    # === Поиск ===
+
+    def search_by_sender(self, sender: str, limit: int = 10, mailbox: str = "INBOX") -> list:
+        """Последние `limit` писем, в From которых есть подстрока `sender`."""
+        rows = self._db.execute(
+            "SELECT * FROM messages WHERE mailbox = ? AND instr(sender_key, ?) > 0"
+            " ORDER BY uid DESC LIMIT ?",
+            (mailbox, sender.casefold(), limit),
+        ).fetchall()
+        return [self._to_email(row) for row in reversed(rows)]
+
+    def search_by_date(
+        self,
+        since: Optional[date] = None,
+        before: Optional[date] = None,
+        limit: int = 10,
+        mailbox: str = "INBOX",
+    ) -> list:
+        """Последние `limit` писем с датой в [since, before)."""
+        conditions, params = ["mailbox = ?"], [mailbox]
+        if since:
+            conditions.append("ts >= ?")
+            params.append(_day_start(since))
+        if before:
+            conditions.append("ts < ?")
+            params.append(_day_start(before))
+        rows = self._db.execute(
+            f"SELECT * FROM messages WHERE {' AND '.join(conditions)}"
+            " ORDER BY uid DESC LIMIT ?",
+            (*params, limit),
+        ).fetchall()
+        return [self._to_email(row) for row in reversed(rows)]
+
+    def search(self, query: str, limit: int = 10, mailbox: str = "INBOX") -> list:
+        """Полнотекстовый поиск по отправителю, теме и тексту (по релевантности)."""
+        fts_query = _fts_query(query)
+        if not fts_query:
+            return []
+        rows = self._db.execute(
+            "SELECT m.*, snippet(messages_fts, 2, '', '', '…', 16) AS snippet"
+            " FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid"
+            " WHERE messages_fts MATCH ? AND m.mailbox = ?"
+            " ORDER BY bm25(messages_fts) LIMIT ?",
+            (fts_query, mailbox, limit),
+        ).fetchall()
+        return [
+            {**self._to_email(row), "snippet": row["snippet"]} for row in rows
+        ]
+
+    @staticmethod
+    def _to_email(row: sqlite3.Row) -> dict:
+        return {
+            "uid": str(row["uid"]),
+            "from": row["sender"],
+            "subject": row["subject"] or "(no subject)",
+            "date": row["date"],
+            "size": row["size"],
+            "seen": "\\Seen" in (row["flags"] or "").split(),
+        }
@@ -0,0 +1,177 @@
+import binascii
+import codecs
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+_TOKEN_RE = re.compile(rb'\s*(?:(\()|(\))|"((?:[^"\\]|\\.)*)"|([^\s()"]+))')
+_UNESCAPE_RE = re.compile(rb"\\(.)")
+
+
+@dataclass
+class TextPart:
+    """Текстовая часть письма по данным BODYSTRUCTURE."""
+
+    section: str
+    subtype: str
+    charset: str = "utf-8"
+    encoding: str = "7bit"
+    size: int = 0
+
+
+def _parse_sexp(data: bytes, pos: int = 0):
+    "одно S-выражение IMAP: список, строка, NIL или атом; возвращает (значение, позиция)"
+    stack = [[]]
+    while True:
+        match = _TOKEN_RE.match(data, pos)
+        if not match:
+            raise ValueError(f"BODYSTRUCTURE: неожиданные данные в позиции {pos}")
+        pos = match.end()
+        opening, closing, quoted, atom = match.groups()
+        if opening:
+            stack.append([])
+            continue
+        if closing:
+            if len(stack) < 2:
+                raise ValueError("BODYSTRUCTURE: лишняя закрывающая скобка")
+            value = stack.pop()
+        elif quoted is not None:
+            value = _UNESCAPE_RE.sub(rb"\1", quoted).decode(errors="replace")
+        elif atom.startswith(b"{"):
+            # literal внутри BODYSTRUCTURE приходит отдельной строкой ответа
+            raise ValueError("BODYSTRUCTURE: literal не поддерживается")
+        else:
+            value = None if atom.upper() == b"NIL" else atom.decode(errors="replace")
+        stack[-1].append(value)
+        if len(stack) == 1:
+            return value, pos
+
+
+def _parse_bodystructure(meta: bytes) -> Optional[list]:
+    "BODYSTRUCTURE из метаданных ответа FETCH; None, если сервер его не прислал"
+    start = meta.find(b"BODYSTRUCTURE ")
+    if start == -1:
+        return None
+    try:
+        structure, _ = _parse_sexp(meta, start + len(b"BODYSTRUCTURE "))
+    except ValueError:
+        return None
+    return structure if isinstance(structure, list) else None
+
+
+def _params(value) -> dict:
+    if not isinstance(value, list):
+        return {}
+    return {
+        str(key).lower(): item
+        for key, item in zip(value[::2], value[1::2])
+        if key is not None
+    }
+
+
+def _is_attachment(part: list, disposition_index: int) -> bool:
+    disposition = part[disposition_index] if len(part) > disposition_index else None
+    return (
+        isinstance(disposition, list)
+        and bool(disposition)
+        and str(disposition[0]).lower() == "attachment"
+    )
+
+
+def _walk_parts(structure: list, section: str = ""):
+    "обходит части в порядке email.Message.walk(): (номер секции, тип, описание)"
+    if structure and isinstance(structure[0], list):
+        # дочерние части идут первыми, за ними подтип и расширения
+        for number, child in enumerate(structure, start=1):
+            if not isinstance(child, list):
+                break
+            yield from _walk_parts(child, f"{section}.{number}" if section else str(number))
+        return
+
+    content_type = f"{structure[0]}/{structure[1]}".lower()
+    section = section or "1"
+    if content_type == "message/rfc822" and len(structure) > 8 and isinstance(structure[8], list):
+        inner = structure[8]
+        # у вложенного письма из одной части текст — секция N.1
+        multipart = bool(inner) and isinstance(inner[0], list)
+        yield from _walk_parts(inner, section if multipart else f"{section}.1")
+        return
+    yield section, content_type, structure
+
+
+def _find_text_part(structure: list) -> Optional[TextPart]:
+    """
+    Первая text/plain часть, иначе первая text/html — как в _extract_body.
+    Вложения (Content-Disposition: attachment) пропускаются.
+    """
+    parts = list(_walk_parts(structure))
+    for wanted in ("text/plain", "text/html"):
+        for section, content_type, part in parts:
+            # у text/*: 7 базовых полей, число строк, MD5 и затем disposition
+            if content_type != wanted or _is_attachment(part, 9):
+                continue
+            size = part[6] if len(part) > 6 else None
+            return TextPart(
+                section=section,
+                subtype=wanted.split("/")[1],
+                charset=_params(part[2]).get("charset") or "utf-8",
+                encoding=(part[5] or "7bit").lower(),
+                size=int(size) if size and str(size).isdigit() else 0,
+            )
+    return None
+
+
+class SectionDecoder:
+    """
+    Потоковый декодер секции письма: снимает Content-Transfer-Encoding
+    (base64, quoted-printable) и декодирует кодировку по мере поступления
+    байтов. Неполный хвост (оборванный кусок base64, '=X' или половина
+    многобайтового символа) откладывается до следующего куска.
+    """
+
+    def __init__(self, encoding: str = "7bit", charset: str = "utf-8"):
+        self.encoding = encoding.lower()
+        try:
+            decoder = codecs.getincrementaldecoder(charset)
+        except LookupError:
+            decoder = codecs.getincrementaldecoder("utf-8")
+        self._text = decoder(errors="replace")
+        self._pending = b""
+
+    def feed(self, data: bytes) -> str:
+        data = self._pending + bytes(data)
+        if self.encoding == "base64":
+            data = b"".join(data.split())
+            cut = len(data) - len(data) % 4
+            data, self._pending = data[:cut], data[cut:]
+            try:
+                raw = binascii.a2b_base64(data)
+            except binascii.Error:
+                raw = b""
+        elif self.encoding == "quoted-printable":
+            cut = data.rfind(b"=", max(len(data) - 2, 0))
+            if cut != -1:
+                data, self._pending = data[:cut], data[cut:]
+            else:
+                self._pending = b""
+            raw = binascii.a2b_qp(data)
+        else:
+            raw = data
+        return self._text.decode(raw)
+
+    def close(self, complete: bool = True) -> str:
+        """
+        Завершает декодирование. Для обрезанной секции (`complete=False`)
+        незаконченный хвост отбрасывается, а не превращается в '�'.
+        """
+        pending, self._pending = self._pending, b""
+        raw = b""
+        if complete and pending:
+            try:
+                if self.encoding == "base64":
+                    raw = binascii.a2b_base64(pending + b"=" * (-len(pending) % 4))
+                else:
+                    raw = binascii.a2b_qp(pending)
+            except binascii.Error:
+                raw = b""
+        return self._text.decode(raw, final=complete)
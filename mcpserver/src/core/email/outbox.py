@@ -0,0 +1,253 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+import uuid
+from pathlib import Path
+from typing import (
+    Awaitable,
+    Callable,
+    Optional,
+)
+
+from .smtp import _is_transient
+
+log = logging.getLogger(__name__)
+
+# Статусы письма в очереди
+QUEUED = "queued"
+SENDING = "sending"
+RETRYING = "retrying"
+SENT = "sent"
+DEAD = "dead"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id TEXT PRIMARY KEY,
+    idempotency_key TEXT UNIQUE,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    last_error TEXT,
+    refused TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    sent_at REAL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt);
+"""
+
+
+class Outbox:
+    """
+    Надёжная очередь исходящих писем в SQLite.
+
+    `enqueue` сохраняет письмо на диск и сразу возвращает его id, доставку
+    выполняет фоновый `run`. Повторный `enqueue` с тем же `idempotency_key`
+    возвращает уже поставленное письмо, а не создаёт второе. Временные
+    ошибки повторяются с экспоненциальной задержкой, после `max_attempts`
+    попыток или при постоянной ошибке (5xx) письмо переходит в статус
+    "dead". Получатели, которых сервер отклонил при принятом письме,
+    сохраняются в поле refused статуса. Письма, чья отправка оборвалась
+    падением процесса (статус "sending"), при запуске возвращаются в
+    очередь, если попытки ещё не исчерпаны.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_attempts: int = 5,
+        backoff: float = 30.0,
+        batch_size: int = 20,
+    ):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.batch_size = batch_size
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(_SCHEMA)
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(outbox)")}
+        if "refused" not in columns:
+            # очередь, созданная до появления столбца
+            with self._db:
+                self._db.execute("ALTER TABLE outbox ADD COLUMN refused TEXT")
+        self._wakeup = asyncio.Event()
+        self.recovered = self._recover()
+
+    def close(self) -> None:
+        self._db.close()
+
+    def enqueue(self, payload: dict, idempotency_key: Optional[str] = None) -> dict:
+        """Ставит письмо в очередь и возвращает его статус."""
+        if idempotency_key:
+            existing = self._row_by_key(idempotency_key)
+            if existing is not None:
+                return self._status(existing)
+        message_id = uuid.uuid4().hex
+        now = time.time()
+        with self._db:
+            self._db.execute(
+                "INSERT INTO outbox (id, idempotency_key, payload, status, next_attempt,"
+                " created, updated) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    message_id,
+                    idempotency_key or None,
+                    json.dumps(payload, ensure_ascii=False),
+                    QUEUED,
+                    now,
+                    now,
+                    now,
+                ),
+            )
+        self._wakeup.set()
+        return self.status(message_id)
+
+    def status(self, message_id: str) -> Optional[dict]:
+        """Статус письма по id или None."""
+        row = self._db.execute("SELECT * FROM outbox WHERE id = ?", (message_id,)).fetchone()
+        return self._status(row) if row else None
+
+    def stats(self) -> dict:
+        """Число писем по статусам."""
+        counts = dict.fromkeys((QUEUED, SENDING, RETRYING, SENT, DEAD), 0)
+        for row in self._db.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status"):
+            counts[row[0]] = row[1]
+        return counts
+
+    def recent(self, limit: int = 10) -> list[dict]:
+        rows = self._db.execute(
+            "SELECT * FROM outbox ORDER BY created DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [self._status(row) for row in rows]
+
+    async def dispatch(self, send: Callable[[str, dict], Awaitable]) -> int:
+        """
+        Отправляет письма, время которых пришло; `send(id, payload)` доставляет
+        одно письмо. Возвращает число обработанных писем.
+        """
+        rows = self._claim()
+        if not rows:
+            return 0
+        results = await asyncio.gather(
+            *(send(row["id"], json.loads(row["payload"])) for row in rows),
+            return_exceptions=True,
+        )
+        for row, result in zip(rows, results):
+            if isinstance(result, Exception):
+                self._failed(row, result)
+            else:
+                refused = result.get("refused") if isinstance(result, dict) else None
+                if refused:
+                    log.warning("Письмо %s: сервер отклонил получателей %s", row["id"], refused)
+                self._update(
+                    row["id"],
+                    status=SENT,
+                    sent_at=time.time(),
+                    last_error=None,
+                    refused=json.dumps(refused, ensure_ascii=False) if refused else None,
+                )
+        return len(rows)
+
+    async def run(self, send: Callable[[str, dict], Awaitable], poll_interval: float = 5.0):
+        """Фоновая доставка: сразу после enqueue и раз в `poll_interval` секунд."""
+        while True:
+            self._wakeup.clear()
+            try:
+                processed = await self.dispatch(send)
+            except Exception:
+                log.exception("Ошибка доставки очереди писем")
+                processed = 0
+            if processed:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _claim(self) -> list[sqlite3.Row]:
+        "помечает готовые к отправке письма статусом sending"
+        now = time.time()
+        with self._db:
+            rows = self._db.execute(
+                "SELECT * FROM outbox WHERE status IN (?, ?) AND next_attempt <= ?"
+                " ORDER BY next_attempt LIMIT ?",
+                (QUEUED, RETRYING, now, self.batch_size),
+            ).fetchall()
+            self._db.executemany(
+                "UPDATE outbox SET status = ?, attempts = attempts + 1, updated = ?"
+                " WHERE id = ?",
+                [(SENDING, now, row["id"]) for row in rows],
+            )
+        return rows
+
+    def _failed(self, row: sqlite3.Row, error: Exception) -> None:
+        attempts = row["attempts"] + 1
+        if not _is_transient(error) or attempts >= self.max_attempts:
+            self._update(row["id"], status=DEAD, last_error=str(error))
+            log.warning("Письмо %s не доставлено: %s", row["id"], error)
+            return
+        self._update(
+            row["id"],
+            status=RETRYING,
+            last_error=str(error),
+            next_attempt=time.time() + self.backoff * 2 ** (attempts - 1),
+        )
+
+    def _update(self, message_id: str, **fields) -> None:
+        fields["updated"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._db:
+            self._db.execute(
+                f"UPDATE outbox SET {columns} WHERE id = ?", (*fields.values(), message_id)
+            )
+
+    def _recover(self) -> int:
+        """
+        Возвращает в очередь письма, отправка которых прервалась вместе с
+        процессом; письмо, исчерпавшее попытки (например, роняющее процесс
+        при каждой отправке), переходит в "dead".
+        """
+        now = time.time()
+        with self._db:
+            dead = self._db.execute(
+                "UPDATE outbox SET status = ?, last_error = ?, updated = ?"
+                " WHERE status = ? AND attempts >= ?",
+                (DEAD, "отправка прервана остановкой процесса", now, SENDING, self.max_attempts),
+            )
+            cursor = self._db.execute(
+                "UPDATE outbox SET status = ?, next_attempt = ? WHERE status = ?",
+                (RETRYING, now, SENDING),
+            )
+        if dead.rowcount:
+            log.warning("Писем с исчерпанными попытками после сбоя: %d", dead.rowcount)
+        return cursor.rowcount
+
+    def _row_by_key(self, idempotency_key: str) -> Optional[sqlite3.Row]:
+        return self._db.execute(
+            "SELECT * FROM outbox WHERE idempotency_key = ?", (idempotency_key,)
+        ).fetchone()
+
+    def _status(self, row: sqlite3.Row) -> dict:
+        payload = json.loads(row["payload"])
+        status = {
+            "id": row["id"],
+            "status": row["status"],
+            "attempts": row["attempts"],
+            "to": payload.get("to"),
+            "subject": payload.get("subject"),
+            "created": row["created"],
+        }
+        if row["status"] == RETRYING:
+            status["next_attempt"] = row["next_attempt"]
+        if row["last_error"]:
+            status["error"] = row["last_error"]
+        if row["refused"]:
+            status["refused"] = json.loads(row["refused"])
+        if row["sent_at"]:
+            status["sent_at"] = row["sent_at"]
+        return status
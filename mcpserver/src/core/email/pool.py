@@ -0,0 +1,225 @@
+import asyncio
+import re
+import time
+from contextlib import asynccontextmanager
+from dataclasses import (
+    dataclass,
+    field,
+)
+from typing import (
+    AsyncIterator,
+    Optional,
+)
+
+import aioimaplib
+
+# Ошибки, после которых состояние IMAP-соединения не определено
+_CONNECTION_ERRORS = (
+    aioimaplib.AioImapException,
+    OSError,
+    asyncio.TimeoutError,
+    asyncio.CancelledError,
+)
+
+_RESPONSE_CODE_RE = re.compile(rb"\[(UIDVALIDITY|UIDNEXT|HIGHESTMODSEQ) (\d+)\]")
+_EXISTS_RE = re.compile(rb"^(\d+) EXISTS")
+
+
+@dataclass
+class MailboxState:
+    """Закешированное состояние выбранного (SELECT) почтового ящика."""
+
+    name: str
+    uidvalidity: Optional[int] = None
+    uidnext: Optional[int] = None
+    exists: Optional[int] = None
+    highestmodseq: Optional[int] = None
+
+    def update(self, lines: list) -> None:
+        """Обновляет состояние по строкам ответа SELECT/NOOP."""
+        for line in lines:
+            if not isinstance(line, (bytes, bytearray)):
+                continue
+            match = _EXISTS_RE.match(line)
+            if match:
+                self.exists = int(match.group(1))
+                continue
+            match = _RESPONSE_CODE_RE.search(line)
+            if match:
+                setattr(self, match.group(1).decode().lower(), int(match.group(2)))
+
+
+@dataclass
+class ImapSession:
+    """Авторизованное IMAP-соединение, выданное пулом."""
+
+    client: aioimaplib.IMAP4
+    mailbox: Optional[MailboxState] = None
+    last_used: float = field(default_factory=time.monotonic)
+
+    def has_capability(self, capability: str) -> bool:
+        return self.client.has_capability(capability)
+
+    async def select(self, mailbox: str = "INBOX") -> MailboxState:
+        """Выполняет SELECT и обновляет закешированное состояние ящика."""
+        response = await self.client.select(mailbox)
+        if response.result != "OK":
+            raise aioimaplib.Error(f"SELECT {mailbox} failed: {response.lines}")
+        self.mailbox = MailboxState(mailbox)
+        self.mailbox.update(response.lines)
+        return self.mailbox
+
+    def is_alive(self) -> bool:
+        transport = self.client.protocol.transport
+        return (
+            transport is not None
+            and not transport.is_closing()
+            and self.client.get_state() in ("AUTH", "SELECTED")
+        )
+
+
+class ImapPool:
+    """
+    Ограниченный по размеру пул авторизованных IMAP-сессий.
+
+    Сессии переиспользуются между вызовами инструментов: TLS, LOGIN и SELECT
+    выполняются один раз на соединение. Простоявшие дольше `noop_interval`
+    сессии проверяются командой NOOP, а мёртвые или простоявшие дольше
+    `max_idle` — переподключаются.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        user: str,
+        password: str,
+        size: int = 4,
+        use_ssl: bool = True,
+        timeout: float = 10.0,
+        noop_interval: float = 30.0,
+        max_idle: float = 600.0,
+    ):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.size = size
+        self.use_ssl = use_ssl
+        self.timeout = timeout
+        self.noop_interval = noop_interval
+        self.max_idle = max_idle
+
+        self._idle: list[ImapSession] = []
+        self._slots = asyncio.Semaphore(size)
+        self._in_use = 0
+        self.metrics = {
+            "checkouts": 0,
+            "waits": 0,
+            "connects": 0,
+            "reconnects": 0,
+            "health_checks": 0,
+            "selects": 0,
+            "discarded": 0,
+        }
+
+    def stats(self) -> dict:
+        """Метрики пула: счётчики и текущая загрузка."""
+        return {
+            **self.metrics,
+            "size": self.size,
+            "idle": len(self._idle),
+            "in_use": self._in_use,
+        }
+
+    @asynccontextmanager
+    async def session(self, mailbox: Optional[str] = "INBOX") -> AsyncIterator[ImapSession]:
+        """
+        Выдаёт сессию с выбранным ящиком `mailbox` на время блока `async with`.
+        При сетевой/протокольной ошибке сессия закрывается, а не возвращается в пул.
+        """
+        if self._slots.locked():
+            self.metrics["waits"] += 1
+        async with self._slots:
+            self.metrics["checkouts"] += 1
+            self._in_use += 1
+            session = None
+            try:
+                session = await self._checkout()
+                if mailbox and (session.mailbox is None or session.mailbox.name != mailbox):
+                    self.metrics["selects"] += 1
+                    await session.select(mailbox)
+                yield session
+            except _CONNECTION_ERRORS:
+                if session is not None:
+                    await self._discard(session)
+                    session = None
+                raise
+            finally:
+                self._in_use -= 1
+                if session is not None:
+                    session.last_used = time.monotonic()
+                    self._idle.append(session)
+
+    async def close(self) -> None:
+        """Закрывает все простаивающие сессии."""
+        sessions, self._idle = self._idle, []
+        for session in sessions:
+            await self._discard(session)
+
+    async def _checkout(self) -> ImapSession:
+        while self._idle:
+            session = self._idle.pop()
+            idle_for = time.monotonic() - session.last_used
+            if idle_for > self.max_idle or not session.is_alive():
+                await self._discard(session)
+                self.metrics["reconnects"] += 1
+                continue
+            if idle_for > self.noop_interval:
+                self.metrics["health_checks"] += 1
+                try:
+                    response = await session.client.noop()
+                    if response.result != "OK":
+                        raise aioimaplib.Abort(f"NOOP failed: {response.lines}")
+                except _CONNECTION_ERRORS:
+                    await self._discard(session)
+                    self.metrics["reconnects"] += 1
+                    continue
+                if session.mailbox is not None:
+                    session.mailbox.update(response.lines)
+            return session
+        return await self._connect()
+
+    async def _connect(self) -> ImapSession:
+        if self.use_ssl:
+            client = aioimaplib.IMAP4_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            client = aioimaplib.IMAP4(self.host, self.port, timeout=self.timeout)
+        session = ImapSession(client)
+        try:
+            await client.wait_hello_from_server()
+            response = await client.login(self.user, self.password)
+            if response.result != "OK":
+                raise aioimaplib.Error(f"LOGIN failed: {response.lines}")
+        except BaseException:
+            await self._discard(session)
+            raise
+        self.metrics["connects"] += 1
+        return session
+
+    async def _discard(self, session: ImapSession) -> None:
+        self.metrics["discarded"] += 1
+        try:
+            if session.is_alive():
+                await asyncio.wait_for(session.client.logout(), timeout=1.0)
+        except Exception:
+            pass
+        transport = session.client.protocol.transport
+        if transport is not None:
+            transport.close()
+        connect = session.client._client_task
+        if not connect.done():
+            connect.cancel()
+        elif not connect.cancelled():
+            # забираем ошибку подключения, иначе asyncio пишет её в лог
+            connect.exception()
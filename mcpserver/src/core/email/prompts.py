@@ -1,3 +1,5 @@
+import json
+
 from fastmcp import (
     Context,
     FastMCP,
@@ -9,7 +11,8 @@ def setup_prompts(mcp: FastMCP):
     @mcp.prompt
     async def summarize_inbox(ctx: Context = None) -> str:
         """Генерирует промпт для сводки по входящим."""
-        unread = await ctx.read_resource("emails://email/unread")
+        contents = await ctx.read_resource("emails://email/unread")
+        unread = json.loads(contents[0].content) if contents else {}
         email_list = [
             f"- {e['from']}: {e['subject']}" for e in unread.get("emails", [])
         ]
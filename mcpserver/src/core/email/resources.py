@@ -1,5 +1,3 @@
-import aioimaplib
-import email as email_lib
 from fastmcp import (
     FastMCP,
     Context,
@@ -8,35 +6,84 @@ from fastmcp import (
 from src.config import Config
 
 
-def setup_resources(mcp: FastMCP, config: Config, _decode_mime_words: callable):
+def setup_resources(
+    mcp: FastMCP,
+    config: Config,
+    _fetch_headers: callable,
+    _get_imap_pool: callable,
+    _get_inbox_watcher: callable,
+    _get_message_cache: callable,
+    _get_parse_executor: callable,
+    _get_event_suggester: callable,
+    _get_smtp_sender: callable,
+    _get_outbox: callable,
+):
     # === РЕСУРС: emails://unread ===
     @mcp.resource("emails://unread")
     async def get_unread_emails(ctx: Context = None) -> dict:
         """Возвращает последние 5 непрочитанных писем (если IMAP поддерживает \\Seen)."""
-        client = aioimaplib.IMAP4_SSL(config.email.IMAP_HOST, config.email.IMAP_PORT)
-        try:
-            await client.wait_hello_from_server()
-            await client.login(config.email.EMAIL_ADDRESS, config.email.EMAIL_PASSWORD)
-            await client.select("INBOX")
+        # Снимок, который держит в актуальном состоянии IMAP IDLE
+        snapshot = _get_inbox_watcher().snapshot
+        if snapshot is not None:
+            return {
+                "description": "Непрочитанные письма",
+                "emails": snapshot["emails"],
+                "total": snapshot["total"],
+            }
+
+        async with _get_imap_pool().session("INBOX") as session:
+            client = session.client
             # Ищем непрочитанные: NOT SEEN
-            _, data = await client.search("UNSEEN")
-            email_ids = data[0].split()[-5:] if data[0] else []
-
-            emails = []
-            for uid in email_ids:
-                uid_str = uid.decode("utf-8")
-                _, msg_data = await client.fetch(uid_str, "(RFC822)")
-                raw_header = msg_data[1]
-                parsed = email_lib.message_from_bytes(raw_header)
-                emails.append(
-                    {
-                        "from": _decode_mime_words(parsed.get("From", "")),
-                        "subject": _decode_mime_words(
-                            parsed.get("Subject", "(no subject)")
-                        ),
-                        "date": parsed.get("Date", ""),
-                    }
-                )
-            return {"description": "Непрочитанные письма", "emails": emails}
-        finally:
-            await client.logout()
+            _, data = await client.uid_search("UNSEEN")
+            unseen = data[0].split() if data[0] else []
+            emails = await _fetch_headers(client, unseen[-5:])
+            return {
+                "description": "Непрочитанные письма",
+                "emails": emails,
+                "total": len(unseen),
+            }
+
+    # === РЕСУРС: emails://imap-pool ===
+    @mcp.resource("emails://imap-pool")
+    async def get_imap_pool_stats(ctx: Context = None) -> dict:
+        """Метрики пула IMAP-сессий: выдачи, ожидания, переподключения."""
+        return {"description": "Пул IMAP-сессий", "pool": _get_imap_pool().stats()}
+
+    # === РЕСУРС: emails://message-cache ===
+    @mcp.resource("emails://message-cache")
+    async def get_message_cache_stats(ctx: Context = None) -> dict:
+        """Метрики кеша разобранных писем: попадания, промахи, объём."""
+        return {
+            "description": "Кеш разобранных писем",
+            "cache": _get_message_cache().stats(),
+        }
+
+    # === РЕСУРС: emails://parse-executor ===
+    @mcp.resource("emails://parse-executor")
+    async def get_parse_executor_stats(ctx: Context = None) -> dict:
+        """Метрики пула разбора писем: очередь и время по этапам."""
+        return {
+            "description": "Пул разбора писем",
+            "executor": _get_parse_executor().stats(),
+        }
+
+    # === РЕСУРС: emails://smtp ===
+    @mcp.resource("emails://smtp")
+    async def get_smtp_stats(ctx: Context = None) -> dict:
+        """Метрики отправки: письма, повторы, переподключения, ограничение скорости."""
+        return {
+            "description": "Отправка писем (SMTP)",
+            "smtp": _get_smtp_sender().stats(),
+            "outbox": _get_outbox().stats(),
+        }
+
+    # === РЕСУРС: emails://event-suggestions ===
+    @mcp.resource("emails://event-suggestions")
+    async def get_event_suggestions_state(ctx: Context = None) -> dict:
+        """Предложения задач по письмам и метрики фоновой очереди."""
+        suggester = _get_event_suggester()
+        return {
+            "description": "Предложения задач по письмам",
+            "suggestions": [suggester.get(uid) for uid in suggester.uids()[-10:]],
+            "stats": suggester.stats(),
+        }
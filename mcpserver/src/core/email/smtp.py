@@ -0,0 +1,216 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from email.message import Message
+from typing import (
+    AsyncIterator,
+    Optional,
+)
+
+import aiosmtplib
+
+# Ошибки соединения: письмо можно отправить повторно через новое подключение
+_CONNECTION_ERRORS = (
+    aiosmtplib.SMTPServerDisconnected,
+    aiosmtplib.SMTPConnectError,
+    aiosmtplib.SMTPTimeoutError,
+    OSError,
+    asyncio.TimeoutError,
+)
+
+
+def _is_transient(error: Exception) -> bool:
+    "временная ошибка: обрыв соединения или ответ 4xx"
+    if isinstance(error, _CONNECTION_ERRORS):
+        return True
+    if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+        return all(400 <= e.code < 500 for e in error.recipients)
+    if isinstance(error, aiosmtplib.SMTPResponseException):
+        return 400 <= error.code < 500
+    return False
+
+
+class SmtpSender:
+    """
+    Отправка писем через долгоживущие авторизованные SMTP-соединения.
+
+    TLS и AUTH выполняются один раз на соединение, а не на каждое письмо;
+    одновременно открыто не больше `connections` соединений. Между письмами
+    выдерживается интервал `1 / rate_limit` секунд (0 — без ограничения),
+    чтобы не упираться в лимиты провайдера. Соединение, простоявшее дольше
+    `noop_interval`, проверяется NOOP, а оборванное — переподключается.
+    Временные ошибки (обрыв, ответ 4xx) повторяются до `retries` раз с
+    экспоненциальной задержкой от `backoff` секунд.
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        use_tls: bool = True,
+        timeout: float = 10.0,
+        connections: int = 1,
+        rate_limit: float = 0.0,
+        retries: int = 3,
+        backoff: float = 1.0,
+        noop_interval: float = 30.0,
+        max_idle: float = 240.0,
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.connections = connections
+        self.rate_limit = rate_limit
+        self.retries = retries
+        self.backoff = backoff
+        self.noop_interval = noop_interval
+        self.max_idle = max_idle
+
+        self._idle: list[tuple[aiosmtplib.SMTP, float]] = []
+        self._slots = asyncio.Semaphore(connections)
+        self._rate_lock = asyncio.Lock()
+        self._next_slot = 0.0
+        self._in_use = 0
+        self.metrics = {
+            "sent": 0,
+            "failed": 0,
+            "retries": 0,
+            "connects": 0,
+            "reconnects": 0,
+            "health_checks": 0,
+            "waits": 0,
+            "throttled": 0,
+        }
+
+    def stats(self) -> dict:
+        """Счётчики отправки и загрузка соединений."""
+        return {
+            **self.metrics,
+            "connections": self.connections,
+            "rate_limit": self.rate_limit,
+            "idle": len(self._idle),
+            "in_use": self._in_use,
+        }
+
+    async def send(
+        self, message: Message, recipients: list[str], retries: Optional[int] = None
+    ) -> dict:
+        """
+        Отправляет письмо, повторяя временные ошибки до `retries` раз (по
+        умолчанию — `self.retries`; 0 — если повторы ведёт вызывающий, как
+        очередь отправки). Возвращает ответ сервера и получателей, которых
+        он отклонил (если приняты не все).
+        """
+        retries = self.retries if retries is None else retries
+        attempt = 0
+        while True:
+            try:
+                async with self._connection() as smtp:
+                    await self._throttle()
+                    refused, response = await smtp.send_message(message, recipients=recipients)
+            except Exception as e:
+                if attempt >= retries or not _is_transient(e):
+                    self.metrics["failed"] += 1
+                    raise
+                self.metrics["retries"] += 1
+                await asyncio.sleep(self.backoff * 2**attempt)
+                attempt += 1
+                continue
+            self.metrics["sent"] += 1
+            return {
+                "response": response,
+                "refused": {address: str(error) for address, error in refused.items()},
+                "attempts": attempt + 1,
+            }
+
+    async def send_many(self, messages: list[tuple[Message, list[str]]]) -> list:
+        """
+        Отправляет пачку писем через общие соединения (при `connections=1` —
+        по одному SMTP-сеансу). Для каждого письма — результат или исключение.
+        """
+        return await asyncio.gather(
+            *(self.send(message, recipients) for message, recipients in messages),
+            return_exceptions=True,
+        )
+
+    async def close(self) -> None:
+        """Закрывает простаивающие соединения (QUIT)."""
+        connections, self._idle = self._idle, []
+        for smtp, _ in connections:
+            await self._discard(smtp)
+
+    @asynccontextmanager
+    async def _connection(self) -> AsyncIterator[aiosmtplib.SMTP]:
+        if self._slots.locked():
+            self.metrics["waits"] += 1
+        async with self._slots:
+            self._in_use += 1
+            smtp = None
+            try:
+                smtp = await self._checkout()
+                yield smtp
+            except (aiosmtplib.SMTPResponseException, aiosmtplib.SMTPRecipientsRefused):
+                # отказ сервера: aiosmtplib уже сбросил транзакцию (RSET)
+                raise
+            except Exception:
+                # после обрыва состояние соединения не определено
+                if smtp is not None:
+                    await self._discard(smtp)
+                    smtp = None
+                raise
+            finally:
+                self._in_use -= 1
+                if smtp is not None:
+                    self._idle.append((smtp, time.monotonic()))
+
+    async def _checkout(self) -> aiosmtplib.SMTP:
+        while self._idle:
+            smtp, last_used = self._idle.pop()
+            idle_for = time.monotonic() - last_used
+            if idle_for > self.max_idle or not smtp.is_connected:
+                await self._discard(smtp)
+                self.metrics["reconnects"] += 1
+                continue
+            if idle_for > self.noop_interval:
+                self.metrics["health_checks"] += 1
+                try:
+                    await smtp.noop()
+                except (aiosmtplib.SMTPException, *_CONNECTION_ERRORS):
+                    await self._discard(smtp)
+                    self.metrics["reconnects"] += 1
+                    continue
+            return smtp
+        smtp = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            username=self.username,
+            password=self.password,
+            use_tls=self.use_tls,
+            timeout=self.timeout,
+        )
+        await smtp.connect()
+        self.metrics["connects"] += 1
+        return smtp
+
+    async def _throttle(self) -> None:
+        if self.rate_limit <= 0:
+            return
+        async with self._rate_lock:
+            now = time.monotonic()
+            if self._next_slot > now:
+                self.metrics["throttled"] += 1
+                await asyncio.sleep(self._next_slot - now)
+            self._next_slot = max(now, self._next_slot) + 1 / self.rate_limit
+
+    async def _discard(self, smtp: aiosmtplib.SMTP) -> None:
+        try:
+            if smtp.is_connected:
+                await asyncio.wait_for(smtp.quit(), timeout=1.0)
+        except Exception:
+            pass
+        smtp.close()
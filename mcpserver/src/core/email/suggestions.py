@@ -0,0 +1,151 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import (
+    Awaitable,
+    Callable,
+    Optional,
+)
+
+# ответы модели, означающие «событие не нужно»
+NO_EVENT_ANSWERS = {"NO_EVENT", "NO", "НЕТ"}
+
+
+def _event_prompt(email_from: str, email_subject: str, email_body: str) -> str:
+    "промпт на случай, если промпт модуля календаря недоступен"
+    return (
+        f"Если письмо требует от получателя ответа или действия, сформулируй "
+        f"краткую задачу одной строкой. Иначе верни 'NO_EVENT'.\n\n"
+        f"Отправитель: {email_from}\n"
+        f"Тема: {email_subject}\n"
+        f"Текст:\n{email_body[:1000]}"
+    )
+
+
+def _message_hash(email: dict) -> str:
+    "хеш содержимого письма: одинаковые письма с разными UID сэмплируются один раз"
+    digest = hashlib.sha256()
+    for field in ("from", "subject", "body"):
+        digest.update((email.get(field) or "").encode("utf-8", "replace"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class EventSuggester:
+    """
+    Фоновая очередь предложений событий по письмам.
+
+    `submit` не ждёт LLM: ставит сэмплирование в фоновую задачу и сразу
+    возвращает статус. Одновременно выполняется не больше `concurrency`
+    запросов к модели, в очереди — не больше `max_pending` задач (лишние
+    отбрасываются со статусом "dropped"). Повторный `submit` того же письма
+    (по UID или по хешу содержимого) не запускает второй запрос: результат
+    берётся из кеша на `cache_size` записей или присоединяется к уже
+    выполняющейся задаче.
+    """
+
+    def __init__(self, concurrency: int = 2, max_pending: int = 32, cache_size: int = 1024):
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.cache_size = cache_size
+        self._slots = asyncio.Semaphore(concurrency)
+        self._results: OrderedDict[str, dict] = OrderedDict()
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._uids: OrderedDict[str, str] = OrderedDict()
+        self.metrics = {"submitted": 0, "cached": 0, "deduplicated": 0, "dropped": 0, "errors": 0}
+
+    def submit(
+        self,
+        uid: str,
+        email: dict,
+        sample: Callable[[dict], Awaitable[str]],
+        notify: Optional[Callable[[dict], Awaitable[None]]] = None,
+    ) -> dict:
+        """
+        Запускает предложение события для письма, если его ещё нет.
+        `sample(email)` возвращает ответ модели, `notify(result)` вызывается
+        по готовности (например, лог-уведомление). Возвращает текущий статус.
+        """
+        key = _message_hash(email)
+        self._remember_uid(uid, key)
+        cached = self._results.get(key)
+        if cached is not None and cached["status"] == "done":
+            self._results.move_to_end(key)
+            self.metrics["cached"] += 1
+            return self._status(uid, key)
+        if key in self._tasks:
+            self.metrics["deduplicated"] += 1
+            return self._status(uid, key)
+        if len(self._tasks) >= self.max_pending:
+            self.metrics["dropped"] += 1
+            return {"uid": uid, "status": "dropped"}
+        # прошлая ошибка не кешируется: пробуем ещё раз
+        self._results.pop(key, None)
+        self.metrics["submitted"] += 1
+        task = asyncio.create_task(self._run(uid, key, email, sample, notify))
+        self._tasks[key] = task
+        task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        return self._status(uid, key)
+
+    def get(self, uid: str) -> Optional[dict]:
+        """Статус предложения по UID или None, если письмо не отправлялось."""
+        key = self._uids.get(uid)
+        if key is None:
+            return None
+        return self._status(uid, key)
+
+    def uids(self) -> list[str]:
+        """UID писем, по которым есть задачи или результаты, от старых к новым."""
+        return list(self._uids)
+
+    def stats(self) -> dict:
+        return {
+            **self.metrics,
+            "concurrency": self.concurrency,
+            "in_flight": len(self._tasks),
+            "cached_results": sum(r["status"] == "done" for r in self._results.values()),
+        }
+
+    async def close(self) -> None:
+        """Отменяет незавершённые задачи."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, uid, key, email, sample, notify) -> None:
+        async with self._slots:
+            started = time.perf_counter()
+            try:
+                answer = (await sample(email)).strip()
+            except Exception as e:
+                self.metrics["errors"] += 1
+                result = {"status": "error", "error": str(e)}
+            else:
+                create = answer.strip(" .'\"").upper() not in NO_EVENT_ANSWERS
+                result = {"status": "done", "suggestion": answer if create else None}
+            result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        self._results[key] = result
+        while len(self._results) > self.cache_size:
+            self._results.popitem(last=False)
+        if notify is not None:
+            try:
+                await notify({"uid": uid, **result})
+            except Exception:
+                # клиент мог уже отключиться — результат остаётся в кеше
+                pass
+
+    def _remember_uid(self, uid: str, key: str) -> None:
+        self._uids[uid] = key
+        self._uids.move_to_end(uid)
+        while len(self._uids) > self.cache_size:
+            self._uids.popitem(last=False)
+
+    def _status(self, uid: str, key: str) -> dict:
+        if key in self._results:
+            return {"uid": uid, **self._results[key]}
+        if key in self._tasks:
+            return {"uid": uid, "status": "pending"}
+        # результат вытеснен из кеша
+        return {"uid": uid, "status": "expired"}
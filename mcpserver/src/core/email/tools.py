@@ -1,26 +1,98 @@
-import email as email_lib
+from datetime import datetime
 from typing import (
     List,
     Optional,
 )
 
-import aioimaplib
 from src.config import Config
 from fastmcp import (
     Context,
     FastMCP,
 )
-from html2text import html2text
+from mcp import (
+    ServerSession,
+    types,
+)
+
+from .suggestions import _event_prompt
 
 
 def setup_tools(
     mcp: FastMCP,
     config: Config,
-    _send_raw_email: callable,
+    _get_outbox: callable,
+    _send_bulk_emails: callable,
     _fetch_emails: callable,
-    _decode_mime_words: callable,
-    _clean_email_body: callable,
+    _fetch_messages: callable,
+    _decode_messages: callable,
+    _get_imap_pool: callable,
+    _get_mail_index: callable,
+    _get_message_cache: callable,
+    _get_event_suggester: callable,
+    _notify_suggestions: callable,
 ):
+    async def _read_emails(uids: List[str]) -> dict:
+        """
+        Письма по UID: из кеша или одной IMAP-сессией без вложений; разбор —
+        параллельно и уже после возврата сессии в пул. Для каждого UID —
+        разобранное письмо или исключение.
+        """
+        cache = _get_message_cache()
+        max_bytes = config.email.EMAIL_BODY_MAX_BYTES
+        results = {}
+        for uid in uids:
+            if not uid.isdigit():
+                results[uid] = ValueError(f"Некорректный UID: {uid!r}")
+        async with _get_imap_pool().session("INBOX") as session:
+            # UIDVALIDITY берётся из закешированного SELECT, лишних запросов нет
+            uidvalidity = session.mailbox.uidvalidity
+            for uid in uids:
+                if uid not in results:
+                    parsed = cache.get("INBOX", uidvalidity, uid)
+                    if parsed is not None:
+                        results[uid] = parsed
+            missing = [uid for uid in dict.fromkeys(uids) if uid not in results]
+            messages = await _fetch_messages(session.client, missing, max_bytes)
+
+        decoded = await _decode_messages(messages, max_bytes)
+        for uid in missing:
+            parsed = decoded.get(uid)
+            if parsed is None:
+                parsed = ValueError(f"Письмо с UID {uid} не найдено")
+            elif not isinstance(parsed, Exception):
+                cache.put("INBOX", uidvalidity, uid, parsed)
+            results[uid] = parsed
+        return results
+
+    async def _event_messages(ctx: Context, email: dict) -> list[str]:
+        "промпт предложения задачи по письму"
+        arguments = {
+            "email_from": email["from"],
+            "email_subject": email["subject"],
+            "email_body": email["body"],
+        }
+        try:
+            prompt = await ctx.get_prompt(config.email.EVENT_SUGGESTION_PROMPT, arguments)
+            return [m.content.text for m in prompt.messages if m.content.type == "text"]
+        except Exception:
+            # модуль календаря не смонтирован или промпт переименован
+            return [_event_prompt(**arguments)]
+
+    async def _sample_event(session: ServerSession, messages: list[str]) -> str:
+        """
+        Ответ модели на промпт. Запрос идёт в сессию без привязки к вызову
+        инструмента: по HTTP поток ответа на вызов к этому моменту закрыт,
+        и sampling через ctx до клиента бы не дошёл.
+        """
+        reply = await session.create_message(
+            [
+                types.SamplingMessage(role="user", content=types.TextContent(type="text", text=text))
+                for text in messages
+            ],
+            max_tokens=100,
+        )
+        return reply.content.text if reply.content.type == "text" else ""
+
     @mcp.tool(title="send_email")
     async def send_email(
         to: List[str],
@@ -28,107 +100,120 @@ def setup_tools(
         body: str,
         cc: Optional[List[str]] = None,
         bcc: Optional[List[str]] = None,
+        idempotency_key: Optional[str] = None,
     ) -> dict:
-        """Отправить электронное письмо одному или нескольким получателям."""
-        cc = cc or []
-        bcc = bcc or []
+        """
+        Отправить электронное письмо одному или нескольким получателям.
+        Письмо ставится в очередь и отправляется в фоне; статус доставки —
+        в get_send_status по возвращённому id. Повторный вызов с тем же
+        idempotency_key не отправляет письмо второй раз.
+        """
+        payload = {"to": to, "cc": cc or [], "bcc": bcc or [], "subject": subject, "body": body}
+        return _get_outbox().enqueue(payload, idempotency_key)
 
-        return await _send_raw_email(to, cc, bcc, subject, body)
+    @mcp.tool
+    async def get_send_status(ids: Optional[List[str]] = None) -> dict:
+        """
+        Статус отправки писем по id из send_email: queued, sending, retrying,
+        sent или dead (не доставлено); refused — получатели, которых сервер
+        отклонил у отправленного письма. Без ids — последние письма и счётчики.
+        """
+        outbox = _get_outbox()
+        if ids is None:
+            return {"messages": outbox.recent(), "stats": outbox.stats()}
+        messages = []
+        for message_id in ids:
+            status = outbox.status(message_id)
+            messages.append(status or {"id": message_id, "status": "unknown"})
+        return {"messages": messages}
 
     @mcp.tool
-    async def get_email(uid: str, ctx: Context) -> dict:
+    async def send_emails(recipients: List[str], subject: str, body: str) -> dict:
         """
-        Получить письмо по UID и, при необходимости, предложить создать задачу.
+        Разослать одно письмо по шаблону нескольким получателям: каждому —
+        отдельное письмо, `{email}` в теме и тексте заменяется его адресом.
         """
-        client = aioimaplib.IMAP4_SSL(config.email.IMAP_HOST, config.email.IMAP_PORT)
-        try:
-            await client.wait_hello_from_server()
-            await client.login(config.email.EMAIL_ADDRESS, config.email.EMAIL_PASSWORD)
-            await client.select("INBOX")
-            _, msg_data = await client.fetch(uid, "(RFC822)")
-            raw = msg_data[1]
-            parsed = email_lib.message_from_bytes(raw)
-
-            # Извлечение тела
-            body = ""
-            if parsed.is_multipart():
-                for part in parsed.walk():
-                    content_type = part.get_content_type()
-                    content_disposition = str(part.get("Content-Disposition", ""))
-
-                    # Пропускаем вложения
-                    if "attachment" in content_disposition:
-                        continue
-
-                    if content_type == "text/plain":
-                        payload = part.get_payload(decode=True)
-                        if payload:
-                            charset = part.get_content_charset() or "utf-8"
-                            try:
-                                body = payload.decode(charset, errors="replace")
-                            except LookupError:
-                                body = payload.decode("utf-8", errors="replace")
-                            break
-                else:
-                    # Если нет text/plain — попробуем text/html
-                    for part in parsed.walk():
-                        content_disposition = str(part.get("Content-Disposition", ""))
-                        if "attachment" in content_disposition:
-                            continue
-                        if part.get_content_type() == "text/html":
-                            payload = part.get_payload(decode=True)
-                            if payload:
-                                charset = part.get_content_charset() or "utf-8"
-                                try:
-                                    html = payload.decode(charset, errors="replace")
-                                except LookupError:
-                                    html = payload.decode("utf-8", errors="replace")
-                                # Опционально: преобразовать HTML в текст
-                                body = html  # или используйте html2text
-                                break
+        results = await _send_bulk_emails(recipients, subject, body)
+        sent = sum(result["status"] == "sent" for result in results)
+        return {"sent": sent, "failed": len(results) - sent, "results": results}
+
+    @mcp.tool
+    async def get_email(uid: str, ctx: Context, suggest_event: bool = True) -> dict:
+        """
+        Получить письмо по UID. Если suggest_event, в фоне запускается
+        предложение задачи по письму; его статус — в поле event_suggestion,
+        результат — в get_event_suggestions и лог-уведомлении сессии.
+        """
+        parsed = (await _read_emails([uid]))[uid]
+        if isinstance(parsed, Exception):
+            raise parsed
+        email_data = {
+            "uid": uid,
+            "from": parsed["from"],
+            "subject": parsed["subject"],
+            "body": parsed["body"],
+        }
+
+        # === Предложение задачи: в фоне, письмо возвращается сразу ===
+        if suggest_event and config.email.EVENT_SUGGESTIONS_ENABLED:
+            # контекст запроса после ответа недействителен — фону нужна только сессия
+            session = ctx.session
+            messages = await _event_messages(ctx, parsed)
+
+            async def sample(email: dict) -> str:
+                return await _sample_event(session, messages)
+
+            async def notify(result: dict) -> None:
+                await _notify_suggestions()
+                if result.get("suggestion"):
+                    await session.send_log_message(
+                        level="info",
+                        data={"msg": f"✅ Предложено событие: {result['suggestion']}"},
+                    )
+
+            email_data["event_suggestion"] = _get_event_suggester().submit(
+                uid, parsed, sample, notify
+            )
+
+        return email_data
+
+    @mcp.tool
+    async def get_emails(uids: List[str]) -> dict:
+        """
+        Получить несколько писем по списку UID за один запрос.
+        Для ненайденных писем вместо содержимого возвращается поле error.
+        """
+        results = await _read_emails(uids)
+        emails = []
+        for uid in uids:
+            parsed = results[uid]
+            if isinstance(parsed, Exception):
+                emails.append({"uid": uid, "error": str(parsed)})
             else:
-                # Простое (не multipart) письмо
-                payload = parsed.get_payload(decode=True)
-                if payload:
-                    charset = parsed.get_content_charset() or "utf-8"
-                    try:
-                        body = payload.decode(charset, errors="replace")
-                    except LookupError:
-                        body = payload.decode("utf-8", errors="replace")
-
-            cleaned_body = _clean_email_body(html2text(body).strip())
-
-            email_data = {
-                "uid": uid,
-                "from": _decode_mime_words(parsed.get("From", "")),
-                "subject": _decode_mime_words(parsed.get("Subject", "")),
-                "body": cleaned_body,
-            }
-
-            # === Генерация предложения задачи ===
-            try:
-                event_prompt = await ctx.prompt(
-                    "calendar_should_create_enent_from_email",
+                emails.append(
                     {
-                        "email_from": email_data["from"],
-                        "email_subject": email_data["subject"],
-                        "email_body": email_data["body"],
-                    },
+                        "uid": uid,
+                        "from": parsed["from"],
+                        "subject": parsed["subject"],
+                        # в записях кеша до появления get_emails даты нет
+                        "date": parsed.get("date", ""),
+                        "body": parsed["body"],
+                    }
                 )
-                suggestion = await ctx.sample(event_prompt)
-                if suggestion.text.strip() != "NO_EVENT":
-                    await ctx.info(f"✅ Предложено событие: {suggestion.text}")
-            except Exception as e:
-                # Не ломаем основной вызов, если промпт недоступен
-                await ctx.error(f"Не удалось сгенерировать задачу: {e}")
-
-            return email_data
+        return {"emails": emails}
 
-        finally:
-            try:
-                await client.logout()
-            except:
-                pass
+    @mcp.tool
+    async def get_event_suggestions(uids: Optional[List[str]] = None) -> dict:
+        """
+        Предложения задач по прочитанным через get_email письмам.
+        Без uids — по всем письмам, для которых запускалось предложение.
+        """
+        suggester = _get_event_suggester()
+        suggestions = []
+        for uid in uids if uids is not None else suggester.uids():
+            status = suggester.get(uid)
+            suggestions.append(status or {"uid": uid, "status": "unknown"})
+        return {"suggestions": suggestions}
 
     @mcp.tool
     async def list_emails(limit: int = 10) -> dict:
@@ -139,24 +224,24 @@ def setup_tools(
     @mcp.tool
     async def search_emails_by_sender(from_email: str, limit: int = 10) -> dict:
         """Найти письма по адресу отправителя (подстрока в From)."""
-        emails = await _fetch_emails(["HEADER", "FROM", from_email], limit)
-        return {"emails": emails}
+        index = _get_mail_index()
+        await index.ensure_fresh(_get_imap_pool())
+        return {"emails": index.search_by_sender(from_email, limit)}
 
     @mcp.tool
     async def search_emails_by_date(
         since: str = None, before: str = None, limit: int = 10
     ) -> dict:
         """Найти письма по дате. Формат даты: YYYY-MM-DD."""
-        criteria = []
-        if since:
-            from datetime import datetime
-
-            dt = datetime.strptime(since, "%Y-%m-%d")
-            criteria.extend(["SINCE", dt.strftime("%d-%b-%Y")])
-        if before:
-            dt = datetime.strptime(before, "%Y-%m-%d")
-            criteria.extend(["BEFORE", dt.strftime("%d-%b-%Y")])
-        if not criteria:
-            criteria = ["ALL"]
-        emails = await _fetch_emails(criteria, limit)
-        return {"emails": emails}
+        since_day = datetime.strptime(since, "%Y-%m-%d").date() if since else None
+        before_day = datetime.strptime(before, "%Y-%m-%d").date() if before else None
+        index = _get_mail_index()
+        await index.ensure_fresh(_get_imap_pool())
+        return {"emails": index.search_by_date(since_day, before_day, limit)}
+
+    @mcp.tool
+    async def search_emails(query: str, limit: int = 10) -> dict:
+        """Полнотекстовый поиск писем по отправителю, теме и тексту."""
+        index = _get_mail_index()
+        await index.ensure_fresh(_get_imap_pool())
+        return {"emails": index.search(query, limit)}
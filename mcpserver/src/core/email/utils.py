@@ -1,66 +1,132 @@
+import asyncio
 import re
-import aiosmtplib
-import aioimaplib
 import email as email_lib
 
 from email.header import decode_header
+from email.parser import BytesHeaderParser
+from html2text import html2text
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
 from src.config import Config
+from .cleaner import _clean_email_body
+from .executor import ParseExecutor
+from .mime import (
+    SectionDecoder,
+    _find_text_part,
+    _parse_bodystructure,
+)
+from .pool import ImapPool
+from .smtp import SmtpSender
 
 config = Config.load()
 
+_HEADER_FIELDS = "BODY.PEEK[HEADER.FIELDS (FROM SUBJECT DATE)]"
+HEADER_FETCH_ITEMS = f"(UID RFC822.SIZE FLAGS {_HEADER_FIELDS})"
+_FETCH_START_RE = re.compile(rb"^\d+ FETCH \(")
+_FETCH_UID_RE = re.compile(rb"\bUID (\d+)")
+_FETCH_SIZE_RE = re.compile(rb"\bRFC822\.SIZE (\d+)")
+_FETCH_FLAGS_RE = re.compile(rb"\bFLAGS \(([^)]*)\)")
+_header_parser = BytesHeaderParser()
 
-def _clean_email_body(body: str) -> str:
-    # 1. Удаляем ВСЁ, что похоже на изображения: ![](...) — даже битые
-    body = re.sub(r"!\$$[^$$]*\$$\s*$$[^)]*\)", "", body, flags=re.DOTALL)
-    body = re.sub(r"!\$$[^)]*\)", "", body, flags=re.DOTALL)  # fallback
-    body = re.sub(r"!\$$\s*\$$", "", body)  # ![]()
+_imap_pool: ImapPool | None = None
+_parse_executor: ParseExecutor | None = None
+_smtp_sender: SmtpSender | None = None
 
-    # 2. Удаляем Markdown-ссылки вида [текст](mailto:...) или <[текст](url)>
-    body = re.sub(r"<$$$[^$$]*$$\([^)]*\)>", "", body, flags=re.DOTALL)
-    body = re.sub(r"$$$[^$$]*$$\([^)]*mailto:[^)]*\)", "", body, flags=re.DOTALL)
-    body = re.sub(r"$$$[^$$]*$$\([^)]*\)", "", body, flags=re.DOTALL)
 
-    # 3. Удаляем email-подобные вставки: <parol.zd2@yandex.ru>
-    body = re.sub(r"<[^>]*@[^>]*>", "", body)
+def _get_imap_pool() -> ImapPool:
+    "общий пул IMAP-сессий модуля почты"
+    global _imap_pool
+    if _imap_pool is None:
+        _imap_pool = ImapPool(
+            host=config.email.IMAP_HOST,
+            port=config.email.IMAP_PORT,
+            user=config.email.EMAIL_ADDRESS,
+            password=config.email.EMAIL_PASSWORD,
+            size=config.email.IMAP_POOL_SIZE,
+            use_ssl=config.email.IMAP_SSL,
+            timeout=config.email.IMAP_TIMEOUT,
+            noop_interval=config.email.IMAP_POOL_NOOP_INTERVAL,
+            max_idle=config.email.IMAP_POOL_MAX_IDLE,
+        )
+    return _imap_pool
 
-    # 4. Удаляем строки с "Кому:", "Тема:", датами вида "04.12.2025, 15:15"
-    body = re.sub(
-        r"(?i)^\s*(Кому|Тема|From|To|Date|Sent):.*$", "", body, flags=re.MULTILINE
-    )
-    body = re.sub(r"\d{2}\.\d{2}\.\d{4},\s*\d{2}:\d{2}.*", "", body)
 
-    # 5. Удаляем горизонтальные разделители
-    body = re.sub(r"^\s*[\\-–=]{3,}\s*$", "", body, flags=re.MULTILINE)
+def _get_smtp_sender() -> SmtpSender:
+    "общие SMTP-соединения и очередь исходящих писем"
+    global _smtp_sender
+    if _smtp_sender is None:
+        _smtp_sender = SmtpSender(
+            hostname=config.email.SMTP_HOST,
+            port=config.email.SMTP_PORT,
+            username=config.email.EMAIL_ADDRESS,
+            password=config.email.EMAIL_PASSWORD,
+            use_tls=config.email.SMTP_SSL,
+            timeout=config.email.SMTP_TIMEOUT,
+            connections=config.email.SMTP_CONNECTIONS,
+            rate_limit=config.email.SMTP_RATE_LIMIT,
+            retries=config.email.SMTP_RETRIES,
+            backoff=config.email.SMTP_RETRY_BACKOFF,
+        )
+    return _smtp_sender
 
-    # 6. Удаляем обрывки URL, параметров и мусора вроде "dbaf-08dd12d39b36&f=0"
-    body = re.sub(
-        r"[a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12}", "", body
-    )  # UUID
-    body = re.sub(r"&[a-z0-9]+=[^&\s]*", "", body, flags=re.IGNORECASE)  # &f=0, &id=...
-    body = re.sub(r"https?://[^\s)]*", "", body)  # остаточные URL
 
-    # 7. Удаляем пустые строки и лишние пробелы
-    lines = [line.strip() for line in body.splitlines() if line.strip()]
+def _get_parse_executor() -> ParseExecutor:
+    "пул для разбора писем вне event loop"
+    global _parse_executor
+    if _parse_executor is None:
+        _parse_executor = ParseExecutor(
+            kind=config.email.PARSE_EXECUTOR,
+            workers=config.email.PARSE_WORKERS,
+            max_pending=config.email.PARSE_MAX_PENDING,
+        )
+    return _parse_executor
 
-    # 8. Оставляем только **первый блок до первой цитаты или пересылки**
-    # Ищем признаки начала истории: "написал:", ":", ">", "04.12.2025"
-    clean_lines = []
-    for line in lines:
-        if re.search(
-            r"(написал|:.*<.*@.*>|^\d{2}\.\d{2}\.\d{4}|>.*$)", line, re.IGNORECASE
-        ):
-            break
-        clean_lines.append(line)
 
-    # 9. Собираем и убираем двойные пробелы
-    result = "\n".join(clean_lines)
-    result = re.sub(r"\s{2,}", " ", result)
-    result = re.sub(r"\s*\n\s*", "\n", result).strip()
+def _decode_payload(part) -> str:
+    payload = part.get_payload(decode=True)
+    if not payload:
+        return ""
+    charset = part.get_content_charset() or "utf-8"
+    try:
+        return payload.decode(charset, errors="replace")
+    except LookupError:
+        return payload.decode("utf-8", errors="replace")
+
+
+def _extract_body(parsed) -> str:
+    "текст письма: первая text/plain часть, иначе text/html (вложения пропускаются)"
+    if not parsed.is_multipart():
+        # Простое (не multipart) письмо
+        return _decode_payload(parsed)
+
+    for content_type in ("text/plain", "text/html"):
+        for part in parsed.walk():
+            content_disposition = str(part.get("Content-Disposition", ""))
+            # Пропускаем вложения
+            if "attachment" in content_disposition:
+                continue
+            if part.get_content_type() == content_type:
+                body = _decode_payload(part)
+                if body:
+                    return body
+    return ""
+
+
+def _to_email(headers, body: str) -> dict:
+    "заголовки и очищенный текст письма"
+    return {
+        "from": _decode_mime_words(headers.get("From", "")),
+        "subject": _decode_mime_words(headers.get("Subject", "")),
+        "date": headers.get("Date", ""),
+        "body": _clean_email_body(html2text(body).strip()),
+    }
+
 
-    return result
+def _parse_email(raw: bytes) -> dict:
+    "заголовки и очищенный текст письма из RFC822"
+    parsed = email_lib.message_from_bytes(raw)
+    return _to_email(parsed, _extract_body(parsed))
 
 
 def _decode_mime_words(s):
@@ -80,8 +146,7 @@ def _decode_mime_words(s):
     return "".join(parts)
 
 
-async def _send_raw_email(to, cc, bcc, subject, body):
-    all_recipients = to + cc + bcc
+def _build_message(to, cc, bcc, subject, body, message_id=None) -> MIMEMultipart:
     msg = MIMEMultipart("alternative")
     msg["From"] = config.email.EMAIL_ADDRESS
     msg["To"] = ", ".join(to)
@@ -90,44 +155,195 @@ async def _send_raw_email(to, cc, bcc, subject, body):
     if bcc:
         msg["Bcc"] = ", ".join(bcc)
     msg["Subject"] = subject
+    if message_id:
+        # один Message-ID на все попытки: повторная доставка распознаётся как дубль
+        domain = config.email.EMAIL_ADDRESS.rpartition("@")[2] or "localhost"
+        msg["Message-ID"] = f"<{message_id}@{domain}>"
     msg.attach(MIMEText(body, "plain", "utf-8"))
+    return msg
 
-    await aiosmtplib.send(
-        msg,
-        recipients=all_recipients,
-        hostname=config.email.SMTP_HOST,
-        port=config.email.SMTP_PORT,
-        use_tls=True,
-        username=config.email.EMAIL_ADDRESS,
-        password=config.email.EMAIL_PASSWORD,
+
+async def _deliver_email(message_id: str, payload: dict) -> dict:
+    "доставляет письмо из очереди отправки"
+    to, cc, bcc = payload["to"], payload.get("cc", []), payload.get("bcc", [])
+    msg = _build_message(to, cc, bcc, payload["subject"], payload["body"], message_id)
+    # повторы с отсрочкой ведёт очередь (OUTBOX_MAX_ATTEMPTS): попытка — одна отправка
+    return await _get_smtp_sender().send(msg, to + cc + bcc, retries=0)
+
+
+async def _send_bulk_emails(recipients, subject, body):
+    """
+    Рассылает шаблон каждому получателю отдельным письмом через общие
+    SMTP-соединения. `{email}` в теме и тексте заменяется адресом получателя.
+    """
+    messages = [
+        (
+            _build_message(
+                [address],
+                [],
+                [],
+                subject.replace("{email}", address),
+                body.replace("{email}", address),
+            ),
+            [address],
+        )
+        for address in recipients
+    ]
+    results = await _get_smtp_sender().send_many(messages)
+    return [
+        {"to": address, "status": "error", "error": str(result)}
+        if isinstance(result, Exception)
+        else {"to": address, "status": "sent"}
+        for address, result in zip(recipients, results)
+    ]
+
+
+def _uid_set(uids: list) -> str:
+    "сжимает список UID в IMAP-набор вида 1:5,8,10:12"
+    numbers = sorted({int(uid) for uid in uids})
+    ranges = []
+    for number in numbers:
+        if ranges and ranges[-1][1] == number - 1:
+            ranges[-1][1] = number
+        else:
+            ranges.append([number, number])
+    return ",".join(
+        str(start) if start == end else f"{start}:{end}" for start, end in ranges
     )
-    return {"status": "sent", "to": to, "subject": subject}
+
+
+def _split_fetch(lines: list) -> list:
+    "группирует строки ответа FETCH по письмам: [(метаданные, literal), ...]"
+    items = []
+    for line in lines:
+        if isinstance(line, bytearray):
+            if items:
+                items[-1][1] = line
+        elif _FETCH_START_RE.match(line):
+            items.append([line, b""])
+        elif items:
+            items[-1][0] += b" " + line
+    return [(meta, bytes(literal)) for meta, literal in items]
+
+
+def _fetch_flags(meta: bytes) -> list:
+    match = _FETCH_FLAGS_RE.search(meta)
+    return match.group(1).decode().split() if match else []
+
+
+def _parse_header_fetch(lines: list) -> list:
+    "разбирает ответ UID FETCH по HEADER_FETCH_ITEMS за один проход"
+    emails = []
+    for meta, headers in _split_fetch(lines):
+        uid = _FETCH_UID_RE.search(meta)
+        if not uid:
+            continue
+        size = _FETCH_SIZE_RE.search(meta)
+        parsed = _header_parser.parsebytes(headers)
+        emails.append(
+            {
+                "uid": uid.group(1).decode(),
+                "from": _decode_mime_words(parsed.get("From", "")),
+                "subject": _decode_mime_words(parsed.get("Subject", "(no subject)")),
+                "date": parsed.get("Date", ""),
+                "size": int(size.group(1)) if size else None,
+                "seen": "\\Seen" in _fetch_flags(meta),
+            }
+        )
+    return emails
+
+
+async def _fetch_headers(client, uids: list) -> list:
+    "один UID FETCH только по заголовкам, размеру и флагам"
+    if not uids:
+        return []
+    response = await client.uid("fetch", _uid_set(uids), HEADER_FETCH_ITEMS)
+    emails = await _get_parse_executor().run(
+        "headers", _parse_header_fetch, response.lines[:-1]
+    )
+    return sorted(emails, key=lambda e: int(e["uid"]))
+
+
+async def _fetch_messages(client, uids: list, max_bytes: int = 0) -> dict:
+    """
+    Сырые данные писем для _decode_message, без вложений: один UID FETCH
+    по BODYSTRUCTURE и заголовкам, затем по одному FETCH на номер текстовой
+    секции (обычно один-два), не больше `max_bytes` байт на письмо
+    (0 — без ограничения). Письма, для которых сервер не прислал
+    BODYSTRUCTURE, скачиваются целиком. Ключ результата — UID.
+    """
+    if not uids:
+        return {}
+    response = await client.uid(
+        "fetch", _uid_set(uids), f"(UID BODYSTRUCTURE {_HEADER_FIELDS})"
+    )
+    messages, sections, fallback = {}, {}, []
+    for meta, headers in _split_fetch(response.lines[:-1]):
+        uid = _FETCH_UID_RE.search(meta)
+        if not uid:
+            continue
+        uid = uid.group(1).decode()
+        structure = _parse_bodystructure(meta)
+        if structure is None:
+            fallback.append(uid)
+            continue
+        part = _find_text_part(structure)
+        messages[uid] = {"headers": headers, "part": part, "data": b""}
+        if part is not None:
+            sections.setdefault(part.section, []).append(uid)
+
+    # BODY.PEEK: чтение писем агентом не снимает с них отметку «непрочитано»
+    partial = f"<0.{max_bytes}>" if max_bytes else ""
+    for section, group in sections.items():
+        response = await client.uid(
+            "fetch", _uid_set(group), f"(UID BODY.PEEK[{section}]{partial})"
+        )
+        for meta, data in _split_fetch(response.lines[:-1]):
+            uid = _FETCH_UID_RE.search(meta)
+            if uid and uid.group(1).decode() in messages:
+                messages[uid.group(1).decode()]["data"] = data
+
+    if fallback:
+        response = await client.uid("fetch", _uid_set(fallback), "(UID BODY.PEEK[])")
+        for meta, raw in _split_fetch(response.lines[:-1]):
+            uid = _FETCH_UID_RE.search(meta)
+            if uid and raw:
+                messages[uid.group(1).decode()] = {"raw": raw}
+    return messages
+
+
+def _decode_message(message: dict, max_bytes: int = 0) -> dict:
+    "разбор данных из _fetch_messages: заголовки и очищенный текст письма"
+    if "raw" in message:
+        return _parse_email(message["raw"])
+    body = ""
+    part, data = message["part"], message["data"]
+    if part is not None:
+        complete = not max_bytes or len(data) < max_bytes or part.size <= max_bytes
+        decoder = SectionDecoder(part.encoding, part.charset)
+        body = decoder.feed(data) + decoder.close(complete)
+    return _to_email(_header_parser.parsebytes(message["headers"]), body)
+
+
+async def _decode_messages(messages: dict, max_bytes: int = 0) -> dict:
+    """
+    Разбирает письма параллельно в пуле разбора: html2text и очистка текста
+    не блокируют event loop. Ошибка разбора возвращается вместо письма.
+    """
+    executor = _get_parse_executor()
+    results = await asyncio.gather(
+        *(
+            executor.run("message", _decode_message, message, max_bytes)
+            for message in messages.values()
+        ),
+        return_exceptions=True,
+    )
+    return dict(zip(messages, results))
 
 
 async def _fetch_emails(criteria: list, limit: int = 10):
-    client = aioimaplib.IMAP4_SSL(config.email.IMAP_HOST, config.email.IMAP_PORT)
-    try:
-        await client.wait_hello_from_server()
-        await client.login(config.email.EMAIL_ADDRESS, config.email.EMAIL_PASSWORD)
-        await client.select("INBOX")
-        _, data = await client.search(*criteria)
-        ids = data[0].split()[-limit:] if data[0] else []
-        emails = []
-        for uid in ids:
-            uid_str = uid.decode("utf-8")
-            _, msg_data = await client.fetch(uid_str, "(RFC822)")
-            raw = msg_data[1]
-            parsed = email_lib.message_from_bytes(raw)
-            emails.append(
-                {
-                    "uid": uid_str,
-                    "from": _decode_mime_words(parsed.get("From", "")),
-                    "subject": _decode_mime_words(
-                        parsed.get("Subject", "(no subject)")
-                    ),
-                    "date": parsed.get("Date", ""),
-                }
-            )
-        return emails
-    finally:
-        await client.logout()
+    async with _get_imap_pool().session("INBOX") as session:
+        client = session.client
+        _, data = await client.uid_search(*criteria)
+        uids = data[0].split()[-limit:] if data[0] else []
+        return await _fetch_headers(client, uids)
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import re
+import time
+from typing import (
+    Awaitable,
+    Callable,
+    Optional,
+)
+
+import aioimaplib
+
+from .pool import (
+    ImapPool,
+    ImapSession,
+)
+from .utils import _fetch_headers
+
+log = logging.getLogger(__name__)
+
+_CHANGE_RE = re.compile(rb"\b(EXISTS|EXPUNGE|FETCH)\b")
+
+
+class InboxWatcher:
+    """
+    Фоновое наблюдение за ящиком через IMAP IDLE (или NOOP-опрос, если сервер
+    не объявляет IDLE). Держит в памяти снимок последних `limit` писем,
+    подходящих под `criteria`, и вызывает `on_change` при его изменении.
+    """
+
+    def __init__(
+        self,
+        pool: ImapPool,
+        mailbox: str = "INBOX",
+        criteria: str = "UNSEEN",
+        limit: int = 5,
+        idle_timeout: float = 300.0,
+        poll_interval: float = 30.0,
+        on_change: Optional[Callable[[], Awaitable[None]]] = None,
+    ):
+        self.pool = pool
+        self.mailbox = mailbox
+        self.criteria = criteria
+        self.limit = limit
+        self.idle_timeout = idle_timeout
+        self.poll_interval = poll_interval
+        self.on_change = on_change
+        # None — снимка нет (ещё не подключились или соединение потеряно)
+        self.snapshot: Optional[dict] = None
+        self._headers: dict[str, dict] = {}
+
+    async def run(self) -> None:
+        """Основной цикл: переподключается с экспоненциальной задержкой."""
+        delay = 1.0
+        while True:
+            try:
+                async with self.pool.session(self.mailbox) as session:
+                    await self._refresh(session)
+                    delay = 1.0
+                    while True:
+                        if await self._wait_for_changes(session):
+                            await self._refresh(session)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.warning("Inbox watcher disconnected", exc_info=True)
+                self.snapshot = None
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 300.0)
+
+    async def _wait_for_changes(self, session: ImapSession) -> bool:
+        if not session.has_capability("IDLE"):
+            await asyncio.sleep(self.poll_interval)
+            response = await session.client.noop()
+            session.mailbox.update(response.lines)
+            # без IDLE изменения флагов другими клиентами видны только поиском
+            return True
+
+        client = session.client
+        idle = await client.idle_start(timeout=self.idle_timeout)
+        try:
+            push = await client.wait_server_push(timeout=self.idle_timeout + client.timeout)
+        finally:
+            client.idle_done()
+        await asyncio.wait_for(idle, client.timeout)
+        if push == aioimaplib.STOP_WAIT_SERVER_PUSH:
+            # плановый выход из IDLE: заодно перепроверяем снимок
+            return True
+        session.mailbox.update(push)
+        return any(_CHANGE_RE.search(line) for line in push)
+
+    async def _refresh(self, session: ImapSession) -> None:
+        _, data = await session.client.uid_search(self.criteria)
+        uids = [uid.decode() for uid in data[0].split()] if data[0] else []
+        latest = uids[-self.limit :] if self.limit else []
+        missing = [uid for uid in latest if uid not in self._headers]
+        for email in await _fetch_headers(session.client, missing):
+            self._headers[email["uid"]] = email
+        self._headers = {uid: self._headers[uid] for uid in latest if uid in self._headers}
+
+        emails = list(self._headers.values())
+        changed = (
+            self.snapshot is None
+            or self.snapshot["emails"] != emails
+            or self.snapshot["total"] != len(uids)
+        )
+        self.snapshot = {
+            "emails": emails,
+            "total": len(uids),
+            "updated_at": time.time(),
+        }
+        if changed and self.on_change is not None:
+            try:
+                await self.on_change()
+            except Exception:
+                log.warning("Inbox change callback failed", exc_info=True)
@@ -0,0 +1,59 @@
+import weakref
+
+from fastmcp import FastMCP
+from pydantic import AnyUrl
+
+
+class ResourceSubscriptions:
+    """
+    Подписки MCP-клиентов на обновления ресурсов (resources/subscribe).
+    Фоновые задачи вызывают `notify(uri)`, и подписанные сессии получают
+    notifications/resources/updated без повторного опроса.
+    """
+
+    def __init__(self):
+        self._sessions: dict[str, weakref.WeakSet] = {}
+
+    def install(self, mcp: FastMCP) -> None:
+        """Регистрирует обработчики subscribe/unsubscribe на сервере верхнего уровня."""
+        server = mcp._mcp_server
+
+        @server.subscribe_resource()
+        async def subscribe(uri: AnyUrl) -> None:
+            sessions = self._sessions.setdefault(str(uri), weakref.WeakSet())
+            sessions.add(server.request_context.session)
+
+        @server.unsubscribe_resource()
+        async def unsubscribe(uri: AnyUrl) -> None:
+            sessions = self._sessions.get(str(uri))
+            if sessions is not None:
+                sessions.discard(server.request_context.session)
+
+        # mcp объявляет subscribe=False даже при наличии обработчиков
+        get_capabilities = server.get_capabilities
+
+        def capabilities(*args, **kwargs):
+            result = get_capabilities(*args, **kwargs)
+            if result.resources is not None:
+                result.resources.subscribe = True
+            return result
+
+        server.get_capabilities = capabilities
+
+    def subscribers(self, uri: str) -> int:
+        return len(self._sessions.get(uri, ()))
+
+    async def notify(self, uri: str) -> None:
+        """Отправляет notifications/resources/updated всем подписчикам `uri`."""
+        sessions = self._sessions.get(uri)
+        if not sessions:
+            return
+        for session in list(sessions):
+            try:
+                await session.send_resource_updated(AnyUrl(uri))
+            except Exception:
+                # сессия закрыта клиентом
+                sessions.discard(session)
+
+
+subscriptions = ResourceSubscriptions()
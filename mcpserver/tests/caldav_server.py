@@ -0,0 +1,241 @@
+# tests/caldav_server.py
+"""Минимальный CalDAV-сервер на aiohttp для тестов календаря."""
+
+from datetime import (
+    datetime,
+    timedelta,
+    timezone,
+)
+
+import vobject
+from aiohttp import web
+from lxml import etree
+
+DAV = "DAV:"
+CALDAV = "urn:ietf:params:xml:ns:caldav"
+CS = "http://calendarserver.org/ns/"
+SYNC = "http://example.com/sync/"
+UTC_FORMAT = "%Y%m%dT%H%M%SZ"
+# время без часового пояса в тестовых событиях — московское
+MSK = timezone(timedelta(hours=3))
+
+
+def _utc(value: datetime) -> datetime:
+    return (value if value.tzinfo else value.replace(tzinfo=MSK)).astimezone(timezone.utc)
+PRINCIPAL = "/principals/user/"
+HOME = "/calendars/user/"
+
+
+def _element(tag: str, text: str = None, ns: str = DAV):
+    element = etree.Element(f"{{{ns}}}{tag}")
+    if text is not None:
+        element.text = text
+    return element
+
+
+def _multistatus(responses: list, sync_token: str = None) -> web.Response:
+    "responses — пары (href, свойства); свойства None — удалённый ресурс (404)"
+    root = _element("multistatus")
+    for href, props in responses:
+        response = etree.SubElement(root, f"{{{DAV}}}response")
+        response.append(_element("href", href))
+        if props is None:
+            response.append(_element("status", "HTTP/1.1 404 Not Found"))
+            continue
+        propstat = etree.SubElement(response, f"{{{DAV}}}propstat")
+        prop = etree.SubElement(propstat, f"{{{DAV}}}prop")
+        for item in props:
+            prop.append(item)
+        propstat.append(_element("status", "HTTP/1.1 200 OK"))
+    if sync_token is not None:
+        root.append(_element("sync-token", sync_token))
+    body = etree.tostring(root, xml_declaration=True, encoding="utf-8")
+    return web.Response(status=207, body=body, content_type="application/xml")
+
+
+class FakeCalDav:
+    """
+    Хранит календари как {имя: {href: (etag, ics)}} и отвечает на PROPFIND
+    обнаружения (principal, calendar-home-set, список календарей), PROPFIND
+    календаря (getctag, sync-token, getetag), условные PUT и DELETE событий
+    и отчёты sync-collection, calendar-multiget и free-busy-query. Каждое изменение увеличивает общий номер версии: он
+    же ctag и sync-token. Считает запросы по методам и TCP-соединения.
+    """
+
+    def __init__(self, calendars=("Работа",)):
+        self.calendars = {name: {} for name in calendars}
+        self.requests: dict[str, int] = {}
+        self.reports: dict[str, int] = {}
+        self.connections: set = set()
+        self.fail_next = 0
+        self.supports_sync = True
+        self.supports_freebusy = True
+        self.version = 0
+        # журнал изменений: (версия, календарь, href)
+        self.changes: list[tuple[int, str, str]] = []
+
+    def calendar_path(self, name: str) -> str:
+        return f"{HOME}{list(self.calendars).index(name)}/"
+
+    def put(self, name: str, uid: str, ics: str) -> str:
+        href = f"{self.calendar_path(name)}{uid}.ics"
+        self._changed(name, href)
+        self.calendars[name][href] = (f'"{self.version}"', ics)
+        return href
+
+    def delete(self, name: str, href: str) -> None:
+        del self.calendars[name][href]
+        self._changed(name, href)
+
+    def _changed(self, name: str, href: str) -> None:
+        self.version += 1
+        self.changes.append((self.version, name, href))
+
+    def _ctag(self, name: str) -> str:
+        versions = [version for version, cal, _ in self.changes if cal == name]
+        return str(max(versions, default=0))
+
+    def _calendar_by_path(self, path: str):
+        return next((name for name in self.calendars if self.calendar_path(name) == path), None)
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_route("*", "/{tail:.*}", self.handle)
+        return app
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests[request.method] = self.requests.get(request.method, 0) + 1
+        self.connections.add(request.transport.get_extra_info("peername"))
+        if self.fail_next:
+            self.fail_next -= 1
+            return web.Response(status=503)
+        if request.method == "PROPFIND":
+            return await self.propfind(request)
+        if request.method == "REPORT":
+            return await self.report(request)
+        if request.method == "PUT":
+            return await self.put_event(request)
+        if request.method == "DELETE":
+            return self.delete_event(request)
+        return web.Response(status=405)
+
+    def _precondition(self, request: web.Request, current) -> bool:
+        "If-None-Match: * и If-Match: etag (RFC 7232)"
+        if request.headers.get("If-None-Match") == "*" and current is not None:
+            return False
+        if_match = request.headers.get("If-Match")
+        return if_match is None or current is not None and current[0] == if_match
+
+    async def put_event(self, request: web.Request) -> web.Response:
+        folder, _, uid = request.path.rpartition("/")
+        name = self._calendar_by_path(folder + "/")
+        if name is None or not uid.endswith(".ics"):
+            return web.Response(status=409)
+        current = self.calendars[name].get(request.path)
+        if not self._precondition(request, current):
+            return web.Response(status=412)
+        self.put(name, uid[: -len(".ics")], (await request.read()).decode())
+        etag = self.calendars[name][request.path][0]
+        return web.Response(status=201 if current is None else 204, headers={"ETag": etag})
+
+    def delete_event(self, request: web.Request) -> web.Response:
+        folder, _, _ = request.path.rpartition("/")
+        name = self._calendar_by_path(folder + "/")
+        current = self.calendars[name].get(request.path) if name else None
+        if current is None:
+            return web.Response(status=404)
+        if not self._precondition(request, current):
+            return web.Response(status=412)
+        self.delete(name, request.path)
+        return web.Response(status=204)
+
+    async def propfind(self, request: web.Request) -> web.Response:
+        path = request.path
+        if path == "/":
+            href = _element("current-user-principal")
+            href.append(_element("href", PRINCIPAL))
+            return _multistatus([(path, [href])])
+        if path == PRINCIPAL:
+            home = _element("calendar-home-set", ns=CALDAV)
+            home.append(_element("href", HOME))
+            return _multistatus([(path, [home])])
+        if path == HOME:
+            responses = [(HOME, [_element("resourcetype"), _element("displayname")])]
+            for name in self.calendars:
+                resourcetype = _element("resourcetype")
+                resourcetype.append(_element("collection"))
+                resourcetype.append(_element("calendar", ns=CALDAV))
+                responses.append(
+                    (self.calendar_path(name), [resourcetype, _element("displayname", name)])
+                )
+            return _multistatus(responses)
+        name = self._calendar_by_path(path)
+        if name is None:
+            return web.Response(status=404)
+        if request.headers.get("Depth") == "0":
+            props = [_element("getctag", self._ctag(name), ns=CS)]
+            if self.supports_sync:
+                props.append(_element("sync-token", f"{SYNC}{self.version}"))
+            return _multistatus([(path, props)])
+        responses = [(path, [_element("resourcetype")])]
+        for href, (etag, _) in self.calendars[name].items():
+            responses.append((href, [_element("getetag", etag)]))
+        return _multistatus(responses)
+
+    async def report(self, request: web.Request) -> web.Response:
+        name = self._calendar_by_path(request.path)
+        if name is None:
+            return web.Response(status=404)
+        query = etree.fromstring(await request.read())
+        kind = etree.QName(query).localname
+        self.reports[kind] = self.reports.get(kind, 0) + 1
+        events = self.calendars[name]
+        if kind == "sync-collection" and self.supports_sync:
+            token = query.findtext(f"{{{DAV}}}sync-token") or ""
+            if token and not token.startswith(SYNC):
+                return web.Response(status=403)
+            since = int(token[len(SYNC) :]) if token else 0
+            hrefs = dict.fromkeys(
+                href for version, cal, href in self.changes if cal == name and version > since
+            )
+            responses = [
+                (href, [_element("getetag", events[href][0])] if href in events else None)
+                for href in hrefs
+                if token or href in events
+            ]
+            return _multistatus(responses, sync_token=f"{SYNC}{self.version}")
+        if kind == "calendar-multiget":
+            responses = []
+            for element in query.iter(f"{{{DAV}}}href"):
+                href = element.text
+                if href in events:
+                    etag, ics = events[href]
+                    data = _element("calendar-data", ics, ns=CALDAV)
+                    responses.append((href, [_element("getetag", etag), data]))
+                else:
+                    responses.append((href, None))
+            return _multistatus(responses)
+        if kind == "free-busy-query" and self.supports_freebusy:
+            return self.free_busy(events, query.find(f"{{{CALDAV}}}time-range"))
+        return web.Response(status=501)
+
+    def free_busy(self, events: dict, time_range) -> web.Response:
+        "VFREEBUSY по разовым событиям (повторения не разворачиваются)"
+        start, end = (
+            datetime.strptime(time_range.get(name), UTC_FORMAT).replace(tzinfo=timezone.utc)
+            for name in ("start", "end")
+        )
+        lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "BEGIN:VFREEBUSY"]
+        for _, ics in events.values():
+            vevent = vobject.readOne(ics).vevent
+            if getattr(vevent, "transp", None) and vevent.transp.value == "TRANSPARENT":
+                continue
+            busy_start, busy_end = (
+                _utc(vevent.dtstart.value),
+                _utc(vevent.dtend.value),
+            )
+            if busy_start < end and busy_end > start:
+                period = f"{busy_start.strftime(UTC_FORMAT)}/{busy_end.strftime(UTC_FORMAT)}"
+                lines.append(f"FREEBUSY;FBTYPE=BUSY:{period}")
+        lines += ["END:VFREEBUSY", "END:VCALENDAR", ""]
+        return web.Response(text="\r\n".join(lines), content_type="text/calendar")
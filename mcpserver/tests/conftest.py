@@ -0,0 +1,81 @@
+# tests/conftest.py
+import asyncio
+import socket
+
+import pytest
+from aiohttp import web
+from aiosmtpd.controller import Controller
+from aioimaplib.imap_testing_server import (
+    Mail,
+    MockImapServer,
+)
+
+from tests.caldav_server import FakeCalDav
+
+IMAP_USER = "user@example.com"
+
+
+class SmtpHandler:
+    """Принимает письма; адреса из refuse отклоняет 550, первые fail_data DATA — 451."""
+
+    def __init__(self, refuse=(), fail_data=0):
+        self.messages = []
+        self.refuse = set(refuse)
+        self.fail_data = fail_data
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.refuse:
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.fail_data:
+            self.fail_data -= 1
+            return "451 Try again later"
+        self.messages.append(envelope)
+        return "250 Message accepted"
+
+
+@pytest.fixture
+async def imap_server():
+    """Локальный IMAP-сервер из aioimaplib: (сервер, порт)."""
+    server = MockImapServer(loop=asyncio.get_running_loop())
+    srv = await server.run_server(host="127.0.0.1", port=0)
+    yield server, srv.sockets[0].getsockname()[1]
+    server.reset()
+    srv.close()
+    await srv.wait_closed()
+
+
+def deliver(server: MockImapServer, subject: str, content: str = "", **kwargs) -> int:
+    """Кладёт письмо во входящие тестового пользователя и возвращает его UID."""
+    mail = Mail.create([IMAP_USER], subject=subject, content=content, **kwargs)
+    return server.receive(mail, imap_user=IMAP_USER)[0]
+
+
+@pytest.fixture
+def smtp_server():
+    """Локальный SMTP-сервер aiosmtpd: (обработчик, порт)."""
+    # Controller проверяет запуск подключением к порту, поэтому 0 не подходит
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    handler = SmtpHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    yield handler, port
+    controller.stop()
+
+
+@pytest.fixture
+async def caldav_server():
+    """Локальный CalDAV-сервер: (FakeCalDav, URL)."""
+    server = FakeCalDav(calendars=("Работа", "Личное"))
+    runner = web.AppRunner(server.app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    yield server, f"http://127.0.0.1:{port}/"
+    await runner.cleanup()
@@ -0,0 +1,57 @@
+# tests/test_body_cleaner.py
+import time
+
+import pytest
+
+from benchmarks.bench_clean import (
+    build_corpus,
+    legacy_clean_email_body,
+)
+from src.core.email.cleaner import _clean_email_body
+
+GOLDEN = [
+    (
+        "Привет!\n\nОтправляю отчёт: https://drive.example.com/file?id=1&usp=sharing\n\n"
+        "Спасибо\n\n04.12.2025, 15:15, Иван <ivan@example.com> написал:\n> старый текст",
+        "Привет!\nОтправляю отчёт:\nСпасибо",
+    ),
+    (
+        "Коллеги, пересылаю.\n\n-------- Пересылаемое сообщение --------\n"
+        "From: Пётр <petr@example.com>\nКому: team@example.com\nТема: Отчёт\n"
+        "Date: 03.12.2025, 10:00\n\nТекст исходного письма",
+        "Коллеги, пересылаю.\n-------- Пересылаемое сообщение --------\n"
+        "Текст исходного письма",
+    ),
+    (
+        "Ссылка   на  трекинг:\thttps://click.example.com/c/"
+        "0f8fad5b-d9cb-469f-a165-70867728950e?u=1&f=0\n"
+        "Код 0f8fad5b-d9cb-469f-a165-70867728950e&id=42 готов",
+        "Ссылка на трекинг:\nКод готов",
+    ),
+    (
+        "Пишите на <support\n@example.com> или в чат.\n\nhello\n\n=====\n\n"
+        "Иван Петров пишет: всё ок",
+        "Пишите на или в чат.\nhello\nИван Петров пишет: всё ок",
+    ),
+    ("Ответ выше.\n\nИван Петров НАПИСАЛ: старое", "Ответ выше."),
+]
+
+
+@pytest.mark.parametrize(("body", "expected"), GOLDEN)
+def test_golden(body, expected):
+    assert _clean_email_body(body) == expected
+
+
+def test_matches_legacy_on_corpus():
+    for body in build_corpus(size=100):
+        assert _clean_email_body(body) == legacy_clean_email_body(body)
+
+
+@pytest.mark.parametrize(
+    "body",
+    ["<" * 200_000, ":<@" * 100_000, "\n" * 200_000 + "x", "1" * 200_000],
+)
+def test_linear_time_on_adversarial_input(body):
+    started = time.perf_counter()
+    _clean_email_body(body)
+    assert time.perf_counter() - started < 1.0
@@ -0,0 +1,61 @@
+# tests/test_calendar_session.py
+import asyncio
+
+import pytest
+
+from src.core.calendar.session import CalendarSession
+
+
+def _session(url, **kwargs) -> CalendarSession:
+    return CalendarSession(url, "user", "secret", default_name="Работа", **kwargs)
+
+
+async def test_concurrent_first_calls_discover_once(caldav_server):
+    server, url = caldav_server
+    session = _session(url)
+    try:
+        calendars = await asyncio.gather(*(session.calendar() for _ in range(10)))
+        personal = await session.calendar("Личное")
+        with pytest.raises(ValueError, match="Календарь 'Отпуск' не найден"):
+            await session.calendar("Отпуск")
+    finally:
+        await session.close()
+
+    assert all(cal is calendars[0] for cal in calendars)
+    assert calendars[0].name == "Работа" and personal.name == "Личное"
+    assert session.stats()["discoveries"] == 1
+    # три PROPFIND обнаружения по одному keep-alive соединению
+    assert server.requests == {"PROPFIND": 3}
+    assert len(server.connections) == 1
+
+
+async def test_unknown_default_falls_back_to_first_calendar(caldav_server):
+    server, url = caldav_server
+    session = CalendarSession(url, "user", "secret", default_name="Нет такого")
+    try:
+        assert (await session.calendar()).name == "Работа"
+    finally:
+        await session.close()
+
+
+async def test_refresh_after_ttl_and_failures(caldav_server):
+    server, url = caldav_server
+    session = _session(url, ttl=0.05, max_failures=2)
+    try:
+        await session.calendar()
+        await asyncio.sleep(0.06)
+        await session.calendar()
+        assert session.stats()["discoveries"] == 2
+        assert session.stats()["connects"] == 1
+
+        server.fail_next = 2
+        cal = await session.calendar()
+        for _ in range(2):
+            await cal.client.request(cal.url)
+        assert session.stats()["consecutive_failures"] == 2
+        await session.calendar()
+    finally:
+        await session.close()
+
+    stats = session.stats()
+    assert (stats["connects"], stats["resets"], stats["discoveries"]) == (2, 1, 3)
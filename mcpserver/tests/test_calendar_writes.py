@@ -0,0 +1,254 @@
+# tests/test_calendar_writes.py
+import json
+from datetime import (
+    date,
+    datetime,
+)
+from zoneinfo import ZoneInfo
+
+import pytest
+
+import vobject
+from fastmcp import Client
+
+import src.core.calendar as calendar_module
+from main import create_app
+from src.core.calendar import ical
+from src.core.calendar.session import CalendarSession
+from src.core.calendar.writes import (
+    event_fields,
+    merge_times,
+)
+
+SERIES = (
+    "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//other//EN\r\n"
+    "BEGIN:VEVENT\r\nUID:standup\r\nSUMMARY:Стендап\r\nSEQUENCE:3\r\n"
+    "X-APPLE-TRAVEL-ADVISORY-BEHAVIOR:AUTOMATIC\r\n"
+    "DTSTART;TZID=Europe/Moscow:20251201T100000\r\nDURATION:PT15M\r\n"
+    "RRULE:FREQ=DAILY\r\n"
+    "BEGIN:VALARM\r\nACTION:DISPLAY\r\nDESCRIPTION:Скоро\r\nTRIGGER:-PT5M\r\nEND:VALARM\r\n"
+    "END:VEVENT\r\n"
+    "BEGIN:VEVENT\r\nUID:standup\r\nSUMMARY:Стендап (перенесён)\r\n"
+    "RECURRENCE-ID;TZID=Europe/Moscow:20251202T100000\r\n"
+    "DTSTART;TZID=Europe/Moscow:20251202T160000\r\nDURATION:PT15M\r\nEND:VEVENT\r\n"
+    "END:VCALENDAR\r\n"
+)
+NOON = "2025-12-01T12:00:00"
+
+
+def test_writer_escapes_folds_and_patches_in_place():
+    description = "Повестка: бюджет, сроки; риски\nи вопросы " + "ё" * 80
+    ics = ical.serialize_event(
+        "u1",
+        {
+            "summary": "Планёрка",
+            "start": ical.parse_datetime({}, "20251201T100000"),
+            "end": ical.parse_datetime({}, "20251201T110000"),
+            "description": description,
+        },
+    )
+    assert all(len(line.encode()) <= 75 for line in ics.split("\r\n"))
+    [event] = ical.iter_components(ics)
+    assert ical.text_value(event, "DESCRIPTION") == description
+
+    patched = ical.patch_event(SERIES, {"summary": "Синк", "location": "Зал 2"})
+    master, override = ical.iter_components(patched)
+    assert ical.text_value(master, "SUMMARY") == "Синк"
+    assert ical.text_value(master, "LOCATION") == "Зал 2"
+    assert master["SEQUENCE"] == [({}, "4")]
+    # неизвестные свойства, VALARM и изменённый экземпляр не тронуты
+    assert "X-APPLE-TRAVEL-ADVISORY-BEHAVIOR" in master
+    assert "BEGIN:VALARM\r\nACTION:DISPLAY\r\nDESCRIPTION:Скоро\r\n" in patched
+    assert ical.text_value(override, "SUMMARY") == "Стендап (перенесён)"
+
+
+def test_start_only_update_keeps_duration():
+    moscow = ZoneInfo("Europe/Moscow")
+    meeting = ical.serialize_event(
+        "m1",
+        {
+            "summary": "Встреча",
+            "start": datetime(2025, 12, 12, 10, tzinfo=moscow),
+            "end": datetime(2025, 12, 12, 11, tzinfo=moscow),
+        },
+    )
+
+    def update(item: dict, ics: str) -> dict:
+        fields = merge_times(event_fields(item, moscow, partial=True), ics, moscow)
+        master, *_ = ical.iter_components(ical.patch_event(ics, fields))
+        return master
+
+    moved = update({"start": "2025-12-12T12:00:00"}, meeting)
+    assert moved["DTSTART"] == [({"TZID": "Europe/Moscow"}, "20251212T120000")]
+    assert moved["DTEND"] == [({"TZID": "Europe/Moscow"}, "20251212T130000")]
+    # серия с DURATION: конец тоже сдвигается, DURATION не остаётся рядом с DTEND
+    standup = update({"start": "2025-12-01T11:00:00"}, SERIES)
+    assert standup["DTEND"] == [({"TZID": "Europe/Moscow"}, "20251201T111500")]
+    assert "DURATION" not in standup
+
+    with pytest.raises(ValueError, match="укажите и end"):
+        update({"start": "2025-12-13"}, meeting)
+    with pytest.raises(ValueError, match="end раньше start"):
+        update({"end": "2025-12-12T09:00:00"}, meeting)
+    with pytest.raises(ValueError, match="оба датами"):
+        update({"end": "2025-12-13"}, meeting)
+
+    vacation = ical.serialize_event(
+        "v1", {"summary": "Отпуск", "start": date(2025, 12, 3), "end": date(2025, 12, 5)}
+    )
+    moved = update({"start": "2025-12-10"}, vacation)
+    assert moved["DTEND"] == [({"VALUE": "DATE"}, "20251212")]
+
+
+async def _call(client, name: str, arguments: dict) -> dict:
+    result = await client.call_tool(name, arguments)
+    return json.loads(result.content[0].text)
+
+
+async def test_batch_writes_update_store_without_resync(caldav_server, monkeypatch):
+    server, url = caldav_server
+    server.put("Работа", "standup", SERIES)
+    monkeypatch.setattr(
+        calendar_module, "_session", CalendarSession(url, "user", "secret", default_name="Работа")
+    )
+    monkeypatch.setattr(calendar_module, "_stores", {})
+
+    async with Client(create_app()) as client:
+        created = await _call(
+            client,
+            "calendar_create_calendar_events",
+            {
+                "events": [
+                    {"summary": "Ревью", "start": NOON, "end": "2025-12-01T13:00:00"},
+                    {"summary": "Отпуск", "start": "2025-12-03", "end": "2025-12-05", "uid": "vacation"},
+                    {"summary": "Дубль", "start": NOON, "end": "2025-12-01T13:00:00", "uid": "standup"},
+                    {"summary": "Без конца", "start": NOON},
+                ]
+            },
+        )
+        assert [item["status"] for item in created["results"]] == [
+            "created",
+            "created",
+            "conflict",
+            "error",
+        ]
+        review = created["results"][0]["uid"]
+        store = await calendar_module._get_event_store()
+        assert store.find(review).etag == server.calendars["Работа"][store.find(review).href][0]
+
+        updated = await _call(
+            client,
+            "calendar_update_calendar_event",
+            {
+                "events": [
+                    {"uid": "standup", "summary": "Синк", "location": "Зал 2"},
+                    {"uid": review, "start": "2025-12-01T14:00:00", "end": "2025-12-01T15:00:00"},
+                    {"uid": "missing", "summary": "?"},
+                ]
+            },
+        )
+        assert [item["status"] for item in updated["results"]] == [
+            "updated",
+            "updated",
+            "not_found",
+        ]
+
+        # событие изменено другим клиентом после синхронизации — удаление не затирает его
+        server.put("Работа", "vacation", server.calendars["Работа"][store.find("vacation").href][1])
+        deleted = await _call(
+            client, "calendar_delete_calendar_events", {"uids": [review, "vacation", "missing"]}
+        )
+        assert [item["status"] for item in deleted["results"]] == [
+            "deleted",
+            "conflict",
+            "not_found",
+        ]
+
+        listing = await _call(
+            client,
+            "calendar_list_calendar_events",
+            {"start": "2025-12-01T00:00:00", "end": "2025-12-02T00:00:00"},
+        )
+        assert [(event["summary"], event.get("location")) for event in listing["events"]] == [
+            ("Синк", "Зал 2"),
+        ]
+        # свои записи при следующей синхронизации не скачиваются заново
+        fetched = store.metrics["fetched"]
+        store.mark_stale()
+        await store.ensure_fresh()
+
+    assert store.metrics["fetched"] - fetched == 1  # только vacation, изменённый извне
+    assert store.find(review) is None
+    assert "SEQUENCE:4" in server.calendars["Работа"][store.find("standup").href][1]
+    assert server.requests["PUT"] == 5
+
+
+def test_vtimezone_matches_zoneinfo():
+    new_york = ZoneInfo("America/New_York")
+    lines = ical.vtimezone("America/New_York", 2025, 2026)
+    assert ical.vtimezone("America/New_York", 2025, 2026) is lines
+    # vobject строит часовой пояс из VTIMEZONE: смещения должны совпасть с базой
+    ics = ical.serialize_event(
+        "dst",
+        {
+            "summary": "Созвон",
+            "start": datetime(2025, 3, 9, 1, 30, tzinfo=new_york),
+            "end": datetime(2026, 11, 1, 3, 0, tzinfo=new_york),
+        },
+    )
+    assert "DTSTART;TZID=America/New_York:20250309T013000" in ics
+    vtimezone = vobject.readOne(ics).vtimezone.gettzinfo()
+    for month in range(1, 25):
+        moment = datetime(2025 + (month - 1) // 12, (month - 1) % 12 + 1, 15, 12)
+        assert vtimezone.utcoffset(moment) == moment.replace(tzinfo=new_york).utcoffset()
+
+
+async def test_user_and_request_timezones(caldav_server, monkeypatch):
+    server, url = caldav_server
+    # floating-время и события на весь день — в поясе пользователя
+    server.put(
+        "Работа",
+        "floating",
+        "BEGIN:VCALENDAR\r\nBEGIN:VEVENT\r\nUID:floating\r\nSUMMARY:Обед\r\n"
+        "DTSTART:20250601T130000\r\nDTEND:20250601T140000\r\nEND:VEVENT\r\nEND:VCALENDAR\r\n",
+    )
+    monkeypatch.setattr(calendar_module.config.cal_dav, "CALDAV_TIMEZONE", "Europe/Berlin")
+    monkeypatch.setattr(
+        calendar_module, "_session", CalendarSession(url, "user", "secret", default_name="Работа")
+    )
+    monkeypatch.setattr(calendar_module, "_stores", {})
+
+    async with Client(create_app()) as client:
+        created = await _call(
+            client,
+            "calendar_create_calendar_event",
+            {
+                "summary": "Созвон с Нью-Йорком",
+                "start": "2025-06-01T09:00:00",
+                "end": "2025-06-01T10:00:00",
+                "tz": "America/New_York",
+            },
+        )
+        listing = await _call(
+            client,
+            "calendar_list_calendar_events",
+            {"start": "2025-06-01T00:00:00", "end": "2025-06-02T00:00:00"},
+        )
+        in_auckland = await _call(
+            client,
+            "calendar_list_calendar_events",
+            {"start": "2025-06-01T00:00:00", "end": "2025-06-02T00:00:00", "tz": "Pacific/Auckland"},
+        )
+
+    store = await calendar_module._get_event_store()
+    ics = server.calendars["Работа"][store.find(created["uid"]).href][1]
+    assert "DTSTART;TZID=America/New_York:20250601T090000" in ics
+    assert "BEGIN:VTIMEZONE\r\nTZID:America/New_York\r\n" in ics
+    assert [(event["summary"], event["start"]) for event in listing["events"]] == [
+        ("Обед", "2025-06-01T13:00:00+02:00"),
+        ("Созвон с Нью-Йорком", "2025-06-01T15:00:00+02:00"),
+    ]
+    # диапазон без смещения — в поясе запроса: 1 июня в Окленде кончается в 14:00 по Берлину
+    assert [(event["summary"], event["start"]) for event in in_auckland["events"]] == [
+        ("Обед", "2025-06-01T23:00:00+12:00"),
+    ]
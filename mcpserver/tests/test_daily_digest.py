@@ -0,0 +1,116 @@
+# tests/test_daily_digest.py
+import asyncio
+import json
+import time
+
+from fastmcp import (
+    Client,
+    FastMCP,
+)
+
+from src.core.calendar.prompts import setup_prompts
+from src.core.digest import (
+    DailyDigest,
+    setup_digest,
+)
+
+DELAY = 0.2
+
+
+def _app(reads: dict, fail: set = frozenset()) -> FastMCP:
+    mcp = FastMCP("Test")
+
+    def source(uri: str, payload: dict):
+        @mcp.resource(uri)
+        async def read() -> dict:
+            reads[uri] = reads.get(uri, 0) + 1
+            await asyncio.sleep(DELAY)
+            if uri in fail:
+                raise RuntimeError("IMAP недоступен")
+            return payload
+
+    source(
+        "events://calendar/today",
+        {
+            "events": [
+                {
+                    "uid": "a",
+                    "summary": "Стендап",
+                    "description": "",
+                    "location": "",
+                    "start": "2025-12-01T10:00:00+03:00",
+                    "end": "2025-12-01T10:15:00+03:00",
+                },
+                {"uid": "b", "summary": "Отпуск", "start": "2025-12-01", "end": "2025-12-02"},
+            ]
+        },
+    )
+    source("calendar://calendar/next-hour", {"event": None})
+    source(
+        "emails://email/unread",
+        {"emails": [{"uid": "7", "from": "boss@example.com", "subject": "Отчёт", "size": 900}]},
+    )
+    return mcp
+
+
+async def test_digest_reads_sources_concurrently_and_caches():
+    reads = {}
+    mcp = _app(reads)
+    digest = DailyDigest(ttl=60)
+    setup_digest(mcp, digest)
+
+    async with Client(mcp) as client:
+        started = time.perf_counter()
+        result = await client.call_tool("daily_digest", {})
+        elapsed = time.perf_counter() - started
+        await client.read_resource("digest://daily")
+        again = await client.call_tool("daily_digest", {"fresh": True})
+
+    # три источника за время одного
+    assert elapsed < 2 * DELAY
+    first = json.loads(result.content[0].text)
+    assert first["events"][0] == {
+        "uid": "a",
+        "summary": "Стендап",
+        "start": "2025-12-01T10:00:00+03:00",
+        "end": "2025-12-01T10:15:00+03:00",
+    }
+    assert first["next_event"] is None
+    assert first["unread"] == {
+        "total": 1,
+        "emails": [{"uid": "7", "from": "boss@example.com", "subject": "Отчёт"}],
+    }
+    assert json.loads(again.content[0].text)["events"] == first["events"]
+    # второй запрос — из кеша, fresh собирает заново
+    assert set(reads.values()) == {2}
+    assert digest.stats()["hits"] == 1 and digest.stats()["builds"] == 2
+
+
+async def test_digest_survives_unavailable_source():
+    reads = {}
+    mcp = _app(reads, fail={"emails://email/unread"})
+    digest = DailyDigest(ttl=60)
+    setup_digest(mcp, digest)
+
+    async with Client(mcp) as client:
+        first = json.loads((await client.call_tool("daily_digest", {})).content[0].text)
+        await client.call_tool("daily_digest", {})
+
+    assert len(first["events"]) == 2
+    assert first["unread"] == {"total": 0, "emails": []}
+    assert "unread" in first["errors"]
+    # неполная сводка не кешируется
+    assert reads["events://calendar/today"] == 2
+
+
+async def test_plan_day_prompt_lists_todays_events():
+    mcp = _app({})
+    setup_prompts(mcp)
+
+    async with Client(mcp) as client:
+        prompt = await client.get_prompt("plan_day_from_calendar")
+
+    text = prompt.messages[0].content.text
+    assert "События сегодня (2 шт.)" in text
+    assert "- 10:00–10:15 Стендап" in text
+    assert "- весь день: Отпуск" in text
@@ -0,0 +1,55 @@
+# tests/test_email_fetch.py
+from src.core.email import utils
+from src.core.email.pool import ImapPool
+from tests.conftest import (
+    IMAP_USER,
+    deliver,
+)
+
+
+def test_uid_set_compresses_ranges():
+    assert utils._uid_set([b"3", b"1", b"2", b"7", b"9", b"10"]) == "1:3,7,9:10"
+    assert utils._uid_set(["5"]) == "5"
+
+
+def test_parse_header_fetch_single_pass():
+    lines = [
+        b"1 FETCH (UID 10 RFC822.SIZE 2048 FLAGS (\\Seen) "
+        b"BODY[HEADER.FIELDS (FROM SUBJECT DATE)] {60}",
+        bytearray(
+            b"From: a@b.c\r\nSubject: =?utf-8?q?=D0=9F=D1=80=D0=B8?=\r\n"
+            b"Date: Mon, 1 Dec 2025 10:00:00 +0300\r\n\r\n"
+        ),
+        b")",
+        b"2 FETCH (UID 11 BODY[HEADER.FIELDS (FROM SUBJECT DATE)] {17}",
+        bytearray(b"From: x@y.z\r\n\r\n"),
+        b" FLAGS () RFC822.SIZE 99)",
+    ]
+    first, second = utils._parse_header_fetch(lines)
+    assert first == {
+        "uid": "10",
+        "from": "a@b.c",
+        "subject": "При",
+        "date": "Mon, 1 Dec 2025 10:00:00 +0300",
+        "size": 2048,
+        "seen": True,
+    }
+    assert second["uid"] == "11"
+    assert second["subject"] == "(no subject)"
+    assert second["size"] == 99
+    assert second["seen"] is False
+
+
+async def test_fetch_emails_uses_single_header_fetch(imap_server, monkeypatch):
+    server, port = imap_server
+    for i in range(5):
+        deliver(server, f"Тема {i}", content="x" * 10_000, mail_from="a@b.c")
+    pool = ImapPool("127.0.0.1", port, IMAP_USER, "secret", use_ssl=False)
+    monkeypatch.setattr(utils, "_imap_pool", pool)
+    try:
+        emails = await utils._fetch_emails(["ALL"], limit=3)
+    finally:
+        await pool.close()
+    assert [e["uid"] for e in emails] == ["3", "4", "5"]
+    assert [e["subject"] for e in emails] == ["Тема 2", "Тема 3", "Тема 4"]
+    assert emails[0]["from"] == "<a@b.c>"
@@ -0,0 +1,205 @@
+# tests/test_event_store.py
+import json
+import random
+from datetime import (
+    datetime,
+    timedelta,
+    timezone,
+)
+
+from fastmcp import Client
+
+import src.core.calendar as calendar_module
+from main import create_app
+from src.core.calendar.session import CalendarSession
+from src.core.calendar.store import (
+    DEFAULT_TZ,
+    EventStore,
+    IntervalIndex,
+    _parse_event,
+)
+
+COMPLEX_ICS = (
+    "BEGIN:VCALENDAR\r\nVERSION:2.0\r\n"
+    "BEGIN:VEVENT\r\nUID:series\r\nRECURRENCE-ID:20251206T070000Z\r\n"
+    "SUMMARY:Перенос\r\nDTSTART:20251206T080000Z\r\nDTEND:20251206T090000Z\r\n"
+    "END:VEVENT\r\n"
+    "BEGIN:VEVENT\r\nUID:series\r\n"
+    "SUMMARY:Планёрка\\, ежедневная\r\n"
+    "DESCRIPTION:Повестка:\\n1. Статус\\; 2. Риски — очень длинная строка, кото\r\n"
+    " рая перенесена\r\n"
+    'ORGANIZER;CN="Иванов: Иван":mailto:ivan@example.com\r\n'
+    "DTSTART;TZID=Europe/Berlin:20251205T090000\r\nDURATION:PT1H30M\r\n"
+    "BEGIN:VALARM\r\nACTION:DISPLAY\r\nDESCRIPTION:Напоминание\r\nEND:VALARM\r\n"
+    "LOCATION:Переговорная 3\r\nEND:VEVENT\r\nEND:VCALENDAR\r\n"
+)
+
+
+def _ics(uid: str, summary: str, start: datetime, hours: float = 1) -> str:
+    end = start + timedelta(hours=hours)
+    return (
+        "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//test//EN\r\nBEGIN:VEVENT\r\n"
+        f"UID:{uid}\r\nSUMMARY:{summary}\r\n"
+        f"DTSTART:{start.strftime('%Y%m%dT%H%M%S')}\r\n"
+        f"DTEND:{end.strftime('%Y%m%dT%H%M%S')}\r\n"
+        "END:VEVENT\r\nEND:VCALENDAR\r\n"
+    )
+
+
+def _put(server, uid: str, summary: str, start: datetime, hours: float = 1) -> str:
+    return server.put("Работа", uid, _ics(uid, summary, start, hours))
+
+
+async def _store(url) -> tuple[CalendarSession, EventStore]:
+    session = CalendarSession(url, "user", "secret", default_name="Работа")
+    return session, EventStore(await session.calendar(), max_staleness=60)
+
+
+async def test_incremental_sync(caldav_server):
+    server, url = caldav_server
+    day = datetime(2025, 12, 5, 9, 0)
+    hrefs = [_put(server, f"ev{i}", f"Встреча {i}", day + timedelta(hours=i)) for i in range(3)]
+    start = day.replace(tzinfo=DEFAULT_TZ)
+    session, store = await _store(url)
+    try:
+        events = await store.events_between(start, start + timedelta(days=1))
+        assert [event.summary for event in events] == ["Встреча 0", "Встреча 1", "Встреча 2"]
+
+        # без изменений на сервере хватает одного PROPFIND с ctag
+        store.mark_stale()
+        await store.ensure_fresh()
+        assert store.metrics["ctag_hits"] == 1
+        assert server.reports == {"sync-collection": 1, "calendar-multiget": 1}
+
+        _put(server, "ev1", "Перенесена", day + timedelta(hours=5))
+        server.delete("Работа", hrefs[2])
+        _put(server, "ev3", "Новая", day + timedelta(hours=7))
+        store.mark_stale()
+        events = await store.events_between(start, start + timedelta(days=1))
+    finally:
+        await session.close()
+
+    assert [event.summary for event in events] == ["Встреча 0", "Перенесена", "Новая"]
+    # скачаны только изменённые события
+    assert store.metrics["fetched"] == 5
+    assert store.metrics["deleted"] == 1
+    assert server.reports == {"sync-collection": 2, "calendar-multiget": 2}
+
+
+async def test_etag_fallback_without_sync_collection(caldav_server):
+    server, url = caldav_server
+    server.supports_sync = False
+    day = datetime(2025, 12, 5, 9, 0)
+    hrefs = [_put(server, f"ev{i}", f"Встреча {i}", day + timedelta(hours=i)) for i in range(3)]
+    session, store = await _store(url)
+    try:
+        await store.sync()
+        server.delete("Работа", hrefs[0])
+        _put(server, "ev1", "Перенесена", day + timedelta(hours=1))
+        await store.sync()
+    finally:
+        await session.close()
+
+    assert store.supports_sync is False
+    assert sorted(event.summary for event in store._events.values()) == ["Встреча 2", "Перенесена"]
+    assert store.metrics["fetched"] == 4
+    assert store.metrics["etag_scans"] == 2
+
+
+def test_line_parser():
+    event = _parse_event("/e.ics", '"1"', COMPLEX_ICS)
+    assert event.summary == "Планёрка, ежедневная"
+    assert event.description == (
+        "Повестка:\n1. Статус; 2. Риски — очень длинная строка, которая перенесена"
+    )
+    assert event.organizer == "mailto:ivan@example.com"
+    assert event.location == "Переговорная 3"
+    # 09:00 по Берлину зимой — 08:00 UTC
+    assert event.start == int(datetime(2025, 12, 5, 8, 0, tzinfo=timezone.utc).timestamp())
+    assert event.end - event.start == 90 * 60
+
+    all_day = _parse_event(
+        "/d.ics",
+        None,
+        "BEGIN:VCALENDAR\nBEGIN:VEVENT\nUID:d\nDTSTART;VALUE=DATE:20251205\n"
+        "END:VEVENT\nEND:VCALENDAR",
+    )
+    assert all_day.all_day and all_day.end - all_day.start == 86400
+    assert all_day.to_dict()["start"] == "2025-12-05"
+    todo = "BEGIN:VCALENDAR\nBEGIN:VTODO\nEND:VTODO\nEND:VCALENDAR"
+    assert _parse_event("/t.ics", None, todo) is None
+
+
+async def test_listing_is_sorted_and_paginated(caldav_server):
+    server, url = caldav_server
+    day = datetime(2025, 12, 1, 0, 0)
+    offsets = list(range(25))
+    random.Random(3).shuffle(offsets)
+    for i in offsets:
+        _put(server, f"ev{i:02d}", f"Событие {i}", day + timedelta(hours=5 * i))
+    start = day.replace(tzinfo=DEFAULT_TZ)
+    session, store = await _store(url)
+    try:
+        pages, cursor = [], None
+        while True:
+            events, cursor = await store.events_page(start, start + timedelta(days=30), 10, cursor)
+            pages.append([event.uid for event in events])
+            if cursor is None:
+                break
+    finally:
+        await session.close()
+
+    assert [len(page) for page in pages] == [10, 10, 5]
+    assert sum(pages, []) == [f"ev{i:02d}" for i in range(25)]
+
+
+def test_interval_index_matches_linear_scan():
+    rng = random.Random(7)
+    index = IntervalIndex()
+    spans = {}
+    for i in range(2000):
+        start = rng.randrange(0, 1_000_000)
+        # изредка — многодневные события
+        length = rng.choice([0, 900, 3600, 7200, 5 * 86400])
+        spans[f"e{i}"] = (start, start + length)
+    index.rebuild(spans)
+    for i in range(0, 2000, 3):
+        index.remove(f"e{i}")
+        del spans[f"e{i}"]
+    spans["late"] = (500_000, 500_000 + 3 * 86400)
+    index.add("late", *spans["late"])
+
+    for _ in range(200):
+        a = rng.randrange(0, 1_000_000)
+        b = a + rng.choice([3600, 86400, 7 * 86400])
+        found = list(index.overlapping(a, b))
+        expected = sorted(
+            (start, end, key)
+            for key, (start, end) in spans.items()
+            if start < b and (end > a or start == end >= a)
+        )
+        assert found == expected
+
+
+async def test_endpoints_served_from_store(caldav_server, monkeypatch):
+    server, url = caldav_server
+    now = datetime.now(DEFAULT_TZ).replace(tzinfo=None, microsecond=0)
+    _put(server, "soon", "Скоро", now + timedelta(minutes=30))
+    _put(server, "later", "Позже", now + timedelta(hours=3))
+    session = CalendarSession(url, "user", "secret", default_name="Работа")
+    monkeypatch.setattr(calendar_module, "_session", session)
+    monkeypatch.setattr(calendar_module, "_stores", {})
+
+    async with Client(create_app()) as client:
+        result = await client.call_tool("calendar_list_calendar_events", {"limit": 1})
+        events = json.loads(result.content[0].text)["events"]
+        assert [event["summary"] for event in events] == ["Скоро"]
+
+        resource = await client.read_resource("calendar://calendar/next-hour")
+        assert json.loads(resource[0].text)["event"]["uid"] == "soon"
+
+        resource = await client.read_resource("calendar://calendar/store")
+        stats = json.loads(resource[0].text)["store"]
+        assert (stats["syncs"], stats["events"]) == (1, 2)
+
+    assert server.reports == {"sync-collection": 1, "calendar-multiget": 1}
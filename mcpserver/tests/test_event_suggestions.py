@@ -0,0 +1,168 @@
+# tests/test_event_suggestions.py
+import asyncio
+import json
+import socket
+
+import pytest
+import uvicorn
+from fastmcp import Client
+
+import src.core.email as email_module
+from main import create_app
+from src.core.email import utils
+from src.core.email.cache import MessageCache
+from src.core.email.pool import ImapPool
+from src.core.email.suggestions import EventSuggester
+from tests.conftest import (
+    IMAP_USER,
+    deliver,
+)
+
+EMAIL = {"from": "a@example.com", "subject": "Созвон", "body": "Созвонимся в 11:00?"}
+
+
+async def test_suggester_deduplicates_and_limits_concurrency():
+    suggester = EventSuggester(concurrency=2)
+    running, peak, calls = 0, 0, []
+
+    async def sample(email):
+        nonlocal running, peak
+        calls.append(email["subject"])
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return "NO_EVENT" if email["subject"] == "Рассылка" else f"Задача: {email['subject']}"
+
+    emails = {str(i): {**EMAIL, "subject": f"Тема {i}"} for i in range(5)}
+    emails["5"] = {**EMAIL, "subject": "Рассылка"}
+    for uid, email in emails.items():
+        assert suggester.submit(uid, email, sample)["status"] == "pending"
+    # то же письмо по тому же и по другому UID не сэмплируется повторно
+    suggester.submit("0", emails["0"], sample)
+    suggester.submit("100", emails["0"], sample)
+    await asyncio.sleep(0.1)
+
+    assert len(calls) == 6 and peak == 2
+    assert suggester.get("100") == suggester.get("0") | {"uid": "100"}
+    assert suggester.get("0")["suggestion"] == "Задача: Тема 0"
+    assert suggester.get("5")["suggestion"] is None
+    assert suggester.submit("7", emails["1"], sample)["status"] == "done"
+    assert len(calls) == 6
+    assert suggester.stats()["deduplicated"] == 2
+
+
+async def test_suggester_retries_after_error():
+    suggester = EventSuggester()
+    answers = [RuntimeError("sampling не поддерживается"), "Ответить"]
+
+    async def sample(email):
+        answer = answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    suggester.submit("1", EMAIL, sample)
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert suggester.get("1")["status"] == "error"
+
+    suggester.submit("1", EMAIL, sample)
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert suggester.get("1")["suggestion"] == "Ответить"
+
+
+@pytest.fixture
+async def mcp_client(imap_server, monkeypatch):
+    """MCP-клиент с локальным IMAP и обработчиком sampling."""
+    server, port = imap_server
+    pool = ImapPool("127.0.0.1", port, IMAP_USER, "secret", use_ssl=False)
+    monkeypatch.setattr(utils, "_imap_pool", pool)
+    monkeypatch.setattr(email_module, "_message_cache", MessageCache())
+    monkeypatch.setattr(email_module, "_event_suggester", EventSuggester())
+    prompts = []
+
+    async def sampling_handler(messages, params, context):
+        prompts.append(messages[0].content.text)
+        await asyncio.sleep(0.05)
+        return "Ответить Алексею по отчёту"
+
+    async with Client(create_app(), sampling_handler=sampling_handler) as client:
+        yield server, client, prompts
+    await pool.close()
+
+
+async def test_get_email_does_not_wait_for_sampling(mcp_client):
+    server, client, prompts = mcp_client
+    uid = str(deliver(server, "Отчёт", content="Пришлите отчёт до пятницы"))
+
+    result = await asyncio.wait_for(client.call_tool("email_get_email", {"uid": uid}), 5)
+    email = json.loads(result.content[0].text)
+    assert email["subject"] == "Отчёт"
+    assert email["event_suggestion"]["status"] == "pending"
+
+    # повторное чтение не ставит вторую задачу
+    await client.call_tool("email_get_email", {"uid": uid})
+    for _ in range(50):
+        result = await client.call_tool("email_get_event_suggestions", {"uids": [uid]})
+        suggestion = json.loads(result.content[0].text)["suggestions"][0]
+        if suggestion["status"] != "pending":
+            break
+        await asyncio.sleep(0.02)
+
+    assert suggestion["suggestion"] == "Ответить Алексею по отчёту"
+    # промпт взят из смонтированного модуля календаря
+    assert len(prompts) == 1 and "Пришлите отчёт до пятницы" in prompts[0]
+    assert "to-do" in prompts[0]
+
+    result = await client.call_tool("email_get_email", {"uid": uid, "suggest_event": False})
+    assert "event_suggestion" not in json.loads(result.content[0].text)
+
+
+async def test_get_email_samples_in_background_over_http(imap_server, monkeypatch):
+    """Ответ на запрос уже отправлен, а sampling по письму доходит до клиента."""
+    server, port = imap_server
+    pool = ImapPool("127.0.0.1", port, IMAP_USER, "secret", use_ssl=False)
+    monkeypatch.setattr(utils, "_imap_pool", pool)
+    monkeypatch.setattr(email_module, "_message_cache", MessageCache())
+    monkeypatch.setattr(email_module, "_event_suggester", EventSuggester())
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        http_port = sock.getsockname()[1]
+    app = create_app().http_app(path="/mcp")
+    http = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=http_port, log_level="error"))
+    serving = asyncio.create_task(http.serve())
+    while not http.started:
+        await asyncio.sleep(0.01)
+    logs = []
+
+    async def sampling_handler(messages, params, context):
+        return "Ответить Алексею по отчёту"
+
+    async def log_handler(message):
+        logs.append(message.data["msg"])
+
+    uid = str(deliver(server, "Отчёт", content="Пришлите отчёт до пятницы"))
+    try:
+        async with Client(
+            f"http://127.0.0.1:{http_port}/mcp",
+            sampling_handler=sampling_handler,
+            log_handler=log_handler,
+        ) as client:
+            await client.call_tool("email_get_email", {"uid": uid})
+            for _ in range(100):
+                result = await client.call_tool("email_get_event_suggestions", {"uids": [uid]})
+                suggestion = json.loads(result.content[0].text)["suggestions"][0]
+                if suggestion["status"] != "pending":
+                    break
+                await asyncio.sleep(0.05)
+            await asyncio.sleep(0.1)
+    finally:
+        http.should_exit = True
+        await serving
+        await pool.close()
+
+    assert suggestion["status"] == "done"
+    assert suggestion["suggestion"] == "Ответить Алексею по отчёту"
+    assert any("Ответить Алексею" in message for message in logs)
@@ -0,0 +1,112 @@
+# tests/test_free_slots.py
+import json
+import random
+
+from fastmcp import Client
+
+import src.core.calendar as calendar_module
+from main import create_app
+from src.core.calendar.freebusy import (
+    BusyIndex,
+    merge_intervals,
+)
+from src.core.calendar.session import CalendarSession
+
+
+def _ics(uid: str, start: str, end: str, extra: str = "") -> str:
+    return (
+        "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nBEGIN:VEVENT\r\n"
+        f"UID:{uid}\r\nSUMMARY:{uid}\r\nDTSTART:{start}\r\nDTEND:{end}\r\n{extra}"
+        "END:VEVENT\r\nEND:VCALENDAR\r\n"
+    )
+
+
+def _fill(server) -> None:
+    # понедельник 1 декабря 2025, время московское
+    server.put("Работа", "a", _ics("a", "20251201T100000", "20251201T110000"))
+    server.put("Работа", "b", _ics("b", "20251201T103000", "20251201T120000"))
+    server.put("Работа", "c", _ics("c", "20251201T150000", "20251201T160000"))
+    focus = _ics("focus", "20251201T120000", "20251201T140000", "TRANSP:TRANSPARENT\r\n")
+    server.put("Работа", "focus", focus)
+
+
+async def _slots(client, **arguments) -> dict:
+    arguments = {
+        "duration": 60,
+        "start": "2025-12-01T00:00:00",
+        "end": "2025-12-03T00:00:00",
+        **arguments,
+    }
+    result = await client.call_tool("calendar_find_free_slots", arguments)
+    return json.loads(result.content[0].text)
+
+
+def test_busy_index_incremental_add_matches_merge():
+    rng = random.Random(5)
+    intervals = []
+    index = BusyIndex()
+    for _ in range(500):
+        start = rng.randrange(0, 100_000)
+        interval = (start, start + rng.randrange(1, 2_000))
+        intervals.append(interval)
+        index.add(*interval)
+    assert index.busy(0, 200_000) == merge_intervals(sorted(intervals))
+
+
+async def test_local_free_slots_with_series(caldav_server, monkeypatch):
+    server, url = caldav_server
+    server.supports_freebusy = False
+    _fill(server)
+    server.put(
+        "Работа",
+        "standup",
+        _ics("standup", "20251201T090000", "20251201T091500", "RRULE:FREQ=DAILY\r\n"),
+    )
+    monkeypatch.setattr(
+        calendar_module, "_session", CalendarSession(url, "user", "secret", default_name="Работа")
+    )
+    monkeypatch.setattr(calendar_module, "_stores", {})
+
+    async with Client(create_app()) as client:
+        result = await _slots(client)
+
+    assert result["source"] == "local"
+    assert [(slot["start"], slot["end"]) for slot in result["slots"]] == [
+        ("2025-12-01T12:00:00+03:00", "2025-12-01T15:00:00+03:00"),
+        ("2025-12-01T16:00:00+03:00", "2025-12-01T18:00:00+03:00"),
+        ("2025-12-02T09:15:00+03:00", "2025-12-02T18:00:00+03:00"),
+    ]
+
+
+async def test_server_free_busy_updated_on_create(caldav_server, monkeypatch):
+    server, url = caldav_server
+    _fill(server)
+    monkeypatch.setattr(
+        calendar_module, "_session", CalendarSession(url, "user", "secret", default_name="Работа")
+    )
+    monkeypatch.setattr(calendar_module, "_stores", {})
+
+    async with Client(create_app()) as client:
+        before = await _slots(client, tz="Europe/Berlin", working_hours="Mon 08:00-17:00")
+        await client.call_tool(
+            "calendar_create_calendar_event",
+            {"summary": "Новая", "start": "2025-12-01T16:00:00", "end": "2025-12-01T17:00:00"},
+        )
+        store = await calendar_module._get_event_store()
+        # своя запись после синхронизации не сбрасывает ответ free-busy-query
+        store.mark_stale()
+        after = await _slots(client, tz="Europe/Berlin", working_hours="Mon 08:00-17:00")
+
+    assert before["source"] == after["source"] == "server"
+    # занято 10:00–12:00 и 15:00–16:00 по Москве = 08:00–10:00 и 13:00–14:00 по Берлину
+    assert [slot["start"] for slot in before["slots"]] == [
+        "2025-12-01T10:00:00+01:00",
+        "2025-12-01T14:00:00+01:00",
+    ]
+    # новая встреча 16:00–17:00 по Москве
+    assert [slot["start"] for slot in after["slots"]] == [
+        "2025-12-01T10:00:00+01:00",
+        "2025-12-01T15:00:00+01:00",
+    ]
+    assert server.reports["free-busy-query"] == 1
+    assert store.stats()["freebusy_queries"] == 1
@@ -0,0 +1,78 @@
+# tests/test_get_emails.py
+import json
+
+import pytest
+from fastmcp import Client
+
+import src.core.email as email_module
+from main import create_app
+from src.core.email import utils
+from src.core.email.cache import MessageCache
+from src.core.email.pool import ImapPool
+from tests.conftest import (
+    IMAP_USER,
+    deliver,
+)
+
+
+@pytest.fixture
+async def mcp_client(imap_server, monkeypatch):
+    """MCP-клиент, у которого почта смотрит в локальный IMAP-сервер."""
+    server, port = imap_server
+    pool = ImapPool("127.0.0.1", port, IMAP_USER, "secret", use_ssl=False)
+    monkeypatch.setattr(utils, "_imap_pool", pool)
+    monkeypatch.setattr(email_module, "_message_cache", MessageCache())
+    async with Client(create_app()) as client:
+        yield server, client
+    await pool.close()
+
+
+async def test_get_emails_returns_items_and_per_item_errors(mcp_client):
+    server, client = mcp_client
+    first = deliver(server, "Отчёт", content="Текст отчёта", mail_from="alexey@example.com")
+    second = deliver(server, "План", content="План на неделю", mail_from="alexey@example.com")
+    uids = [str(second), "abc", str(first)]
+
+    result = await client.call_tool("email_get_emails", {"uids": uids})
+    emails = json.loads(result.content[0].text)["emails"]
+
+    assert [e["uid"] for e in emails] == uids
+    assert [e.get("subject") for e in emails] == ["План", None, "Отчёт"]
+    assert emails[2]["body"] == "Текст отчёта"
+    assert "Некорректный UID" in emails[1]["error"]
+
+    # тестовый сервер не понимает наборы UID через запятую, поэтому отдельно
+    result = await client.call_tool("email_get_emails", {"uids": ["999"]})
+    assert "не найдено" in json.loads(result.content[0].text)["emails"][0]["error"]
+
+    # повторный запрос обслуживается из кеша
+    await client.call_tool("email_get_emails", {"uids": [str(first), str(second)]})
+    assert email_module._message_cache.stats()["hits"] == 2
+
+
+async def test_reading_emails_keeps_them_unread(mcp_client):
+    server, client = mcp_client
+    uid = deliver(server, "Счёт", content="Ваш счёт", mail_from="billing@bank.ru")
+
+    await client.call_tool("email_get_emails", {"uids": [str(uid)]})
+
+    [message] = server._server_state.get_mailbox_messages(IMAP_USER, "INBOX")
+    assert "\\Seen" not in message.flags
+
+
+async def test_get_emails_reads_cache_entries_without_date(mcp_client):
+    server, client = mcp_client
+    uid = deliver(server, "Отчёт", content="Текст отчёта", mail_from="alexey@example.com")
+    await client.call_tool("email_get_email", {"uid": str(uid), "suggest_event": False})
+
+    # запись в формате кеша get_email до появления поля date
+    cache = email_module._message_cache
+    uidvalidity = cache._uidvalidity["INBOX"]
+    old = {"from": "alexey@example.com", "subject": "Отчёт", "body": "Текст отчёта"}
+    cache.put("INBOX", uidvalidity, str(uid), old)
+
+    result = await client.call_tool("email_get_emails", {"uids": [str(uid)]})
+    [email] = json.loads(result.content[0].text)["emails"]
+
+    assert email["subject"] == "Отчёт"
+    assert email["date"] == ""
@@ -0,0 +1,67 @@
+# tests/test_imap_pool.py
+import asyncio
+
+from src.core.email.pool import ImapPool
+from tests.conftest import (
+    IMAP_USER,
+    deliver,
+)
+
+
+def make_pool(port: int, **kwargs) -> ImapPool:
+    return ImapPool("127.0.0.1", port, IMAP_USER, "secret", use_ssl=False, **kwargs)
+
+
+async def test_pool_reuses_authenticated_session(imap_server):
+    server, port = imap_server
+    deliver(server, "hello")
+    pool = make_pool(port)
+    try:
+        for _ in range(3):
+            async with pool.session("INBOX") as session:
+                _, data = await session.client.search("ALL")
+                assert data[0] == b"1"
+        stats = pool.stats()
+        assert stats["checkouts"] == 3
+        assert stats["connects"] == 1
+        assert stats["selects"] == 1
+        assert stats["idle"] == 1
+        assert session.mailbox.exists == 1
+        assert session.mailbox.uidnext == 2
+    finally:
+        await pool.close()
+
+
+async def test_pool_is_bounded(imap_server):
+    _, port = imap_server
+    pool = make_pool(port, size=2)
+
+    async def hold():
+        async with pool.session() as session:
+            await asyncio.sleep(0.05)
+            await session.client.noop()
+
+    try:
+        await asyncio.gather(*(hold() for _ in range(5)))
+        stats = pool.stats()
+        assert stats["connects"] == 2
+        assert stats["waits"] >= 1
+        assert stats["in_use"] == 0
+    finally:
+        await pool.close()
+
+
+async def test_pool_reconnects_stale_session(imap_server):
+    _, port = imap_server
+    pool = make_pool(port, noop_interval=0.0)
+    try:
+        async with pool.session() as session:
+            session.client.protocol.transport.close()
+        async with pool.session() as session:
+            response = await session.client.noop()
+            assert response.result == "OK"
+        stats = pool.stats()
+        assert stats["connects"] == 2
+        assert stats["reconnects"] == 1
+    finally:
+        await pool.close()
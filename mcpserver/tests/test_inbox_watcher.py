@@ -0,0 +1,76 @@
+# tests/test_inbox_watcher.py
+import asyncio
+
+from fastmcp import (
+    Client,
+    FastMCP,
+)
+
+from src.core.email.pool import ImapPool
+from src.core.email.watcher import InboxWatcher
+from src.core.subscriptions import ResourceSubscriptions
+from tests.conftest import (
+    IMAP_USER,
+    deliver,
+)
+
+
+async def wait_until(predicate, timeout: float = 5.0):
+    async with asyncio.timeout(timeout):
+        while not predicate():
+            await asyncio.sleep(0.01)
+
+
+async def test_watcher_keeps_snapshot_warm_via_idle(imap_server):
+    server, port = imap_server
+    deliver(server, "Первое")
+    changes = []
+
+    async def on_change():
+        changes.append(len(watcher.snapshot["emails"]))
+
+    pool = ImapPool("127.0.0.1", port, IMAP_USER, "secret", size=1, use_ssl=False)
+    # тестовый сервер не поддерживает UNSEEN, поэтому смотрим на все письма
+    watcher = InboxWatcher(pool, criteria="ALL", limit=2, on_change=on_change)
+    task = asyncio.create_task(watcher.run())
+    try:
+        await wait_until(lambda: watcher.snapshot is not None)
+        assert [e["subject"] for e in watcher.snapshot["emails"]] == ["Первое"]
+
+        await wait_until(lambda: pool.stats()["in_use"] == 1)
+        await asyncio.sleep(0.05)
+        deliver(server, "Второе")
+        deliver(server, "Третье")
+        await wait_until(lambda: watcher.snapshot["total"] == 3)
+        subjects = [e["subject"] for e in watcher.snapshot["emails"]]
+        assert subjects == ["Второе", "Третье"]
+        assert changes[0] == 1
+        assert pool.stats()["connects"] == 1
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await pool.close()
+
+
+async def test_subscribed_clients_get_resource_updates():
+    mcp = FastMCP("Test")
+
+    @mcp.resource("emails://unread")
+    async def unread() -> dict:
+        return {"emails": []}
+
+    subscriptions = ResourceSubscriptions()
+    subscriptions.install(mcp)
+    updates = []
+
+    async def message_handler(message):
+        if getattr(message, "root", None) is not None:
+            updates.append(str(message.root.params.uri))
+
+    async with Client(mcp, message_handler=message_handler) as client:
+        assert client.initialize_result.capabilities.resources.subscribe
+        await client.session.subscribe_resource("emails://unread")
+        assert subscriptions.subscribers("emails://unread") == 1
+        await subscriptions.notify("emails://unread")
+        await wait_until(lambda: updates)
+    assert updates == ["emails://unread"]
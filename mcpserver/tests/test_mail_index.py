@@ -0,0 +1,73 @@
+# tests/test_mail_index.py
+import pytest
+
+from src.core.email.index import MailIndex
+from src.core.email.pool import ImapPool
+from tests.conftest import (
+    IMAP_USER,
+    deliver,
+)
+
+
+@pytest.fixture
+async def synced(imap_server):
+    server, port = imap_server
+    deliver(server, "Отчёт по проекту Alpha", "Прошу прислать отчёт до пятницы", mail_from="alexey@corp.ru")
+    deliver(server, "Обед", "Пойдём обедать в час?", mail_from="maria@corp.ru")
+    deliver(server, "Счёт", "Ваш счёт за декабрь", mail_from="billing@bank.ru")
+    pool = ImapPool("127.0.0.1", port, IMAP_USER, "secret", use_ssl=False)
+    index = MailIndex(":memory:", stale_after=60.0, body_bytes=0)
+    yield server, pool, index
+    await pool.close()
+    index.close()
+
+
+async def test_full_sync_and_local_search(synced):
+    _, pool, index = synced
+    stats = await index.sync(pool)
+    assert stats == {"added": 3, "updated": 0, "removed": 0, "total": 3}
+    assert not index.is_stale()
+
+    by_sender = index.search_by_sender("CORP.RU", limit=10)
+    assert [e["subject"] for e in by_sender] == ["Отчёт по проекту Alpha", "Обед"]
+
+    found = index.search("отчёт пятниц")
+    assert [e["uid"] for e in found] == ["1"]
+    assert "пятницы" in found[0]["snippet"]
+    assert index.search("") == []
+
+
+async def test_incremental_sync(synced):
+    server, pool, index = synced
+    await index.sync(pool)
+
+    messages = server._server_state.get_mailbox_messages(IMAP_USER, "INBOX")
+    messages[0].flags.append("\\Seen")
+    server._server_state.remove(messages[1], IMAP_USER, "INBOX")
+    deliver(server, "Новое", "Свежее письмо", mail_from="alexey@corp.ru")
+
+    stats = await index.sync(pool)
+    assert stats == {"added": 1, "updated": 1, "removed": 1, "total": 3}
+    emails = index.search_by_sender("alexey", limit=10)
+    assert [(e["uid"], e["seen"]) for e in emails] == [("1", True), ("4", False)]
+
+
+async def test_ensure_fresh_skips_recent_sync(synced):
+    _, pool, index = synced
+    await index.ensure_fresh(pool)
+    checkouts = pool.stats()["checkouts"]
+    await index.ensure_fresh(pool)
+    assert pool.stats()["checkouts"] == checkouts
+
+
+async def test_refetched_message_replaces_search_text(synced):
+    _, pool, index = synced
+    await index.sync(pool)
+
+    # повторная загрузка того же UID (например, после прерванной синхронизации)
+    index._store_messages(
+        [("INBOX", 1, "alexey@corp.ru", "alexey@corp.ru", "Отчёт", None, None, 10, "", "Новый текст")]
+    )
+    assert index.search("пятницы") == []
+    assert [e["uid"] for e in index.search("новый текст")] == ["1"]
+    assert len(index.search_by_sender("corp.ru", limit=10)) == 2
@@ -16,7 +16,9 @@ async def test_server_has_tools(mcp_client):
     tools = await mcp_client.list_tools()
     names = {t.name for t in tools}
     assert "email_send_email" in names
+    assert "email_search_emails" in names
     assert "calendar_list_calendar_events" in names
+    assert "daily_digest" in names
 
 
 async def test_server_has_prompts(mcp_client):
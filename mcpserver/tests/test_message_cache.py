@@ -0,0 +1,62 @@
+# tests/test_message_cache.py
+import json
+
+from src.core.email.cache import MessageCache
+
+
+def _message(n: int, size: int = 100) -> dict:
+    return {"from": f"user{n}@example.com", "subject": f"Тема {n}", "body": "x" * size}
+
+
+def test_lru_evicts_by_bytes_and_counts_hits():
+    size = len(json.dumps(_message(1), ensure_ascii=False).encode())
+    cache = MessageCache(max_bytes=3 * size)
+    for uid in range(1, 4):
+        cache.put("INBOX", 1, str(uid), _message(uid))
+    assert cache.get("INBOX", 1, "1") is not None  # 1 становится самым свежим
+    cache.put("INBOX", 1, "4", _message(4))
+
+    assert cache.get("INBOX", 1, "2") is None
+    assert cache.get("INBOX", 1, "1")["subject"] == "Тема 1"
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["evictions"] == 1
+    assert stats["bytes"] == 3 * size
+
+
+def test_uidvalidity_change_drops_mailbox_and_disk_tier(tmp_path):
+    size = len(json.dumps(_message(1), ensure_ascii=False).encode())
+    cache = MessageCache(max_bytes=size, disk_path=str(tmp_path / "cache.db"))
+    cache.put("INBOX", 1, "1", _message(1))
+    cache.put("INBOX", 1, "2", _message(2))  # "1" вытеснен из памяти, но остался на диске
+
+    assert cache.get("INBOX", 1, "1")["from"] == "user1@example.com"
+    assert cache.stats()["disk_hits"] == 1
+
+    assert cache.get("INBOX", 2, "1") is None
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["disk_bytes"] == 0
+    cache.close()
+
+
+def test_disk_tier_tracks_its_size_across_replace_trim_and_reopen(tmp_path):
+    path = str(tmp_path / "cache.db")
+    size = len(json.dumps(_message(1), ensure_ascii=False).encode())
+    cache = MessageCache(max_bytes=size, disk_path=path, disk_max_bytes=3 * size)
+    for uid in range(1, 4):
+        cache.put("INBOX", 1, str(uid), _message(uid))
+    cache.put("INBOX", 1, "3", _message(3))  # замена не удваивает объём
+    assert cache.stats()["disk_bytes"] == 3 * size
+
+    cache.put("INBOX", 1, "4", _message(4))  # самое давнее письмо уходит с диска
+    assert cache.stats()["disk_bytes"] == 3 * size
+    assert cache.get("INBOX", 1, "1") is None
+    cache.put("Sent", 1, "1", _message(1))
+    cache.invalidate("INBOX")
+    assert cache.stats()["disk_bytes"] == size
+    cache.close()
+
+    reopened = MessageCache(disk_path=path)
+    assert reopened.stats()["disk_bytes"] == size
+    reopened.close()
@@ -0,0 +1,114 @@
+# tests/test_mime.py
+import base64
+import quopri
+
+from aioimaplib import Response
+
+from src.core.email import utils
+from src.core.email.mime import (
+    SectionDecoder,
+    _find_text_part,
+    _parse_bodystructure,
+)
+from src.core.email.pool import ImapPool
+from tests.conftest import (
+    IMAP_USER,
+    deliver,
+)
+
+HEADERS = bytearray(
+    b"From: =?utf-8?b?0JDQu9C10LrRgdC10Lk=?= <alexey@example.com>\r\n"
+    b"Subject: Report\r\nDate: Mon, 1 Dec 2025 10:00:00 +0300\r\n\r\n"
+)
+
+# multipart/mixed: alternative (plain в koi8-r + html) и PDF-вложение на 5 МБ
+MIXED = (
+    b'1 FETCH (UID 7 BODYSTRUCTURE ((("TEXT" "PLAIN" ("CHARSET" "koi8-r") NIL NIL'
+    b' "BASE64" 2400 30 NIL NIL NIL)("TEXT" "HTML" ("CHARSET" "utf-8") NIL NIL'
+    b' "QUOTED-PRINTABLE" 120 3 NIL NIL NIL) "ALTERNATIVE" ("BOUNDARY" "b2") NIL NIL)'
+    b'("APPLICATION" "PDF" ("NAME" "r.pdf") NIL NIL "BASE64" 5000000 NIL'
+    b' ("ATTACHMENT" ("FILENAME" "r.pdf")) NIL) "MIXED" ("BOUNDARY" "b1") NIL NIL)'
+    b" BODY[HEADER.FIELDS (FROM SUBJECT DATE)] {%d}" % len(HEADERS)
+)
+
+
+class FakeImapClient:
+    """Отдаёт заранее записанные ответы на UID FETCH и запоминает запросы."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.commands = []
+
+    async def uid(self, command, uid, items):
+        self.commands.append(items)
+        return self.responses.pop(0)
+
+
+def test_find_text_part_in_nested_multipart():
+    part = _find_text_part(_parse_bodystructure(MIXED))
+    assert (part.section, part.subtype) == ("1.1", "plain")
+    assert (part.charset, part.encoding, part.size) == ("koi8-r", "base64", 2400)
+
+
+def test_attached_text_is_skipped_in_favour_of_html():
+    meta = (
+        b'1 FETCH (BODYSTRUCTURE (("TEXT" "HTML" ("CHARSET" "utf-8") NIL NIL "7BIT"'
+        b' 10 1 NIL NIL NIL)("TEXT" "PLAIN" ("NAME" "log.txt") NIL NIL "7BIT" 99 2 NIL'
+        b' ("ATTACHMENT" ("FILENAME" "log.txt")) NIL) "MIXED" ("BOUNDARY" "x") NIL NIL))'
+    )
+    part = _find_text_part(_parse_bodystructure(meta))
+    assert (part.section, part.subtype) == ("1", "html")
+    assert _parse_bodystructure(b"1 FETCH (UID 3 FLAGS ())") is None
+
+
+def test_section_decoder_handles_split_input():
+    text = "Привет, это длинный текст = с символами и переносами\r\n" * 20
+    for encoding, payload in (
+        ("base64", base64.encodebytes(text.encode("koi8-r"))),
+        ("quoted-printable", quopri.encodestring(text.encode("koi8-r"))),
+    ):
+        decoder = SectionDecoder(encoding, "koi8-r")
+        decoded = "".join(decoder.feed(payload[i : i + 7]) for i in range(0, len(payload), 7))
+        assert decoded + decoder.close() == text
+
+    # обрезанный посреди символа UTF-8 хвост отбрасывается
+    decoder = SectionDecoder("8bit", "utf-8")
+    assert decoder.feed("Привет".encode()[:5]) + decoder.close(complete=False) == "Пр"
+
+
+async def test_fetch_messages_fetches_only_capped_text_section():
+    body = base64.encodebytes("Отчёт за ноябрь во вложении.".encode("koi8-r"))
+    client = FakeImapClient(
+        Response("OK", [MIXED, HEADERS, b")", b"FETCH completed"]),
+        Response(
+            "OK",
+            [b"1 FETCH (UID 7 BODY[1.1]<0> {%d}" % len(body), bytearray(body), b")", b"OK"],
+        ),
+    )
+    messages = await utils._fetch_messages(client, ["7"], max_bytes=1024)
+    email = utils._decode_message(messages["7"], max_bytes=1024)
+
+    assert client.commands == [
+        "(UID BODYSTRUCTURE BODY.PEEK[HEADER.FIELDS (FROM SUBJECT DATE)])",
+        "(UID BODY.PEEK[1.1]<0.1024>)",
+    ]
+    assert email["from"] == "Алексей <alexey@example.com>"
+    assert email["subject"] == "Report"
+    assert email["body"] == "Отчёт за ноябрь во вложении."
+
+
+async def test_fetch_messages_falls_back_without_bodystructure(imap_server):
+    server, port = imap_server
+    uid = deliver(server, "Без структуры", content="Текст письма", mail_from="a@b.c")
+    pool = ImapPool("127.0.0.1", port, IMAP_USER, "secret", use_ssl=False)
+    try:
+        async with pool.session("INBOX") as session:
+            messages = await utils._fetch_messages(session.client, [str(uid)], 1024)
+            missing = await utils._fetch_messages(session.client, ["999"])
+    finally:
+        await pool.close()
+
+    email = utils._decode_message(messages[str(uid)])
+    assert email["subject"] == "Без структуры"
+    assert email["body"] == "Текст письма"
+    assert missing == {}
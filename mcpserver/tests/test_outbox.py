@@ -0,0 +1,139 @@
+# tests/test_outbox.py
+import asyncio
+import json
+
+import aiosmtplib
+from fastmcp import Client
+
+import src.core.email as email_module
+from main import create_app
+from src.core.email import utils
+from src.core.email.outbox import Outbox
+from src.core.email.smtp import SmtpSender
+
+PAYLOAD = {"to": ["anna@example.com"], "cc": [], "bcc": [], "subject": "Отчёт", "body": "Текст"}
+
+
+async def test_retries_dead_letters_and_idempotency(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.db"), max_attempts=3, backoff=0)
+    errors = {
+        "flaky": [aiosmtplib.SMTPServerDisconnected("обрыв")],
+        "broken": [aiosmtplib.SMTPServerDisconnected("обрыв")] * 3,
+        "refused": [aiosmtplib.SMTPResponseException(550, "No such user")],
+    }
+    ids = {}
+    for name in errors:
+        ids[name] = outbox.enqueue({**PAYLOAD, "subject": name}, idempotency_key=name)["id"]
+    # повтор с тем же ключом не создаёт второе письмо
+    assert outbox.enqueue(PAYLOAD, idempotency_key="flaky")["id"] == ids["flaky"]
+
+    async def send(message_id, payload):
+        pending = errors[payload["subject"]]
+        if pending:
+            raise pending.pop(0)
+
+    while await outbox.dispatch(send):
+        pass
+
+    assert outbox.status(ids["flaky"])["status"] == "sent"
+    assert outbox.status(ids["flaky"])["attempts"] == 2
+    assert outbox.status(ids["broken"])["status"] == "dead"
+    assert outbox.status(ids["broken"])["attempts"] == 3
+    refused = outbox.status(ids["refused"])
+    assert (refused["status"], refused["attempts"]) == ("dead", 1)
+    assert "No such user" in refused["error"]
+    assert outbox.stats() == {"queued": 0, "sending": 0, "retrying": 0, "sent": 1, "dead": 2}
+
+
+async def test_interrupted_sends_are_requeued(tmp_path):
+    path = str(tmp_path / "outbox.db")
+    outbox = Outbox(path)
+    message_id = outbox.enqueue(PAYLOAD)["id"]
+    outbox._claim()
+    outbox.close()  # процесс упал посреди отправки
+
+    outbox = Outbox(path)
+    assert outbox.recovered == 1
+    assert outbox.status(message_id)["status"] == "retrying"
+    delivered = []
+
+    async def send(message_id, payload):
+        delivered.append(message_id)
+
+    await outbox.dispatch(send)
+    assert delivered == [message_id]
+    assert outbox.status(message_id)["status"] == "sent"
+
+
+async def test_refused_recipients_are_kept_with_sent_status(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.db"))
+    to = ["anna@example.com", "nobody@example.com"]
+    message_id = outbox.enqueue({**PAYLOAD, "to": to})["id"]
+
+    async def send(message_id, payload):
+        return {"response": "250 OK", "refused": {"nobody@example.com": "550 No such user"}}
+
+    await outbox.dispatch(send)
+    status = outbox.status(message_id)
+    assert status["status"] == "sent"
+    assert status["refused"] == {"nobody@example.com": "550 No such user"}
+
+
+async def test_recovery_dead_letters_messages_out_of_attempts(tmp_path):
+    path = str(tmp_path / "outbox.db")
+    outbox = Outbox(path, max_attempts=2)
+    message_id = outbox.enqueue(PAYLOAD)["id"]
+    # письмо дважды роняет процесс посреди отправки
+    for _ in range(2):
+        outbox._claim()
+        outbox.close()
+        outbox = Outbox(path, max_attempts=2)
+
+    assert outbox.recovered == 0
+    status = outbox.status(message_id)
+    assert (status["status"], status["attempts"]) == ("dead", 2)
+    assert "прервана" in status["error"]
+
+
+async def test_send_email_returns_before_delivery(smtp_server, tmp_path, monkeypatch):
+    handler, port = smtp_server
+    monkeypatch.setattr(utils, "_smtp_sender", SmtpSender("127.0.0.1", port, use_tls=False))
+    monkeypatch.setattr(email_module, "_outbox", Outbox(str(tmp_path / "outbox.db")))
+
+    async with Client(create_app()) as client:
+        result = await client.call_tool(
+            "email_send_email", {"to": ["anna@example.com"], "subject": "Привет", "body": "Текст"}
+        )
+        queued = json.loads(result.content[0].text)
+        assert queued["status"] == "queued"
+
+        for _ in range(50):
+            result = await client.call_tool("email_get_send_status", {"ids": [queued["id"]]})
+            status = json.loads(result.content[0].text)["messages"][0]
+            if status["status"] == "sent":
+                break
+            await asyncio.sleep(0.02)
+
+    assert status["status"] == "sent"
+    assert len(handler.messages) == 1
+    assert f"<{queued['id']}@".encode() in handler.messages[0].content
+
+
+async def test_outbox_attempt_is_a_single_smtp_send(smtp_server, tmp_path, monkeypatch):
+    handler, port = smtp_server
+    handler.fail_data = 1
+    sender = SmtpSender("127.0.0.1", port, use_tls=False, retries=3, backoff=0.01)
+    monkeypatch.setattr(utils, "_smtp_sender", sender)
+    outbox = Outbox(str(tmp_path / "outbox.db"), max_attempts=3, backoff=0)
+    message_id = outbox.enqueue(PAYLOAD)["id"]
+
+    await outbox.dispatch(utils._deliver_email)
+    # 451 не повторяется внутри SmtpSender: повтор — следующая попытка очереди
+    assert outbox.status(message_id)["status"] == "retrying"
+    assert sender.stats()["retries"] == 0
+
+    await outbox.dispatch(utils._deliver_email)
+    assert outbox.status(message_id)["status"] == "sent"
+    assert outbox.status(message_id)["attempts"] == 2
+    assert len(handler.messages) == 1
+    await sender.close()
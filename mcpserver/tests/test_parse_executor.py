@@ -0,0 +1,60 @@
+# tests/test_parse_executor.py
+import asyncio
+import time
+
+import pytest
+
+from src.core.email.executor import ParseExecutor
+from src.core.email.utils import _parse_email
+
+RAW = (
+    "From: a@b.c\r\nSubject: Newsletter\r\nContent-Type: text/html; charset=utf-8\r\n\r\n"
+    "<html><body><p>Привет!</p><p>Большая рассылка</p></body></html>"
+).encode()
+
+
+def _slow_double(value: int) -> int:
+    time.sleep(0.05)
+    return value * 2
+
+
+async def test_backpressure_bounds_in_flight_work():
+    executor = ParseExecutor("thread", workers=2, max_pending=1)
+    try:
+        results = await asyncio.gather(
+            *(executor.run("double", _slow_double, i) for i in range(3))
+        )
+    finally:
+        executor.close()
+
+    assert results == [0, 2, 4]
+    stats = executor.stats()
+    assert stats["waits"] == 2
+    assert stats["in_flight"] == 0
+    assert stats["stages"]["double"]["calls"] == 3
+    assert stats["stages"]["double"]["max_run_ms"] >= 50
+    # второй и третий вызовы ждали освобождения места
+    assert stats["stages"]["double"]["avg_wait_ms"] > 0
+
+
+async def test_errors_are_counted_per_stage():
+    executor = ParseExecutor("thread", workers=1)
+    with pytest.raises(AttributeError):
+        await executor.run("broken", _parse_email, None)
+    executor.close()
+    assert executor.stats()["stages"]["broken"]["errors"] == 1
+
+
+async def test_process_pool_parses_outside_the_server_process():
+    executor = ParseExecutor("process", workers=1)
+    try:
+        parsed = await executor.run("message", _parse_email, RAW)
+    finally:
+        executor.close()
+    assert parsed["subject"] == "Newsletter"
+    assert parsed["body"] == "Привет!\nБольшая рассылка"
+
+
+def test_unknown_kind_is_rejected():
+    with pytest.raises(ValueError):
+        ParseExecutor("fiber")
@@ -0,0 +1,187 @@
+# tests/test_recurrence.py
+from datetime import (
+    date,
+    datetime,
+    timedelta,
+    timezone,
+)
+from zoneinfo import ZoneInfo
+
+from src.core.calendar.recurrence import (
+    Recurrence,
+    parse_rule,
+)
+from src.core.calendar.session import CalendarSession
+from src.core.calendar.store import (
+    DEFAULT_TZ,
+    EventStore,
+    _parse_event,
+)
+
+UTC = timezone.utc
+BERLIN = ZoneInfo("Europe/Berlin")
+
+
+def _ts(*args, tz=UTC) -> int:
+    return int(datetime(*args, tzinfo=tz).timestamp())
+
+
+def _expand(rule: str, dtstart: datetime, start: datetime, end: datetime, **kwargs) -> list:
+    recurrence = Recurrence(parse_rule(rule), dtstart, 3600, **kwargs)
+    return [
+        datetime.fromtimestamp(value, dtstart.tzinfo).replace(tzinfo=None)
+        for value in recurrence.between(int(start.timestamp()), int(end.timestamp()))
+    ]
+
+
+def test_rules():
+    # будни в 09:30 по Берлину: после перехода на летнее время — тоже 09:30
+    standup = _expand(
+        "FREQ=DAILY;BYDAY=MO,TU,WE,TH,FR",
+        datetime(2025, 3, 20, 9, 30, tzinfo=BERLIN),
+        datetime(2025, 3, 28, tzinfo=UTC),
+        datetime(2025, 4, 1, tzinfo=UTC),
+    )
+    assert standup == [datetime(2025, 3, 28, 9, 30), datetime(2025, 3, 31, 9, 30)]
+
+    last_friday = _expand(
+        "FREQ=MONTHLY;BYDAY=-1FR;COUNT=3",
+        datetime(2025, 1, 31, 10, tzinfo=UTC),
+        datetime(2025, 1, 1, tzinfo=UTC),
+        datetime(2026, 1, 1, tzinfo=UTC),
+    )
+    assert [day.date() for day in last_friday] == [
+        date(2025, 1, 31),
+        date(2025, 2, 28),
+        date(2025, 3, 28),
+    ]
+
+    fortnightly = _expand(
+        "FREQ=WEEKLY;INTERVAL=2;BYDAY=TU,TH;UNTIL=20250131T235959Z",
+        datetime(2025, 1, 7, 12, tzinfo=UTC),
+        datetime(2025, 1, 1, tzinfo=UTC),
+        datetime(2025, 3, 1, tzinfo=UTC),
+    )
+    assert [day.day for day in fortnightly] == [7, 9, 21, 23]
+
+    last_workday = _expand(
+        "FREQ=MONTHLY;BYDAY=MO,TU,WE,TH,FR;BYSETPOS=-1",
+        datetime(2025, 1, 31, 18, tzinfo=UTC),
+        datetime(2025, 1, 1, tzinfo=UTC),
+        datetime(2025, 6, 1, tzinfo=UTC),
+    )
+    assert [(day.month, day.day) for day in last_workday] == [
+        (1, 31),
+        (2, 28),
+        (3, 31),
+        (4, 30),
+        (5, 30),
+    ]
+
+    # 29 февраля бывает только в високосные годы
+    leap = _expand(
+        "FREQ=YEARLY",
+        datetime(2020, 2, 29, tzinfo=DEFAULT_TZ),
+        datetime(2020, 1, 1, tzinfo=UTC),
+        datetime(2030, 1, 1, tzinfo=UTC),
+    )
+    assert [day.year for day in leap] == [2020, 2024, 2028]
+
+    # BYMONTHDAY без BYMONTH в годовом правиле — это число каждого месяца
+    monthly_in_yearly = _expand(
+        "FREQ=YEARLY;BYMONTHDAY=15",
+        datetime(2025, 12, 15, 9, tzinfo=UTC),
+        datetime(2025, 12, 1, tzinfo=UTC),
+        datetime(2026, 3, 1, tzinfo=UTC),
+    )
+    assert [day.date() for day in monthly_in_yearly] == [
+        date(2025, 12, 15),
+        date(2026, 1, 15),
+        date(2026, 2, 15),
+    ]
+
+    with_exdate = _expand(
+        "FREQ=DAILY;COUNT=4",
+        datetime(2025, 5, 1, 8, tzinfo=UTC),
+        datetime(2025, 5, 1, tzinfo=UTC),
+        datetime(2025, 6, 1, tzinfo=UTC),
+        exdates=frozenset({_ts(2025, 5, 2, 8)}),
+        rdates=(_ts(2025, 5, 20, 8),),
+    )
+    assert [day.day for day in with_exdate] == [1, 3, 4, 20]
+
+
+def test_expansion_is_window_bounded():
+    recurrence = Recurrence(
+        parse_rule("FREQ=DAILY;UNTIL=20251231T000000Z"),
+        datetime(2021, 1, 1, 9, tzinfo=BERLIN),
+        900,
+    )
+    day = datetime(2025, 6, 15, tzinfo=BERLIN)
+    instances = list(
+        recurrence.between(int(day.timestamp()), int((day + timedelta(days=1)).timestamp()))
+    )
+    assert instances == [_ts(2025, 6, 15, 9, tz=BERLIN)]
+    # просмотрено несколько периодов вокруг окна, а не 1600 дней с начала серии
+    assert recurrence.periods <= 4
+
+
+def test_unsupported_rule_keeps_event_as_single_instance():
+    hourly = (
+        "BEGIN:VCALENDAR\r\nBEGIN:VEVENT\r\nUID:ping\r\nSUMMARY:Проверка\r\n"
+        "DTSTART:20251204T110000Z\r\nDTEND:20251204T111000Z\r\n"
+        "RRULE:FREQ=HOURLY;COUNT=5\r\nEND:VEVENT\r\nEND:VCALENDAR\r\n"
+    )
+    event = _parse_event("/ping.ics", None, hourly)
+
+    assert event.summary == "Проверка"
+    assert event.recurrence is None
+    assert event.start == _ts(2025, 12, 4, 11)
+
+
+SERIES = (
+    "BEGIN:VCALENDAR\r\nVERSION:2.0\r\n"
+    "BEGIN:VEVENT\r\nUID:standup\r\nSUMMARY:Стендап\r\n"
+    "DTSTART;TZID=Europe/Moscow:20251201T100000\r\nDTEND;TZID=Europe/Moscow:20251201T101500\r\n"
+    "RRULE:FREQ=DAILY;BYDAY=MO,TU,WE,TH,FR\r\n"
+    "EXDATE;TZID=Europe/Moscow:20251203T100000\r\nEND:VEVENT\r\n"
+    "BEGIN:VEVENT\r\nUID:standup\r\nSUMMARY:Стендап (перенесён)\r\n"
+    "RECURRENCE-ID;TZID=Europe/Moscow:20251204T100000\r\n"
+    "DTSTART;TZID=Europe/Moscow:20251204T160000\r\nDTEND;TZID=Europe/Moscow:20251204T161500\r\n"
+    "END:VEVENT\r\n"
+    "BEGIN:VEVENT\r\nUID:standup\r\nSTATUS:CANCELLED\r\n"
+    "RECURRENCE-ID;TZID=Europe/Moscow:20251205T100000\r\n"
+    "DTSTART;TZID=Europe/Moscow:20251205T100000\r\nEND:VEVENT\r\n"
+    "END:VCALENDAR\r\n"
+)
+
+ONE_OFF = (
+    "BEGIN:VCALENDAR\r\nBEGIN:VEVENT\r\nUID:review\r\nSUMMARY:Ревью\r\n"
+    "DTSTART:20251204T110000Z\r\nDTEND:20251204T120000Z\r\nEND:VEVENT\r\nEND:VCALENDAR\r\n"
+)
+
+
+async def test_store_expands_series(caldav_server):
+    server, url = caldav_server
+    server.put("Работа", "standup", SERIES)
+    server.put("Работа", "review", ONE_OFF)
+    session = CalendarSession(url, "user", "secret", default_name="Работа")
+    store = EventStore(await session.calendar())
+    week = datetime(2025, 12, 1, tzinfo=DEFAULT_TZ)
+    try:
+        events, _ = await store.events_page(week, week + timedelta(days=7))
+        first, cursor = await store.events_page(week, week + timedelta(days=7), limit=3)
+        rest, _ = await store.events_page(week, week + timedelta(days=7), limit=3, cursor=cursor)
+    finally:
+        await session.close()
+
+    rows = [(event.to_dict()["start"], event.summary) for event in events]
+    assert rows == [
+        ("2025-12-01T10:00:00+03:00", "Стендап"),
+        ("2025-12-02T10:00:00+03:00", "Стендап"),
+        ("2025-12-04T14:00:00+03:00", "Ревью"),
+        ("2025-12-04T16:00:00+03:00", "Стендап (перенесён)"),
+    ]
+    assert events[3].to_dict()["recurrence_id"] == "2025-12-04T10:00:00+03:00"
+    assert [event.summary for event in first + rest] == [summary for _, summary in rows]
+    assert store.stats()["series"] == 1
@@ -0,0 +1,111 @@
+# tests/test_smtp.py
+import asyncio
+import json
+import time
+from email.message import EmailMessage
+
+import aiosmtplib
+from fastmcp import Client
+
+from main import create_app
+from src.core.email import utils
+from src.core.email.smtp import SmtpSender
+
+
+def _sender(port, **kwargs) -> SmtpSender:
+    return SmtpSender("127.0.0.1", port, use_tls=False, backoff=0.01, **kwargs)
+
+
+def _message(to: str) -> tuple[EmailMessage, list[str]]:
+    msg = EmailMessage()
+    msg["From"] = "bot@example.com"
+    msg["To"] = to
+    msg["Subject"] = "Напоминание"
+    msg.set_content("Встреча в 11:00")
+    return msg, [to]
+
+
+async def test_batch_uses_one_session(smtp_server):
+    handler, port = smtp_server
+    sender = _sender(port)
+    try:
+        results = await sender.send_many([_message(f"u{i}@example.com") for i in range(5)])
+        await sender.send(*_message("last@example.com"))
+    finally:
+        await sender.close()
+
+    assert not any(isinstance(result, Exception) for result in results)
+    assert len(handler.messages) == 6
+    assert sender.stats()["connects"] == 1
+    assert sender.stats()["sent"] == 6
+
+
+async def test_reconnects_and_retries_transient_errors(smtp_server):
+    handler, port = smtp_server
+    sender = _sender(port)
+    try:
+        await sender.send(*_message("a@example.com"))
+        # сервер оборвал простаивающее соединение
+        smtp, _ = sender._idle[0]
+        smtp.transport.close()
+        await asyncio.sleep(0.01)
+        await sender.send(*_message("b@example.com"))
+
+        handler.fail_data = 2
+        result = await sender.send(*_message("c@example.com"))
+    finally:
+        await sender.close()
+
+    assert result["attempts"] == 3
+    assert len(handler.messages) == 3
+    assert sender.stats()["connects"] >= 2
+
+
+async def test_permanent_errors_are_not_retried(smtp_server):
+    handler, port = smtp_server
+    handler.refuse = {"ghost@example.com"}
+    sender = _sender(port)
+    try:
+        good, bad = await sender.send_many(
+            [_message("ok@example.com"), _message("ghost@example.com")]
+        )
+    finally:
+        await sender.close()
+
+    assert good["refused"] == {}
+    assert isinstance(bad, aiosmtplib.SMTPRecipientsRefused)
+    assert sender.stats()["retries"] == 0
+    assert sender.stats()["failed"] == 1
+
+
+async def test_rate_limit_spaces_messages(smtp_server):
+    handler, port = smtp_server
+    sender = _sender(port, connections=2, rate_limit=50)
+    started = time.perf_counter()
+    try:
+        await sender.send_many([_message(f"u{i}@example.com") for i in range(6)])
+    finally:
+        await sender.close()
+
+    assert time.perf_counter() - started >= 5 / 50
+    assert sender.stats()["throttled"] >= 4
+
+
+async def test_send_emails_tool(smtp_server, monkeypatch):
+    handler, port = smtp_server
+    handler.refuse = {"ghost@example.com"}
+    monkeypatch.setattr(utils, "_smtp_sender", _sender(port))
+    recipients = ["anna@example.com", "ghost@example.com", "ivan@example.com"]
+
+    async with Client(create_app()) as client:
+        result = await client.call_tool(
+            "email_send_emails",
+            {"recipients": recipients, "subject": "Привет", "body": "Письмо для {email}"},
+        )
+    data = json.loads(result.content[0].text)
+
+    assert (data["sent"], data["failed"]) == (2, 1)
+    assert [r["status"] for r in data["results"]] == ["sent", "error", "sent"]
+    assert [m.rcpt_tos for m in handler.messages] == [["anna@example.com"], ["ivan@example.com"]]
+    assert b"ivan@example.com" in handler.messages[1].content
+    assert utils._smtp_sender.stats()["connects"] == 1
@@ -1,6 +1,59 @@
 import streamlit as st
 import requests
 import json
+from requests.adapters import HTTPAdapter
+
+# Max silence between stream events before the run is considered stuck
+STREAM_READ_TIMEOUT = 120
+
+
+def get_http() -> requests.Session:
+    """One pooled HTTP session per browser session: keeps the AgentOS connection alive."""
+    if "http" not in st.session_state:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        st.session_state.http = session
+    return st.session_state.http
+
+
+def sse_frame(event, data: list[str]):
+    """Decode one SSE frame; non-JSON payloads are passed on as plain content."""
+    payload = "\n".join(data)
+    try:
+        parsed = json.loads(payload)
+    except json.JSONDecodeError:
+        parsed = None
+    if not isinstance(parsed, dict):
+        parsed = {"content": payload}
+    return event or parsed.get("event"), parsed
+
+
+def iter_sse(response: requests.Response):
+    """Parse a text/event-stream body into (event name, JSON data) pairs."""
+    event, data = None, []
+    for line in response.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if not line:
+            if data:
+                yield sse_frame(event, data)
+            event, data = None, []
+        elif line.startswith(":"):
+            continue  # comment / keep-alive
+        elif line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].lstrip())
+    # the stream may end without the blank line that closes the last frame
+    if data:
+        yield sse_frame(event, data)
+
+
+def tool_label(data: dict) -> str:
+    tool = data.get("tool") or {}
+    return tool.get("tool_name") or tool.get("name") or "tool"
 
 st.set_page_config(page_title="🤖 A2A MCP Agent", layout="wide", page_icon="🤖")
 st.title("🤖 A2A MCP Agent Interface")
@@ -11,6 +64,8 @@ if "messages" not in st.session_state:
     st.session_state.messages = []
 if "api_url" not in st.session_state:
     st.session_state.api_url = "http://localhost:8080"
+if "agent_session_id" not in st.session_state:
+    st.session_state.agent_session_id = None
 
 # Sidebar
 with st.sidebar:
@@ -26,7 +81,7 @@ with st.sidebar:
     with col1:
         if st.button("🔄 Test Connection", use_container_width=True):
             try:
-                resp = requests.get(f"{api_url}/health", timeout=5)
+                resp = get_http().get(f"{api_url}/health", timeout=5)
                 if resp.status_code == 200:
                     st.success(f"✅ Connected! Status: {resp.status_code}")
                 else:
@@ -37,7 +92,7 @@ with st.sidebar:
     with col2:
         if st.button("📋 List Agents", use_container_width=True):
             try:
-                resp = requests.get(f"{api_url}/agents", timeout=5)
+                resp = get_http().get(f"{api_url}/agents", timeout=5)
                 agents = resp.json()
                 st.json(agents)
             except Exception as e:
@@ -46,6 +101,7 @@ with st.sidebar:
     st.markdown("---")
     if st.button("🗑️ Clear Chat", use_container_width=True):
         st.session_state.messages = []
+        st.session_state.agent_session_id = None
         st.rerun()
 
 # Main chat area
@@ -70,32 +126,64 @@ if prompt := st.chat_input("Ask your MCP agent anything...", key="chat_input"):
 
         # CRITICAL FIX: Use form data for 'message' field
         payload = {
-            "message": prompt  # Single string, not nested
+            "message": prompt,  # Single string, not nested
+            "stream": "true",  # SSE: tokens and tool calls arrive as they happen
         }
+        if st.session_state.agent_session_id:
+            payload["session_id"] = st.session_state.agent_session_id
 
-        try:
-            with st.spinner("🤖 Agent thinking..."):
-                # FIXED: Use data= (form-encoded) instead of json=
-                response = requests.post(
-                    agent_run_url,
-                    data=payload,  # Changed from json=payload
-                    timeout=60,
-                )
-                response.raise_for_status()
+        tools = []
 
-                # Handle non-streaming response (most common for Agno)
-                result = response.json()
+        def render(cursor: bool = True):
+            lines = [f"🔧 `{name}` {mark}" for name, mark in tools]
+            text = "\n\n".join(lines + [full_response + ("▌" if cursor else "")])
+            message_placeholder.markdown(text)
 
-                # Extract content from Agno response structure
-                content = (
-                    result.get("output", {}).get("content", "")
-                    or result.get("result", "")
-                    or result.get("content", "")
-                    or str(result)
-                )
+        try:
+            # FIXED: Use data= (form-encoded) instead of json=
+            with get_http().post(
+                agent_run_url,
+                data=payload,
+                stream=True,
+                timeout=(5, STREAM_READ_TIMEOUT),
+            ) as response:
+                response.raise_for_status()
 
-                full_response = content
-                message_placeholder.markdown(full_response)
+                if "text/event-stream" not in response.headers.get("Content-Type", ""):
+                    # Server ignored streaming: single JSON body
+                    result = response.json()
+                    full_response = (
+                        result.get("output", {}).get("content", "")
+                        or result.get("result", "")
+                        or result.get("content", "")
+                        or str(result)
+                    )
+                else:
+                    message_placeholder.markdown("🤖 Agent thinking...")
+                    for event, data in iter_sse(response):
+                        if data.get("session_id"):
+                            st.session_state.agent_session_id = data["session_id"]
+                        if event == "RunContent" and isinstance(data.get("content"), str):
+                            full_response += data["content"]
+                        elif event == "ToolCallStarted":
+                            tools.append((tool_label(data), "…"))
+                        elif event == "ToolCallCompleted":
+                            name = tool_label(data)
+                            for i in range(len(tools) - 1, -1, -1):
+                                if tools[i] == (name, "…"):
+                                    tools[i] = (name, "✓")
+                                    break
+                        elif event == "RunCompleted":
+                            # Full text, in case no content deltas were streamed
+                            full_response = full_response or data.get("content") or ""
+                        elif event == "RunError":
+                            st.error(f"Agent error: {data.get('content', data)}")
+                            break
+                        else:
+                            continue
+                        render()
+
+            render(cursor=False)
 
         except requests.exceptions.HTTPError as e:
             if e.response.status_code == 422: